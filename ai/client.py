@@ -64,6 +64,7 @@ client = AIClient(
 
 import os
 from openai import OpenAI
+from core.rules import is_button, RESOURCE_KINDS
 
 class AIClient:
     def __init__(self, api_key=None, base_url=None, model="gpt-3.5-turbo"):
@@ -185,17 +186,20 @@ class AIClient:
         # 统计信息
         total_elements = len(elements_data)
         links = [e for e in elements_data if e.get('type') == 'a']
-        buttons = [e for e in elements_data if e.get('type') in ['button', 'input']]
+        buttons = [e for e in elements_data if is_button(e.get('kind'), e.get('type'))]
         
         # 验证结果统计
         validated = [e for e in elements_data if e.get('validated')]
         link_errors = [e for e in links if e.get('status_code') and e.get('status_code') >= 400]
         link_redirects = [e for e in links if e.get('status_code') and 300 <= e.get('status_code') < 400]
         unclickable_buttons = [e for e in buttons if e.get('clickable') == False]
+        # <head> 中的样式表、脚本排在文档最前面，不放进元素详情，以免占满前50个名额
+        resources = [e for e in elements_data if e.get('kind') in RESOURCE_KINDS]
+        content_elements = [e for e in elements_data if e.get('kind') not in RESOURCE_KINDS]
         
         # 构建详细的元素列表
         element_details = []
-        for i, el in enumerate(elements_data[:50], 1):  # 限制前50个元素以控制token
+        for i, el in enumerate(content_elements[:50], 1):  # 限制前50个元素以控制token
             detail = f"{i}. 类型: {el.get('type', 'N/A')}"
             if el.get('text'):
                 detail += f", 文本: {el.get('text')[:50]}"
@@ -222,6 +226,7 @@ class AIClient:
 - 总元素数: {total_elements}
 - 链接数: {len(links)}
 - 按钮数: {len(buttons)}
+- 资源数(图片/样式表/脚本): {len(resources)}
 - 已验证元素: {len(validated)}
 
 ## 验证结果
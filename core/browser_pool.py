@@ -0,0 +1,291 @@
+"""
+浏览器池模块
+
+维护若干常驻的无头 Chromium，手动扫描、定时任务和整站爬取共用。每次扫描从池中
+租用一个全新的 BrowserContext（cookie、缓存互不影响），用完归还，省去每次扫描
+启动浏览器的开销。每个浏览器可同时承载多个上下文。
+
+Playwright 对象绑定在创建它们的事件循环上，因此浏览器池在独立线程中运行自己的
+事件循环，其他线程通过 submit() / run() 把扫描协程提交到该循环执行。
+
+池启动时即在后台启动全部浏览器，浏览器回收后也立即在后台重新启动，
+扫描时通常不需要等待浏览器启动。
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from core.http import close_http_session, own_http_session
+
+
+class _BrowserSlot:
+    """池中的一个浏览器及其使用计数"""
+
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.pages = 0  # 自上次启动以来打开过的页面数
+        self.active = 0  # 正在使用的上下文数
+        self.lock = asyncio.Lock()  # 避免并发租用时重复启动浏览器
+
+
+class BrowserPool:
+    """
+    常驻浏览器池
+
+    Args:
+        size: 常驻浏览器数量
+        contexts_per_browser: 每个浏览器同时承载的上下文数，
+            size * contexts_per_browser 即可同时进行的扫描数
+        recycle_after: 单个浏览器累计打开多少个页面后（待其上下文全部归还时）重启，
+            防止内存持续增长
+        headless: 是否以无头模式运行
+        warm: 启动池时即在后台启动全部浏览器，回收的浏览器也立即在后台重启；
+            为 False 时浏览器在租用时才按需启动
+        launch_options: 传给 chromium.launch 的其他参数
+    """
+
+    def __init__(self, size=2, contexts_per_browser=4, recycle_after=50, headless=True, warm=True,
+                 **launch_options):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self.warm = warm
+        self.launch_options = launch_options
+
+        self.loop = None
+        self._thread = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        self._playwright = None
+        self._slots = []
+        self._capacity = None  # asyncio.Semaphore，限制同时租出的上下文总数
+        self._background = set()  # 后台启动浏览器的任务
+        self.stats = {'launched': 0, 'recycled': 0, 'unhealthy': 0, 'leases': 0}
+
+    # ------------------------------------------------------------------
+    # 线程与事件循环
+    # ------------------------------------------------------------------
+    def start(self):
+        """启动浏览器池线程，warm 为真时在后台启动全部浏览器（不等待启动完成）"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name='browser-pool', daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        # 池的事件循环中链接验证共用 HTTP 会话，由 _close_all 关闭
+        own_http_session(self.loop)
+        self._slots = [_BrowserSlot(i) for i in range(self.size)]
+        self._capacity = asyncio.Semaphore(self.size * self.contexts_per_browser)
+        self._playwright_lock = asyncio.Lock()  # 多个浏览器同时启动时只启动一次 Playwright
+        if self.warm:
+            for slot in self._slots:
+                self._launch_in_background(slot)
+        self._started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def submit(self, coro):
+        """
+        把协程提交到浏览器池的事件循环
+
+        Returns:
+            concurrent.futures.Future: 协程的执行结果
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """提交协程并阻塞等待结果（供 QThread / 调度器线程调用）"""
+        return self.submit(coro).result()
+
+    def shutdown(self):
+        """关闭所有浏览器并停止事件循环"""
+        if not self._thread or not self._thread.is_alive():
+            return
+        try:
+            self.submit(self._close_all()).result(timeout=30)
+        except Exception as e:
+            print(f"Error closing browser pool: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def usage(self):
+        """
+        当前的浏览器、上下文和页面数量（在池的事件循环中调用）
+
+        长时间运行时这些数字应保持平稳，持续增长说明有页面或上下文未关闭。
+        """
+        browsers = [slot.browser for slot in self._slots if slot.browser]
+        contexts = [context for browser in browsers for context in browser.contexts]
+        return {
+            'browsers': len(browsers),
+            'contexts': len(contexts),
+            'pages': sum(len(context.pages) for context in contexts),
+            'active_leases': sum(slot.active for slot in self._slots),
+        }
+
+    # ------------------------------------------------------------------
+    # 浏览器租用（以下方法均在池的事件循环中执行）
+    # ------------------------------------------------------------------
+    @asynccontextmanager
+    async def lease(self, **context_options):
+        """
+        从负载最低的浏览器创建全新的 BrowserContext
+
+        用法:
+            async with pool.lease() as context:
+                page = await context.new_page()
+
+        Args:
+            context_options: 传给 browser.new_context 的参数
+        """
+        async with self._capacity:
+            slot = self._pick_slot()
+            slot.active += 1
+            context = None
+            try:
+                async with slot.lock:
+                    await self._ensure_healthy(slot)
+                context = await slot.browser.new_context(**context_options)
+                context.on('page', lambda page: self._count_page(slot))
+                self.stats['leases'] += 1
+                yield context
+            finally:
+                if context:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                slot.active -= 1
+                if slot.active == 0 and slot.browser and self._needs_recycle(slot):
+                    await self._close_slot(slot)
+                    self.stats['recycled'] += 1
+                    if self.warm:
+                        self._launch_in_background(slot)
+
+    def _needs_recycle(self, slot):
+        return bool(self.recycle_after) and slot.pages >= self.recycle_after
+
+    def _pick_slot(self):
+        """选择负载最低的浏览器；待回收的浏览器不再分配新上下文，让它尽快空闲下来"""
+        candidates = [
+            slot for slot in self._slots
+            if slot.active < self.contexts_per_browser and not self._needs_recycle(slot)
+        ]
+        if not candidates:
+            candidates = [slot for slot in self._slots if slot.active < self.contexts_per_browser]
+        return min(candidates, key=lambda slot: slot.active)
+
+    def _count_page(self, slot):
+        slot.pages += 1
+
+    async def _ensure_healthy(self, slot):
+        """健康检查：浏览器未启动或已断开时重新启动"""
+        if slot.browser and not slot.browser.is_connected():
+            self.stats['unhealthy'] += 1
+            await self._close_slot(slot)
+        if slot.browser is None:
+            async with self._playwright_lock:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+            slot.browser = await self._playwright.chromium.launch(
+                headless=self.headless, **self.launch_options
+            )
+            slot.pages = 0
+            self.stats['launched'] += 1
+
+    def _launch_in_background(self, slot):
+        """在后台启动浏览器；期间租用该浏览器的扫描等待 slot.lock，不会重复启动"""
+        task = self.loop.create_task(self._warm_slot(slot))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _warm_slot(self, slot):
+        try:
+            async with slot.lock:
+                await self._ensure_healthy(slot)
+        except Exception as e:
+            # 启动失败时留给下一次租用重试
+            print(f"Error launching browser {slot.index}: {e}")
+
+    async def _close_slot(self, slot):
+        browser, slot.browser, slot.pages = slot.browser, None, 0
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    async def _close_all(self):
+        # 等待进行中的后台启动结束再统一关闭；中途取消会留下未关闭的 Playwright 驱动进程
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await close_http_session()
+        for slot in self._slots:
+            if slot.browser:
+                await self._close_slot(slot)
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_options_from_env(environ=None):
+    """
+    从环境变量读取浏览器池参数（未设置的使用 BrowserPool 的默认值）
+
+        AICHECKER_BROWSERS              常驻浏览器数量（size）
+        AICHECKER_CONTEXTS_PER_BROWSER  每个浏览器同时承载的上下文数
+        AICHECKER_RECYCLE_AFTER         浏览器累计打开多少个页面后重启（0 表示不重启）
+    """
+    environ = os.environ if environ is None else environ
+    names = {
+        'size': 'AICHECKER_BROWSERS',
+        'contexts_per_browser': 'AICHECKER_CONTEXTS_PER_BROWSER',
+        'recycle_after': 'AICHECKER_RECYCLE_AFTER',
+    }
+    options = {}
+    for option, name in names.items():
+        value = environ.get(name, '').strip()
+        if value:
+            try:
+                options[option] = int(value)
+            except ValueError:
+                print(f"Ignoring invalid {name}: {value!r}")
+    return options
+
+
+def get_browser_pool(**options):
+    """
+    获取全局共享的浏览器池
+
+    Args:
+        options: 首次创建时传给 BrowserPool 的参数（size、contexts_per_browser、
+            recycle_after 等），之后忽略
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(**options)
+        return _pool
+
+
+def shutdown_browser_pool():
+    """关闭全局浏览器池（应用退出时调用）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown()
@@ -0,0 +1,241 @@
+"""
+整站爬取模块
+
+从种子 URL 出发，把每个页面检测出的同源链接加入待爬队列，多个浏览器上下文并发扫描。
+每个页面保存为一个 ScanSession，并挂在同一条 CrawlSession 记录下。
+"""
+
+import asyncio
+import re
+from collections import deque
+from urllib.parse import urlsplit
+from core.browser_pool import get_browser_pool
+from core.detector import ElementDetector
+from core.pipeline import ScanPipeline
+from core.scanner import PageScanner
+from core.sitemap import CrawlDelay, SiteHints
+from core.urls import absolute_url, normalize_url, same_origin
+
+# 明显不是 HTML 页面的链接不加入待爬队列
+_SKIP_EXTENSIONS = {
+    '.pdf', '.zip', '.gz', '.rar', '.7z', '.exe', '.dmg', '.apk',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico',
+    '.mp3', '.mp4', '.avi', '.mov', '.webm',
+    '.css', '.js', '.json', '.xml', '.txt', '.csv',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+}
+
+
+class CrawlFrontier:
+    """
+    待爬队列（广度优先）
+
+    URL 规范化后去重（队列中保存原始的绝对地址，打开页面时使用），只接受与种子同源、未超过深度和页面数上限、
+    且符合包含 / 排除规则（正则，re.search）的地址。种子页面不受包含 / 排除规则限制。
+    设置 robots（core.sitemap.RobotsRules）后，robots.txt 禁止的地址也不会加入。
+    """
+
+    def __init__(self, seed_url, max_depth=2, max_pages=100, include_patterns=None, exclude_patterns=None):
+        self.seed_url = absolute_url(seed_url)
+        self.seed_key = normalize_url(seed_url)
+        if not self.seed_key:
+            raise ValueError(f"Invalid seed URL: {seed_url}")
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.include = [re.compile(p) for p in include_patterns or []]
+        self.exclude = [re.compile(p) for p in exclude_patterns or []]
+        self.robots = None
+        self.seen = set()
+        self.scheduled = 0  # 已加入队列的页面数（含已出队的）
+        self._queue = deque()
+
+        self.seen.add(self.seed_key)
+        self.scheduled = 1
+        self._queue.append((self.seed_url, 0))
+
+    def add(self, url, depth, base=None):
+        """
+        加入一个候选链接
+
+        Returns:
+            bool: 是否加入了队列
+        """
+        key = normalize_url(url, base)
+        if not key or key in self.seen:
+            return False
+        if depth > self.max_depth or self.scheduled >= self.max_pages:
+            return False
+        url = absolute_url(url, base)
+        if not same_origin(key, self.seed_key) or not self._allowed(url):
+            return False
+
+        self.seen.add(key)
+        self.scheduled += 1
+        self._queue.append((url, depth))
+        return True
+
+    def mark_seen(self, url):
+        """记录重定向后的实际地址，避免再次扫描"""
+        url = normalize_url(url)
+        if url:
+            self.seen.add(url)
+
+    def pop(self):
+        """取出下一个 (url, depth)，队列为空时返回 None"""
+        return self._queue.popleft() if self._queue else None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _allowed(self, url):
+        path = urlsplit(url).path.lower()
+        if any(path.endswith(ext) for ext in _SKIP_EXTENSIONS):
+            return False
+        if self.include and not any(p.search(url) for p in self.include):
+            return False
+        if self.robots and not self.robots.allowed(url):
+            return False
+        return not any(p.search(url) for p in self.exclude)
+
+
+class SiteCrawler:
+    """
+    同源整站爬取
+
+    Args:
+        storage: StorageManager
+        pool: BrowserPool，默认使用全局共享的浏览器池
+        concurrency: 同时扫描的页面数（每个页面使用独立的浏览器上下文）
+        max_depth / max_pages / include_patterns / exclude_patterns: 见 CrawlFrontier
+        enable_validation: 是否验证各页面的元素
+        detection_profile: ElementDetector 的检测档位
+        block_profile: PageScanner 的资源拦截档位
+        readiness: 页面就绪策略（core.readiness）
+        use_sitemap: 爬取前读取站点的 sitemap，把其中的页面一次性加入待爬队列
+        respect_robots: 遵守 robots.txt 的 Disallow 规则和 Crawl-delay
+        log: 日志回调
+        pipeline_options: 传给 ScanPipeline 的其他参数（capture_screenshots 等）
+    """
+
+    def __init__(self, storage, pool=None, concurrency=4, max_depth=2, max_pages=100,
+                 include_patterns=None, exclude_patterns=None, enable_validation=False,
+                 detection_profile='full', block_profile='none', readiness=None,
+                 use_sitemap=False, respect_robots=False, log=print, **pipeline_options):
+        self.storage = storage
+        self.pool = pool or get_browser_pool()
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.include_patterns = include_patterns
+        self.exclude_patterns = exclude_patterns
+        self.enable_validation = enable_validation
+        self.detection_profile = detection_profile
+        self.block_profile = block_profile
+        self.readiness = readiness
+        self.use_sitemap = use_sitemap
+        self.respect_robots = respect_robots
+        self.log = log
+        self.pipeline_options = pipeline_options
+        self.pages_scanned = 0
+        self._in_flight = 0
+        self._delay = CrawlDelay()
+
+    async def run(self, seed_url):
+        """
+        爬取整站（须在浏览器池的事件循环中执行）
+
+        Returns:
+            int: CrawlSession ID
+        """
+        frontier = CrawlFrontier(seed_url, self.max_depth, self.max_pages,
+                                 self.include_patterns, self.exclude_patterns)
+        crawl = self.storage.create_crawl(frontier.seed_url, self.max_depth, self.max_pages)
+        self.pages_scanned = 0
+        self._in_flight = 0
+        cond = asyncio.Condition()
+
+        status = 'completed'
+        try:
+            self._delay = await seed_frontier(frontier, self.use_sitemap, self.respect_robots, self.log)
+            await asyncio.gather(*(
+                self._worker(frontier, crawl.id, cond) for _ in range(self.concurrency)
+            ))
+        except Exception as e:
+            status = 'failed'
+            self.log(f"爬取失败: {e}")
+            raise
+        finally:
+            self.storage.complete_crawl(crawl.id, self.pages_scanned, status)
+
+        self.log(f"爬取完成，共扫描 {self.pages_scanned} 个页面")
+        return crawl.id
+
+    async def _worker(self, frontier, crawl_id, cond):
+        """不断从队列取页面扫描；队列为空且没有页面在扫描时退出"""
+        while True:
+            async with cond:
+                await cond.wait_for(lambda: len(frontier) or self._in_flight == 0)
+                item = frontier.pop()
+                if item is None:
+                    return
+                self._in_flight += 1
+
+            url, depth = item
+            try:
+                wait = self._delay.reserve()
+                if wait:
+                    await asyncio.sleep(wait)
+                await self._scan_page(frontier, crawl_id, url, depth)
+            except Exception as e:
+                self.log(f"扫描 {url} 出错: {e}")
+            finally:
+                async with cond:
+                    self._in_flight -= 1
+                    cond.notify_all()
+
+    async def _scan_page(self, frontier, crawl_id, url, depth):
+        """扫描单个页面，并把其中的同源链接加入队列"""
+        async with self.pool.lease() as context:
+            scanner = PageScanner(context=context, block_profile=self.block_profile,
+                                  readiness=self.readiness)
+            async with scanner.open(url) as page:
+                if not page:
+                    session = self.storage.create_session(url, crawl_id=crawl_id, depth=depth)
+                    self.storage.complete_session(session.id, 'failed')
+                    self.log(f"页面加载失败: {url}")
+                    return
+
+                final_url = page.url
+                frontier.mark_seen(final_url)
+
+                pipeline = ScanPipeline(self.storage, detector=ElementDetector(profile=self.detection_profile),
+                                        log=lambda msg: None, **self.pipeline_options)
+                session_id = await pipeline.run(page, url, self.enable_validation,
+                                                crawl_id=crawl_id, depth=depth, recorder=scanner.recorder,
+                                                metrics=scanner.metrics)
+            self.storage.complete_session(session_id)
+
+        self.pages_scanned += 1
+        discovered = 0
+        if depth < self.max_depth:
+            for el in self.storage.get_elements_by_session(session_id):
+                if el.type == 'a' and el.href:
+                    discovered += frontier.add(el.href, depth + 1, base=el.frame_url or final_url)
+        self.log(f"[{self.pages_scanned}] {url}（第 {depth} 层）新发现 {discovered} 个链接，"
+                 f"待扫描 {len(frontier)} 个")
+
+
+async def seed_frontier(frontier, use_sitemap=False, respect_robots=False, log=print):
+    """
+    按需读取 robots.txt 与 sitemap 并填充待爬队列
+
+    Returns:
+        CrawlDelay: 页面打开间隔（未遵守 robots.txt 或未设置 Crawl-delay 时不限制）
+    """
+    if not (use_sitemap or respect_robots):
+        return CrawlDelay()
+    robots = await SiteHints(frontier.seed_url).seed(frontier, use_sitemap, respect_robots, log)
+    if respect_robots and robots.crawl_delay:
+        log(f"robots.txt 要求 Crawl-delay: {robots.crawl_delay} 秒")
+        return CrawlDelay(robots.crawl_delay)
+    return CrawlDelay()
@@ -1,50 +1,559 @@
+import asyncio
+import hashlib
+import re
+from core.rules import compile_rules, get_rules
+
+# 在页面内一次性完成所有元素的信息收集，
+# 避免逐元素调用 evaluate / inner_text / get_attribute / is_visible 造成的大量 CDP 往返。
+#
+# 脚本分为两个阶段：
+#   collect - 按检测规则匹配并去重，只记录节点引用（开销很小）
+#   extract - 为指定区间内的节点提取文本、属性、路径和边界框（主要开销）
+# op 为 'all' 时两个阶段在同一次调用中完成；流式检测时先 collect，
+# 再分块 extract，节点列表暂存在 window.__aichecker 上，最后一块取完即释放。
+# 脚本在单个 frame 内运行，会深入所有开放的 shadow root；
+# 各 frame 由 ElementDetector 通过 asyncio.gather 并发执行。
+# observe / drain / disconnect 用于单页应用和无限滚动的增量检测。
+_DETECT_SCRIPT = """
+(args) => {
+    const state = window.__aichecker || (window.__aichecker = {});
+
+    // 由 core.rules 编译生成的检测规则；选择器无效的规则直接忽略，不影响其余规则。
+    // 每次调用都会执行，在空的文档片段上检查语法，不遍历页面 DOM
+    const RULES = __RULES__.filter((rule) => {
+        try {
+            document.createDocumentFragment().querySelector(rule.selector);
+            return true;
+        } catch (e) {
+            return false;
+        }
+    });
+    // 所有规则的选择器合并为一个选择器列表，每个 root 只需遍历一次 DOM
+    const combined = RULES.map((rule) => rule.selector).join(', ');
+
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (!rect.width || !rect.height) return false;
+        return getComputedStyle(el).visibility !== 'hidden';
+    };
+
+    // 文档及其中所有开放的 shadow root（含嵌套），closed shadow root 无法访问
+    const collectRoots = () => {
+        const roots = [document];
+        for (let i = 0; i < roots.length; i++) {
+            for (const el of roots[i].querySelectorAll('*')) {
+                if (el.shadowRoot) roots.push(el.shadowRoot);
+            }
+        }
+        return roots;
+    };
+
+    // 统计文档及所有开放 shadow root 中 id 的出现次数。Playwright 的 CSS 选择器会穿透
+    // 开放的 shadow root，页面上的 #foo 也会匹配组件内的 #foo，只有全局唯一的 id 才能作为路径锚点
+    const idCountsOf = (cache) => {
+        if (!cache.has('ids')) {
+            const idCounts = new Map();
+            for (const root of collectRoots()) {
+                for (const el of root.querySelectorAll('[id]')) {
+                    idCounts.set(el.id, (idCounts.get(el.id) || 0) + 1);
+                }
+            }
+            cache.set('ids', idCounts);
+        }
+        return cache.get('ids');
+    };
+
+    // 生成元素在其所在 root 内唯一且稳定的 CSS 路径：
+    // 从元素向上逐级使用 tag:nth-of-type，遇到全局唯一的 id 即停止
+    const cssPath = (el, cache) => {
+        const idCounts = idCountsOf(cache);
+        const parts = [];
+        let node = el;
+        while (node && node.nodeType === Node.ELEMENT_NODE) {
+            if (node.id && idCounts.get(node.id) === 1) {
+                parts.unshift('#' + CSS.escape(node.id));
+                break;
+            }
+            const tag = node.tagName.toLowerCase();
+            const parent = node.parentNode;
+            if (!parent) {
+                parts.unshift(tag);
+                break;
+            }
+            const sameTag = Array.from(parent.children).filter((s) => s.tagName === node.tagName);
+            parts.unshift(sameTag.length > 1 ? `${tag}:nth-of-type(${sameTag.indexOf(node) + 1})` : tag);
+            node = parent;
+        }
+        return parts.join(' > ');
+    };
+
+    // shadow host 路径：由外到内依次列出各层宿主元素的路径，
+    // 用 Playwright 的选择器链 >> 连接
+    const hostPath = (el, cache) => {
+        const hosts = [];
+        let root = el.getRootNode();
+        while (root instanceof ShadowRoot) {
+            hosts.unshift(cssPath(root.host, cache));
+            root = root.host.getRootNode();
+        }
+        return hosts.join(' >> ');
+    };
+
+    // 同一元素可能命中多条规则（如 <button role="button">），每个节点只生成一个条目，
+    // kind 取第一条命中的规则，并记录命中的全部选择器
+    const makeEntry = (el, counters) => {
+        const matched = [];
+        RULES.forEach((rule, i) => {
+            if (el.matches(rule.selector)) matched.push(i);
+        });
+        if (!matched.length) return null;
+        const rule = RULES[matched[0]];
+        const entry = {
+            el,
+            rule,
+            selector: rule.selector,
+            selectors: matched.map((i) => RULES[i].selector),
+            index: counters ? counters[matched[0]] : null
+        };
+        if (counters) matched.forEach((i) => counters[i]++);
+        return entry;
+    };
+
+    const collect = () => {
+        const entries = [];
+        if (!RULES.length) return entries;
+        // 各规则的命中序号，与 querySelectorAll(rule.selector) 的顺序一致
+        const counters = RULES.map(() => 0);
+        for (const root of collectRoots()) {
+            for (const el of root.querySelectorAll(combined)) {
+                const entry = makeEntry(el, counters);
+                if (entry) entries.push(entry);
+            }
+        }
+        return entries;
+    };
+
+    // 检测档位：在页面内过滤，被过滤的元素不会被提取，也不会传回 Python
+    //   full     - 全部元素
+    //   visible  - 仅可见元素
+    //   viewport - 仅当前视口内（首屏）的可见元素
+    const inViewport = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.bottom > 0 && rect.right > 0
+            && rect.top < window.innerHeight && rect.left < window.innerWidth;
+    };
+    const applyProfile = (entries, profile) => {
+        if (profile === 'visible') {
+            return entries.filter((entry) => isVisible(entry.el));
+        }
+        if (profile === 'viewport') {
+            return entries.filter((entry) => isVisible(entry.el) && inViewport(entry.el));
+        }
+        return entries;
+    };
+
+    // 增量检测开启时记录已报告的节点，之后不再作为"新增"报告；
+    // 被档位过滤掉的节点（隐藏的菜单、视口外的卡片）留待之后每次 drain 重新检查
+    const remember = (entries, reported) => {
+        if (!state.seen) return;
+        const accepted = new Set(reported.map((entry) => entry.el));
+        for (const entry of entries) {
+            if (accepted.has(entry.el)) {
+                state.seen.add(entry.el);
+                state.pending.delete(entry.el);
+            } else {
+                state.pending.add(entry.el);
+            }
+        }
+    };
+
+    const extract = (entry, cache) => {
+        try {
+            const el = entry.el;
+            const tag = el.tagName.toLowerCase();
+            const rect = el.getBoundingClientRect();
+            const path = cssPath(el, cache);
+            const shadowPath = hostPath(el, cache);
+
+            // 规则提取器返回的 href / text 覆盖通用字段，其余放入 attributes
+            let extra = {};
+            if (entry.rule.extract) {
+                try {
+                    extra = entry.rule.extract(el) || {};
+                } catch (e) {
+                    extra = {};
+                }
+            }
+            const { href, text, ...attributes } = extra;
+
+            return {
+                type: tag,
+                kind: entry.rule.name,
+                text: text !== undefined ? text : (el.innerText || '').trim(),
+                href: href !== undefined ? href : (tag === 'a' ? el.getAttribute('href') : null),
+                attributes: Object.keys(attributes).length ? attributes : null,
+                id: el.getAttribute('id'),
+                class: el.getAttribute('class'),
+                selector: entry.selector,
+                selectors: entry.selectors,
+                unique_selector: shadowPath ? `${shadowPath} >> ${path}` : path,
+                shadow_path: shadowPath || null,
+                index: entry.index,
+                visible: isVisible(el),
+                bbox: {
+                    x: rect.left + window.scrollX,
+                    y: rect.top + window.scrollY,
+                    width: rect.width,
+                    height: rect.height
+                }
+            };
+        } catch (e) {
+            // 单个元素出错不影响其余元素
+            return null;
+        }
+    };
+
+    // 增量检测：MutationObserver 记录新增节点，drain 时只提取其中尚未报告过的交互元素
+    const observeRoot = (root) => {
+        state.observer.observe(root, { childList: true, subtree: true });
+    };
+
+    if (args.op === 'observe') {
+        if (!state.observer) {
+            state.seen = new WeakSet();
+            state.pending = new Set();
+            state.added = [];
+            state.observer = new MutationObserver((mutations) => {
+                for (const mutation of mutations) {
+                    for (const node of mutation.addedNodes) {
+                        if (node.nodeType === Node.ELEMENT_NODE) state.added.push(node);
+                    }
+                }
+            });
+            // MutationObserver 不会穿透 shadow root，需要逐个观察
+            collectRoots().forEach(observeRoot);
+            // 以当前已有的、符合档位的元素为基线
+            const entries = collect();
+            remember(entries, applyProfile(entries, args.profile));
+        }
+        return true;
+    }
+
+    if (args.op === 'drain') {
+        if (!state.observer) return [];
+        const added = state.added;
+        state.added = [];
+
+        const candidates = new Set();
+        const consider = (el) => {
+            if (!state.seen.has(el)) candidates.add(el);
+        };
+
+        // 之前被档位过滤掉的节点可能已经显示或滚入视口
+        for (const el of state.pending) {
+            if (el.isConnected) {
+                consider(el);
+            } else {
+                state.pending.delete(el);
+            }
+        }
+
+        for (const node of added) {
+            if (!node.isConnected) continue;
+            // 新增子树中的 shadow root 也需要观察和检测
+            const roots = [node];
+            for (const el of node.querySelectorAll('*')) {
+                if (el.shadowRoot) {
+                    roots.push(el.shadowRoot);
+                    observeRoot(el.shadowRoot);
+                }
+            }
+            if (!RULES.length) continue;
+            if (node.matches(combined)) consider(node);
+            for (const root of roots) {
+                for (const el of root.querySelectorAll(combined)) consider(el);
+            }
+        }
+
+        const entries = [];
+        for (const el of candidates) {
+            const entry = makeEntry(el, null);
+            if (entry) entries.push(entry);
+        }
+        const reported = applyProfile(entries, args.profile);
+        remember(entries, reported);
+
+        const idCache = new Map();
+        return reported
+            .map((entry) => extract(entry, idCache))
+            .filter((record) => record);
+    }
+
+    if (args.op === 'disconnect') {
+        if (state.observer) state.observer.disconnect();
+        delete state.observer;
+        delete state.seen;
+        delete state.pending;
+        delete state.added;
+        return true;
+    }
+
+    if (args.op === 'collect') {
+        const entries = collect();
+        state.entries = applyProfile(entries, args.profile);
+        remember(entries, state.entries);
+        state.idCache = new Map();
+        return state.entries.length;
+    }
+
+    if (args.op === 'extract') {
+        const entries = state.entries || [];
+        const chunk = entries.slice(args.start, args.end)
+            .map((entry) => extract(entry, state.idCache))
+            .filter((record) => record);
+        if (args.end >= entries.length) {
+            delete state.entries;
+            delete state.idCache;
+        }
+        return chunk;
+    }
+
+    const idCache = new Map();
+    const entries = collect();
+    const reported = applyProfile(entries, args.profile);
+    remember(entries, reported);
+    return reported
+        .map((entry) => extract(entry, idCache))
+        .filter((record) => record);
+}
+"""
+
+
+_AT_BOTTOM_SCRIPT = """
+() => window.scrollY + window.innerHeight >= document.documentElement.scrollHeight - 1
+"""
+
 
 class ElementDetector:
+    # 检测档位，见 _DETECT_SCRIPT 中的 applyProfile
+    PROFILES = ('full', 'visible', 'viewport')
+
+    def __init__(self, profile='full', rules=None):
+        """
+        Args:
+            profile: 检测档位 full / visible / viewport
+            rules: DetectionRule 列表，为 None 时使用 core.rules 中注册的全部规则
+        """
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown detection profile: {profile}")
+        self.profile = profile
+        self.rules = rules if rules is not None else get_rules()
+        # 所有规则编译进同一段脚本，一次 DOM 遍历即可完成全部规则的匹配
+        self.script = _DETECT_SCRIPT.replace('__RULES__', compile_rules(self.rules))
+
+    @property
+    def selectors(self):
+        return [rule.selector for rule in self.rules]
+
     async def detect(self, page):
         """
-        Scans the page for interactive elements (links, buttons, inputs).
+        Scans the page for interactive elements (links, buttons, inputs)
+        and the other kinds registered in core.rules (form fields, images, resources).
         Returns a list of dictionaries containing element metadata.
+
+        所有元素的标签、文本、href、id、class、可见性和边界框
+        都在一次 page.evaluate 中收集，每个 frame 只有一次往返，各 frame 并发执行。
+        bbox 为相对所在 frame 文档的坐标（已加上滚动偏移）。
+        unique_selector 为可直接定位该元素的唯一 CSS 路径，
+        index 为元素在其 selector 匹配结果中的序号。
+        被多个选择器命中的元素只返回一条记录，selectors 列出全部命中的选择器，
+        kind 为第一条命中的规则名称，attributes 为规则提取器返回的额外字段。
+        frame_url 为元素所在 frame 的 URL，frame_path 为该 frame 在 frame 树中的位置（见 frame_path()），
+        shadow_path 为 shadow host 路径（不在 shadow DOM 中时为 None）。
+        fingerprint 为元素的跨会话身份指纹，见 element_fingerprint()。
+        profile 为 visible / viewport 时，不符合条件的元素在页面内即被过滤。
         """
-        elements = []
-        
-        # Define selectors for interesting elements
-        selectors = [
-            'a[href]', 
-            'button', 
-            'input[type="submit"]', 
-            'input[type="button"]',
-            '[role="button"]'
-        ]
-        
-        for selector in selectors:
-            found = await page.locator(selector).all()
-            for i, handle in enumerate(found):
-                try:
-                    # Basic metadata
-                    tag_name = await handle.evaluate("el => el.tagName.toLowerCase()")
-                    text = await handle.inner_text()
-                    text = text.strip() if text else ""
-                    
-                    # Specific attributes
-                    href = await handle.get_attribute("href") if tag_name == 'a' else None
-                    element_id = await handle.get_attribute("id")
-                    class_name = await handle.get_attribute("class")
-                    
-                    # Screenshot (optional, can be expensive for all elements)
-                    # screenshot_path = f"screenshots/{uuid.uuid4()}.png"
-                    # await handle.screenshot(path=screenshot_path)
-
-                    elements.append({
-                        "type": tag_name,
-                        "text": text,
-                        "href": href,
-                        "id": element_id,
-                        "class": class_name,
-                        "selector": selector,
-                        "visible": await handle.is_visible()
-                    })
-                except Exception as e:
-                    print(f"Error processing element: {e}")
-                    continue
-                    
-        return elements
+        frames = page.frames
+        results = await asyncio.gather(*(
+            self._evaluate(frame, {'op': 'all', 'profile': self.profile}, [])
+            for frame in frames
+        ))
+        return [record for records in results for record in records]
+
+    async def detect_stream(self, page, chunk_size=200):
+        """
+        流式检测：先在页面内完成匹配和去重，再按块提取元素信息
+
+        调用方可以在后续块仍在提取时就开始保存和验证前面的块。
+        每一轮会并发地从每个尚有剩余元素的 frame 中各提取一块。
+
+        Args:
+            page: Playwright Page 对象
+            chunk_size: 每个 frame 每块的元素数量
+
+        Yields:
+            list: 元素字典列表，格式与 detect() 相同
+        """
+        frames = page.frames
+        totals = await asyncio.gather(*(
+            self._evaluate(frame, {'op': 'collect', 'profile': self.profile}, 0)
+            for frame in frames
+        ))
+
+        for start in range(0, max(totals, default=0), chunk_size):
+            args = {'op': 'extract', 'start': start, 'end': start + chunk_size}
+            results = await asyncio.gather(*(
+                self._evaluate(frame, args, [])
+                for frame, total in zip(frames, totals) if start < total
+            ))
+            chunk = [record for records in results for record in records]
+            if chunk:
+                yield chunk
+
+    async def start_incremental(self, page):
+        """
+        开启增量检测：在每个 frame 中安装 MutationObserver
+
+        以安装时页面上已有且符合检测档位的元素为基线，之后 detect_new() 只返回新增的元素，
+        以及之前被档位过滤、后来显示或滚入视口的元素。
+        重复调用不会重复安装。
+        """
+        await asyncio.gather(*(
+            self._evaluate(frame, {'op': 'observe', 'profile': self.profile}, False)
+            for frame in page.frames
+        ))
+
+    async def detect_new(self, page):
+        """
+        返回自上次调用以来新增（或新变为可见 / 进入视口）的交互元素（格式与 detect() 相同，index 为 None）
+        """
+        args = {'op': 'drain', 'profile': self.profile}
+        results = await asyncio.gather(*(
+            self._evaluate(frame, args, [])
+            for frame in page.frames
+        ))
+        return [record for records in results for record in records]
+
+    async def stop_incremental(self, page):
+        """移除 MutationObserver 并释放页面内的状态"""
+        await asyncio.gather(*(
+            self._evaluate(frame, {'op': 'disconnect'}, False)
+            for frame in page.frames
+        ))
+
+    async def detect_incremental(self, page, max_scrolls=10, settle_ms=800):
+        """
+        增量检测：逐屏滚动页面，每次只产出懒加载或路由切换后新出现的元素
+
+        Args:
+            page: Playwright Page 对象
+            max_scrolls: 最多滚动的屏数
+            settle_ms: 每次滚动后等待内容加载的毫秒数
+
+        Yields:
+            list: 新增元素字典列表
+        """
+        await self.start_incremental(page)
+        for _ in range(max_scrolls):
+            await page.evaluate("() => window.scrollBy(0, window.innerHeight)")
+            await page.wait_for_timeout(settle_ms)
+            new_elements = await self.detect_new(page)
+            if new_elements:
+                yield new_elements
+            elif await page.evaluate(_AT_BOTTOM_SCRIPT):
+                # 已到底部且没有新内容出现
+                break
+
+    async def _evaluate(self, frame, args, default):
+        """在单个 frame 中执行检测脚本，并为元素记录补充 frame_url 和 frame_path"""
+        try:
+            result = await frame.evaluate(self.script, args)
+        except Exception as e:
+            # 跨域导航或已分离的 frame 不影响其余 frame
+            print(f"Error detecting elements in frame {frame.url}: {e}")
+            return default
+        if isinstance(result, list) and result:
+            path = frame_path(frame)
+            for record in result:
+                record['frame_url'] = frame.url
+                record['frame_path'] = path
+                record['fingerprint'] = element_fingerprint(record)
+        return result
+
+
+def element_fingerprint(record):
+    """
+    计算元素的紧凑指纹，用于跨会话识别"同一个"元素
+
+    由规范化后的标签、文本、href、唯一路径和所在 frame 的位置（frame_path）计算，
+    文本中的空白差异和大小写不影响结果。相同内容的 iframe（广告位、小部件）中的元素指纹不同；
+    主 frame 中的元素不计入 frame_path，与旧记录的指纹保持一致。
+
+    Args:
+        record: ElementDetector 返回的元素字典
+
+    Returns:
+        str: 16 位十六进制字符串（64 位哈希）
+    """
+    parts = [
+        (record.get('type') or '').lower(),
+        re.sub(r'\s+', ' ', record.get('text') or '').strip().lower(),
+        (record.get('href') or '').strip(),
+        record.get('unique_selector') or record.get('selector') or '',
+    ]
+    if record.get('frame_path'):
+        parts.append(record['frame_path'])
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def frame_path(frame):
+    """
+    frame 在 frame 树中的位置：从主 frame 起每一层在父 frame 的 child_frames 中的序号，以 / 分隔
+
+    多个 iframe 的 URL 相同（如广告位、about:blank）时仍能区分。主 frame 为空字符串。
+    """
+    indexes = []
+    parent = frame.parent_frame
+    while parent is not None:
+        indexes.append(str(parent.child_frames.index(frame)))
+        frame, parent = parent, parent.parent_frame
+    return '/'.join(reversed(indexes))
+
+
+def _frame_at(page, path):
+    """按 frame_path() 的结果找到 frame，frame 树已变化时返回 None"""
+    frame = page.main_frame
+    for index in path.split('/') if path else ():
+        children = frame.child_frames
+        if not index.isdigit() or int(index) >= len(children):
+            return None
+        frame = children[int(index)]
+    return frame
+
+
+def locate_element(page, element):
+    """
+    根据已保存的元素记录定位页面上的同一个元素
+
+    Args:
+        page: Playwright Page 对象
+        element: PageElement 记录
+
+    Returns:
+        Locator: 在元素所在的 frame 中，优先使用唯一路径，旧记录回退到 selector + 序号
+    """
+    frame = None
+    if element.frame_path is not None:
+        frame = _frame_at(page, element.frame_path)
+        if frame is not None and element.frame_url and frame.url != element.frame_url:
+            # 检测之后 frame 树有变化，按位置找到的已不是原来的 frame
+            frame = None
+    if frame is None:
+        # 旧记录没有 frame_path：按 URL 查找
+        frame = page.main_frame
+        if element.frame_url and element.frame_url != frame.url:
+            frame = next((f for f in page.frames if f.url == element.frame_url), frame)
+
+    if element.unique_selector:
+        return frame.locator(element.unique_selector)
+    return frame.locator(element.selector).nth(element.element_index or 0)
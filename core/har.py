@@ -0,0 +1,133 @@
+"""
+HAR 录制与回放模块
+
+录制模式下，页面的全部请求通过 BrowserContext.route_from_har(update=True) 写入 HAR 文件
+（上下文关闭时保存），链接验证的结果另存到同名的 .links.json 文件。
+回放模式下，页面请求由 HAR 响应、不访问网络（未录制的请求直接中止），链接验证结果
+也从录制中读取，同一快照可以反复离线重扫，也可以作为可重复的性能基准。
+"""
+
+import json
+import os
+from core.urls import normalize_url
+
+HAR_MODES = ('record', 'replay')
+
+
+class HarArchive:
+    """
+    一份 HAR 录制
+
+    Args:
+        path: HAR 文件路径（.har）
+        mode: 'record' 录制 / 'replay' 回放
+    """
+
+    def __init__(self, path, mode='replay'):
+        if mode not in HAR_MODES:
+            raise ValueError(f"Unknown HAR mode: {mode}")
+        if mode == 'replay' and not os.path.exists(path):
+            raise FileNotFoundError(f"HAR file not found: {path}")
+        self.path = path
+        self.mode = mode
+        self.links = {}  # 录制模式下链接验证的结果
+        self._index = None
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def links_path(self):
+        return f"{self.path}.links.json"
+
+    async def attach(self, context):
+        """在浏览器上下文上安装 HAR 路由（须在打开页面之前调用）"""
+        if self.recording:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            await context.route_from_har(self.path, update=True, update_content='embed')
+        else:
+            await context.route_from_har(self.path, not_found='abort')
+
+    def record_result(self, url, result):
+        """记录一次在线链接验证的结果（ElementValidator 的 on_result 回调）"""
+        if result.get('status_code') is None:
+            return
+        self.links[url] = {
+            'url': url,
+            'status_code': result['status_code'],
+            'response_time': result.get('response_time'),
+        }
+
+    def save(self):
+        """保存链接验证结果（HAR 本身由 Playwright 在上下文关闭时写入）"""
+        if not self.recording:
+            return
+        tmp_path = f"{self.links_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.links, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.links_path)
+
+    def known_responses(self):
+        """
+        回放模式下录制中的全部响应
+
+        Returns:
+            dict: {规范化 URL: {'status_code', 'response_time', 'final_url'}}，录制模式下为空
+        """
+        if not self.replaying:
+            return {}
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self):
+        index = {}
+        if os.path.exists(self.links_path):
+            with open(self.links_path, encoding='utf-8') as f:
+                index.update(json.load(f))
+        if self.path.endswith('.har'):
+            with open(self.path, encoding='utf-8') as f:
+                index.update(parse_har_entries(json.load(f)))
+        return index
+
+
+def parse_har_entries(har):
+    """
+    从 HAR 内容中提取 GET 响应，重定向按录制中的后续响应解析到最终状态
+
+    Returns:
+        dict: {规范化 URL: {'url', 'final_url', 'status_code', 'response_time'}}
+    """
+    entries = {}
+    redirects = {}
+    for entry in har.get('log', {}).get('entries', []):
+        request, response = entry.get('request', {}), entry.get('response', {})
+        if request.get('method') != 'GET':
+            continue
+        url = normalize_url(request.get('url'))
+        status = response.get('status')
+        if not url or not status or status < 0:
+            continue
+        entries[url] = {
+            'url': url,
+            'final_url': url,
+            'status_code': status,
+            'response_time': round(entry['time'] / 1000, 3) if entry.get('time', -1) >= 0 else None,
+        }
+        if 300 <= status < 400 and response.get('redirectURL'):
+            redirects[url] = normalize_url(response['redirectURL'], url)
+
+    for url in redirects:
+        target, hops = redirects[url], 0
+        while target in redirects and hops < 10:
+            target, hops = redirects[target], hops + 1
+        if target in entries and target not in redirects:
+            entries[url] = dict(entries[target], url=url)
+    return entries
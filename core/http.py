@@ -0,0 +1,139 @@
+"""
+共享 HTTP 连接池模块
+
+链接验证以前每次扫描都新建 aiohttp.ClientSession，每次都要重新解析 DNS、建立 TCP / TLS 连接。
+get_http_session() 为每个事件循环维护一个长期存在的会话（浏览器池的事件循环中即为手动扫描和
+定时任务共用），连接器的总连接数、单主机连接数、DNS 缓存时间和 keep-alive 时长可通过
+configure_http_pool() 调整；pool_stats() 返回请求数、新建 / 复用连接数和 DNS 缓存命中情况。
+
+共享会话须由事件循环的所有者在循环结束前关闭。浏览器池通过 own_http_session() 登记自己的事件循环，
+ElementValidator 默认只在登记过的事件循环中使用共享会话，其他地方（如 asyncio.run 中单独使用）
+仍使用退出时即关闭的独立会话。
+"""
+
+import asyncio
+import weakref
+import aiohttp
+
+# 模拟真实浏览器的请求头，避免 403
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+}
+
+# 连接池参数（对之后新建的会话生效）
+HTTP_POOL_OPTIONS = {
+    'limit': 100,  # 所有主机的连接总数
+    'limit_per_host': 10,  # 单个主机的连接数
+    'dns_ttl': 300,  # DNS 缓存时间（秒）
+    'keepalive_timeout': 30,  # 空闲连接保留时间（秒）
+}
+
+_COUNTERS = ('requests', 'connections_created', 'connections_reused', 'dns_cache_hits', 'dns_cache_misses')
+
+_sessions = weakref.WeakKeyDictionary()  # 事件循环 -> _SharedSession
+_owner_loops = weakref.WeakSet()  # 会负责关闭共享会话的事件循环
+
+
+class _SharedSession:
+    """一个事件循环中的共享会话及其统计"""
+
+    def __init__(self, limit, limit_per_host, dns_ttl, keepalive_timeout):
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._counter('requests'))
+        trace.on_connection_create_end.append(self._counter('connections_created'))
+        trace.on_connection_reuseconn.append(self._counter('connections_reused'))
+        trace.on_dns_cache_hit.append(self._counter('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(self._counter('dns_cache_misses'))
+
+        self.connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=dns_ttl,
+            keepalive_timeout=keepalive_timeout,
+        )
+        self.session = aiohttp.ClientSession(connector=self.connector, headers=BROWSER_HEADERS,
+                                             trace_configs=[trace])
+
+    def _counter(self, name):
+        async def count(session, context, params):
+            self.counters[name] += 1
+        return count
+
+    def stats(self):
+        connector = self.connector
+        # 连接数读取的是 aiohttp 连接器的内部状态，版本变化取不到时为 None
+        try:
+            active = len(connector._acquired)
+        except (AttributeError, TypeError):
+            active = None
+        try:
+            idle = sum(len(conns) for conns in connector._conns.values())
+        except (AttributeError, TypeError):
+            idle = None
+        return dict(
+            self.counters,
+            limit=connector.limit,
+            limit_per_host=connector.limit_per_host,
+            active_connections=active,
+            idle_connections=idle,
+        )
+
+
+def configure_http_pool(**options):
+    """
+    调整连接池参数（limit、limit_per_host、dns_ttl、keepalive_timeout），对之后新建的会话生效
+    """
+    unknown = set(options) - set(HTTP_POOL_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown HTTP pool options: {', '.join(sorted(unknown))}")
+    HTTP_POOL_OPTIONS.update(options)
+
+
+def own_http_session(loop):
+    """登记事件循环：其所有者保证在循环结束前调用 close_http_session()，该循环中的验证器默认使用共享会话"""
+    _owner_loops.add(loop)
+
+
+def has_http_owner():
+    """当前事件循环是否有负责关闭共享会话的所有者"""
+    return asyncio.get_running_loop() in _owner_loops
+
+
+def get_http_session():
+    """
+    获取当前事件循环的共享会话（须在事件循环中调用）
+
+    调用方不要关闭返回的会话；事件循环结束前调用 close_http_session()。
+    """
+    loop = asyncio.get_running_loop()
+    shared = _sessions.get(loop)
+    if shared is None or shared.session.closed:
+        shared = _sessions[loop] = _SharedSession(**HTTP_POOL_OPTIONS)
+    return shared.session
+
+
+async def close_http_session():
+    """关闭当前事件循环的共享会话"""
+    shared = _sessions.pop(asyncio.get_running_loop(), None)
+    if shared:
+        await shared.session.close()
+
+
+def pool_stats():
+    """
+    各共享会话的连接池统计，可在任意线程调用
+
+    Returns:
+        list: 每个会话一个字典：requests（请求数）、connections_created / connections_reused
+            （新建 / 复用的连接数）、dns_cache_hits / dns_cache_misses、active_connections /
+            idle_connections（使用中 / 空闲的连接数）以及 limit、limit_per_host
+    """
+    return [shared.stats() for shared in list(_sessions.values()) if not shared.session.closed]
@@ -0,0 +1,93 @@
+"""
+页面性能指标模块
+
+ScanSession 的开始 / 结束时间包含了浏览器启动、导航、检测和验证的全部耗时，无法反映页面
+本身的速度。页面就绪后，collect_page_metrics 从浏览器的 Performance API 读取
+Navigation Timing、首次绘制 / 首次内容绘制、最大内容绘制（LCP）以及传输字节数，
+扫描流水线把它们存入 PageMetrics 表，用于跟踪被监控站点的加载速度变化。
+"""
+
+# 时间均为相对导航开始的毫秒数，大小均为字节。
+# 跨域资源未返回 Timing-Allow-Origin 或命中缓存时 transferSize 为 0，总传输量只是下限。
+_METRICS_SCRIPT = """
+async () => {
+    // 0 是有效值（命中 DNS 缓存、复用连接时耗时为 0），只有缺失或为负时记为 null
+    const ms = v => (typeof v === 'number' && v >= 0) ? Math.round(v * 10) / 10 : null;
+    // 事件结束时间点为 0 表示该事件尚未发生（如 load 还未结束），记为 null
+    const mark = v => (typeof v === 'number' && v > 0) ? ms(v) : null;
+    const nav = performance.getEntriesByType('navigation')[0];
+    const paints = {};
+    for (const entry of performance.getEntriesByType('paint')) paints[entry.name] = entry.startTime;
+
+    // LCP 只能通过 PerformanceObserver（buffered）读取
+    let lcp = null;
+    try {
+        const observer = new PerformanceObserver(() => {});
+        observer.observe({type: 'largest-contentful-paint', buffered: true});
+        await new Promise(resolve => setTimeout(resolve, 50));
+        const entries = observer.takeRecords();
+        observer.disconnect();
+        if (entries.length) lcp = entries[entries.length - 1].startTime;
+    } catch (e) {}
+
+    const resources = performance.getEntriesByType('resource');
+    let transfer = nav ? nav.transferSize || 0 : 0;
+    let decoded = nav ? nav.decodedBodySize || 0 : 0;
+    for (const r of resources) {
+        transfer += r.transferSize || 0;
+        decoded += r.decodedBodySize || 0;
+    }
+
+    return {
+        navigation_type: nav ? nav.type : null,
+        dns_time: nav ? ms(nav.domainLookupEnd - nav.domainLookupStart) : null,
+        connect_time: nav ? ms(nav.connectEnd - nav.connectStart) : null,
+        ttfb: nav ? ms(nav.responseStart) : null,
+        response_end: nav ? ms(nav.responseEnd) : null,
+        dom_interactive: nav ? mark(nav.domInteractive) : null,
+        dom_content_loaded: nav ? mark(nav.domContentLoadedEventEnd) : null,
+        load_event: nav ? mark(nav.loadEventEnd) : null,
+        first_paint: ms(paints['first-paint']),
+        first_contentful_paint: ms(paints['first-contentful-paint']),
+        largest_contentful_paint: ms(lcp),
+        document_transfer_size: nav ? nav.transferSize || 0 : null,
+        total_transfer_size: transfer,
+        total_decoded_size: decoded,
+        resource_count: resources.length,
+    };
+}
+"""
+
+# PageMetrics 中保存的指标字段
+METRIC_FIELDS = (
+    'navigation_type', 'dns_time', 'connect_time', 'ttfb', 'response_end',
+    'dom_interactive', 'dom_content_loaded', 'load_event',
+    'first_paint', 'first_contentful_paint', 'largest_contentful_paint',
+    'document_transfer_size', 'total_transfer_size', 'total_decoded_size', 'resource_count',
+)
+
+
+async def collect_page_metrics(page):
+    """
+    读取页面的性能指标（须在页面就绪后、关闭前调用）
+
+    Returns:
+        dict: METRIC_FIELDS 中的各项指标；读取失败时返回 None
+    """
+    try:
+        return await page.evaluate(_METRICS_SCRIPT)
+    except Exception:
+        return None
+
+
+def format_metrics(metrics):
+    """把指标格式化为一行日志文本"""
+    def ms(key):
+        value = metrics.get(key)
+        return f"{value:.0f}ms" if value is not None else '-'
+
+    size = metrics.get('total_transfer_size')
+    size_text = f"{size / 1024:.0f}KB" if size is not None else '-'
+    return (f"TTFB {ms('ttfb')}，FCP {ms('first_contentful_paint')}，LCP {ms('largest_contentful_paint')}，"
+            f"DOMContentLoaded {ms('dom_content_loaded')}，load {ms('load_event')}，"
+            f"{metrics.get('resource_count') or 0} 个资源 / {size_text}")
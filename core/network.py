@@ -0,0 +1,75 @@
+"""
+网络响应记录模块
+
+页面加载期间浏览器已经请求过大量同页资源，有时还会预取链接的文档。ResponseRecorder
+通过 page.on('response') 记录这些 GET 响应的状态码、耗时和重定向链，扫描流水线把它们
+存入 NetworkResponse 表，链接验证时优先查表，浏览器已请求过的地址不再重复请求。
+"""
+
+from core.urls import normalize_url
+
+
+class ResponseRecorder:
+    """记录页面上的网络响应（按规范化 URL 去重，保留最后一次结果）"""
+
+    def __init__(self):
+        self.records = {}
+        self._taken = set()
+
+    def attach(self, page):
+        """开始监听页面的响应事件（须在 page.goto 之前调用）"""
+        page.on('response', self._on_response)
+
+    def _on_response(self, response):
+        request = response.request
+        if request.method != 'GET':
+            return
+        status = response.status
+        # 3xx 只是中间环节，等最终响应到达时连同重定向链一起记录
+        if 300 <= status < 400:
+            return
+
+        final_url = normalize_url(response.url)
+        if not final_url:
+            return
+
+        chain = []
+        previous = request.redirected_from
+        while previous is not None:
+            chain.append(previous.url)
+            previous = previous.redirected_from
+        chain.reverse()
+
+        record = {
+            'url': final_url,
+            'final_url': final_url,
+            'status_code': status,
+            'response_time': self._response_time(request),
+            'resource_type': request.resource_type,
+            'redirect_chain': chain or None,
+        }
+        self.records[final_url] = record
+
+        # 重定向链上的每个地址最终都得到同样的结果（与 allow_redirects=True 的验证一致）
+        for url in chain:
+            url = normalize_url(url)
+            if url and url != final_url:
+                self.records[url] = dict(record, url=url)
+
+    @staticmethod
+    def _response_time(request):
+        """从请求开始到收到响应头的耗时（秒），浏览器未提供时为 None"""
+        try:
+            timing = request.timing
+        except Exception:
+            return None
+        response_start = timing.get('responseStart', -1) if timing else -1
+        if response_start is None or response_start < 0:
+            return None
+        return round(response_start / 1000, 3)
+
+    def take(self):
+        """返回上次调用以来新记录的响应（用于分批入库）"""
+        new = [record for url, record in self.records.items() if url not in self._taken]
+        self._taken.update(record['url'] for record in new)
+        return new
@@ -0,0 +1,214 @@
+"""
+扫描流水线模块
+
+将元素检测、入库和验证三个阶段串成流水线：检测按块产出元素，
+每块立即入库并交给验证协程，后续块的提取与前面块的验证同时进行，
+大页面上首批结果不必等待整页检测完成。
+"""
+
+import asyncio
+from core.detector import ElementDetector, locate_element
+from core.urls import normalize_url
+from core.rules import is_button
+from core.validator import ElementValidator
+
+
+class ScanPipeline:
+    """扫描流水线（手动扫描与定时任务共用）"""
+
+    def __init__(self, storage, detector=None, log=print, chunk_size=200, capture_screenshots=False,
+                 incremental_scrolls=0, link_concurrency=20, per_host_links=8, link_cache=None):
+        self.storage = storage
+        self.detector = detector or ElementDetector()
+        self.log = log
+        self.chunk_size = chunk_size
+        self.capture_screenshots = capture_screenshots
+        # 大于 0 时，全量检测后继续逐屏滚动，增量捕获懒加载内容
+        self.incremental_scrolls = incremental_scrolls
+        # 链接验证的总并发数与单个主机的并发数上限
+        self.link_concurrency = link_concurrency
+        self.per_host_links = per_host_links
+        # 跨会话的链接状态缓存（data.link_cache.LinkStatusCache），为 None 时每次都在线验证
+        self.link_cache = link_cache
+
+    async def run(self, page, url, enable_validation=False, crawl_id=None, depth=None, recorder=None,
+                  har=None, metrics=None):
+        """
+        检测页面元素并保存，启用验证时边检测边验证
+
+        Args:
+            page: 已加载完成的 Playwright Page 对象
+            url: 扫描的目标 URL
+            enable_validation: 是否验证元素
+            crawl_id: 所属整站爬取的 ID（单页扫描为 None）
+            depth: 页面距种子页面的链接层数
+            recorder: 页面加载时挂载的 ResponseRecorder，其记录入库后供链接验证优先使用
+            har: core.har.HarArchive；录制时保存链接验证结果，回放时只从录制中取验证结果
+            metrics: 页面加载后采集的性能指标（core.metrics），存入 PageMetrics
+
+        Returns:
+            int: 扫描会话 ID
+        """
+        session = self.storage.create_session(url, crawl_id=crawl_id, depth=depth)
+        if recorder:
+            saved = self.storage.save_network_responses(session.id, recorder.take())
+            self.log(f"记录了页面加载期间的 {saved} 个网络响应")
+        if metrics:
+            self.storage.save_page_metrics(session.id, metrics)
+
+        queue = asyncio.Queue()
+        validation = None
+        if enable_validation:
+            self.log("开始验证元素...")
+            validation = asyncio.create_task(self._validate_worker(page, queue, session.id, har, recorder))
+
+        # 截图模式：整页只截一次，之后每块元素从中裁剪缩略图
+        cropper, shot = None, None
+        if self.capture_screenshots:
+            from core.screenshots import ScreenshotCropper
+            cropper = ScreenshotCropper()
+            try:
+                shot = await cropper.capture_page(page)
+            except Exception as e:
+                self.log(f"整页截图失败，跳过元素截图: {e}")
+
+        total = 0
+        detected = False
+        try:
+            # 增量模式需在全量检测前安装观察器，检测期间新增的节点才不会遗漏
+            if self.incremental_scrolls:
+                await self.detector.start_incremental(page)
+
+            async for chunk in self.detector.detect_stream(page, self.chunk_size):
+                if shot:
+                    await cropper.crop(shot, chunk)
+                elements = self.storage.save_elements(session.id, chunk)
+                total += len(elements)
+                self.log(f"已检测并保存 {total} 个元素")
+                if validation:
+                    queue.put_nowait(elements)
+
+            if self.incremental_scrolls:
+                # 滚动后新出现的内容不在整页截图中，因此不裁剪截图
+                async for chunk in self.detector.detect_incremental(page, self.incremental_scrolls):
+                    elements = self.storage.save_elements(session.id, chunk)
+                    total += len(elements)
+                    self.log(f"滚动后新增 {len(elements)} 个元素")
+                    if validation:
+                        queue.put_nowait(elements)
+                await self.detector.stop_incremental(page)
+            detected = True
+        finally:
+            # 无论检测是否出错，都通知验证协程结束
+            queue.put_nowait(None)
+            if validation and not detected:
+                # 检测出错时调用方随即关闭页面，验证协程不能继续点击页面，需取消并等待其退出
+                validation.cancel()
+                for result in await asyncio.gather(validation, return_exceptions=True):
+                    if not isinstance(result, asyncio.CancelledError) and isinstance(result, BaseException):
+                        self.log(f"验证出错: {result}")
+            if recorder:
+                # 检测和滚动期间新到达的响应也一并入库
+                self.storage.save_network_responses(session.id, recorder.take())
+
+        self.log(f"检测到 {total} 个元素")
+
+        if validation:
+            await validation
+            self.log("验证完成!")
+
+        return session.id
+
+    async def _validate_worker(self, page, queue, session_id, har=None, recorder=None):
+        """
+        从队列中逐块取出已入库的元素并验证
+
+        检测期间浏览器仍可能收到新的响应，每块验证前把 recorder 的最新记录合入已知响应。
+        """
+        current_url = page.url
+        known_responses = dict(har.known_responses()) if har else {}
+        known_responses.update(self.storage.get_network_responses(session_id))
+        options = {}
+        if har and har.replaying:
+            options['offline'] = True
+        elif har:
+            options['on_result'] = har.record_result
+        async with ElementValidator(known_responses=known_responses, max_concurrent=self.link_concurrency,
+                                    per_host=self.per_host_links, link_cache=self.link_cache,
+                                    **options) as validator:
+            # 链接验证不占用页面，各块并发进行；按钮验证要操作页面，逐块顺序进行
+            link_tasks = []
+            try:
+                while True:
+                    elements = await queue.get()
+                    if elements is None:
+                        break
+                    if recorder:
+                        validator.known_responses.update(recorder.records)
+                    link_tasks.append(asyncio.create_task(
+                        self._validate_links(validator, elements, current_url)))
+                    await self._validate_buttons(validator, page, elements)
+            except asyncio.CancelledError:
+                for task in link_tasks:
+                    task.cancel()
+                raise
+            finally:
+                await asyncio.gather(*link_tasks)
+        if validator.known_hits:
+            self.log(f"{validator.known_hits} 个链接直接使用了页面加载时的响应")
+        if validator.dedup_hits:
+            self.log(f"{validator.dedup_hits} 个链接与此前验证过的地址相同，直接复用了结果")
+        if validator.retries:
+            self.log(f"链接验证被限流 {validator.retries} 次，已按 Retry-After 等待后重试")
+        if validator.cache_hits or validator.revalidated:
+            self.log(f"链接状态缓存: {validator.cache_hits} 个未过期直接使用，{validator.revalidated} 个经条件请求确认未变化")
+
+    async def _validate_links(self, validator, elements, current_url):
+        """验证链接"""
+        links = [el for el in elements if el.type == 'a' and el.href]
+        if not links:
+            return
+
+        # 按规范化地址分组，导航菜单等处重复的链接只验证一次（iframe 中的相对链接以所在 frame 为基准）
+        groups = {}
+        for link in links:
+            base = link.frame_url or current_url
+            key = normalize_url(link.href, base) or link.href
+            groups.setdefault(key, (link.href, base, []))[2].append(link.id)
+
+        self.log(f"验证 {len(links)} 个链接（{len(groups)} 个不同地址）...")
+        results = await asyncio.gather(*(
+            validator.validate_link(href, base) for href, base, _ in groups.values()
+        ))
+        self.storage.update_validation_groups([
+            (element_ids, {
+                'status_code': result['status_code'],
+                'response_time': result['response_time'],
+                'error': result['error']
+            })
+            for (_, _, element_ids), result in zip(groups.values(), results)
+        ])
+
+    async def _validate_buttons(self, validator, page, elements):
+        """验证按钮"""
+        buttons = [el for el in elements if is_button(el.kind, el.type)]
+        if not buttons:
+            return
+
+        self.log(f"验证 {len(buttons)} 个按钮...")
+        for btn in buttons:
+            try:
+                # 按唯一路径定位到该元素本身
+                handle = locate_element(page, btn)
+                result = await validator.validate_button(page, handle)
+                self.storage.update_element_validation(btn.id, {
+                    'clickable': result['clickable'],
+                    'enabled': result['enabled'],
+                    'error': result.get('error')
+                })
+            except Exception as e:
+                self.storage.update_element_validation(btn.id, {
+                    'clickable': False,
+                    'enabled': False,
+                    'error': str(e)
+                })
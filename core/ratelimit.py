@@ -0,0 +1,191 @@
+"""
+按主机自适应限流模块
+
+固定的单主机并发数要么浪费了响应快的站点的能力，要么触发慢站点的限流。AdaptiveHostLimiter
+对每个主机采用 AIMD（加性增、乘性减）策略：请求正常且响应及时时逐步放宽并发，
+遇到 429 / 503 或超时时并发减半；服务器返回 Retry-After 时，该主机在指定时间内不再发出新请求。
+
+get_host_limiter() 为每个事件循环维护一个共享的限流器（与 core.http 的共享会话相同），
+整站爬取中并发扫描的各个页面对同一主机共用并发名额和暂停时间。
+"""
+
+import asyncio
+import datetime
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+# 表示服务器要求降速的状态码
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """
+    解析 Retry-After 响应头（秒数或 HTTP 日期）
+
+    Returns:
+        float: 需要等待的秒数；没有或无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.blocked_until = 0.0  # time.monotonic() 时间，在此之前不发出新请求
+        self.backoffs = 0  # 连续被限流的次数（没有 Retry-After 时按此指数退避）
+        self.cond = asyncio.Condition()
+        self.last_used = time.monotonic()
+
+
+class SlotTicket:
+    """一次请求占用的名额，请求结束后通过 report() 报告结果"""
+
+    def __init__(self, max_limit=None):
+        self.max_limit = max_limit  # 本次请求方允许的单主机并发上限
+        self.status_code = None
+        self.latency = None
+        self.timeout = False
+        self.retry_after = None
+
+    def report(self, status_code=None, latency=None, timeout=False, retry_after=None):
+        self.status_code = status_code
+        self.latency = latency
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self):
+        return self.status_code in THROTTLE_STATUSES
+
+
+class AdaptiveHostLimiter:
+    """
+    按主机自适应的并发限制
+
+    Args:
+        initial: 每个主机的初始并发数
+        max_limit: 单个主机的并发上限
+        min_limit: 单个主机的并发下限
+        slow_after: 响应时间超过该值（秒）视为主机吃力，不再放宽并发并小幅收紧
+        max_backoff: 单次暂停的最长时间（秒），Retry-After 超过该值时按该值处理
+    """
+
+    def __init__(self, initial=2, max_limit=8, min_limit=1, slow_after=2.0, max_backoff=60):
+        self.initial = min(initial, max_limit)
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.slow_after = slow_after
+        self.max_backoff = max_backoff
+        self.throttled = 0  # 收到 429 / 503 的次数
+        self._hosts = {}
+
+    @asynccontextmanager
+    async def slot(self, host, max_limit=None):
+        """
+        占用主机的一个并发名额（主机暂停期间或名额已满时等待），产出 SlotTicket
+
+        max_limit 为调用方自己的单主机并发上限（不超过 self.max_limit），
+        多个调用方共用限流器时各自的上限不同
+        """
+        cap = min(self.max_limit, max_limit) if max_limit else self.max_limit
+        state = self._hosts.get(host)
+        if state is None:
+            self._prune()
+            state = self._hosts[host] = _HostState(min(self.initial, cap))
+        state.last_used = time.monotonic()
+        async with state.cond:
+            while True:
+                pause = state.blocked_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(state.cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if state.in_flight < min(int(state.limit), cap):
+                    break
+                await state.cond.wait()
+            state.in_flight += 1
+
+        ticket = SlotTicket(cap)
+        try:
+            yield ticket
+        finally:
+            async with state.cond:
+                state.in_flight -= 1
+                self._adjust(state, ticket, time.monotonic())
+                state.cond.notify_all()
+
+    def _prune(self, max_hosts=1024, idle_after=600):
+        """长期运行时清理长时间空闲的主机记录"""
+        if len(self._hosts) < max_hosts:
+            return
+        now = time.monotonic()
+        for host, state in list(self._hosts.items()):
+            if state.in_flight == 0 and now - state.last_used > idle_after and now >= state.blocked_until:
+                del self._hosts[host]
+
+    def _adjust(self, state, ticket, now):
+        if ticket.throttled:
+            self.throttled += 1
+            # 同一批并发请求先后被限流只算一次拥塞，避免并发被连续减半到底
+            if now >= state.blocked_until:
+                state.limit = max(self.min_limit, state.limit / 2)
+            if ticket.retry_after is not None:
+                pause = ticket.retry_after
+            else:
+                pause = 2 ** state.backoffs
+            state.backoffs += 1
+            state.blocked_until = max(state.blocked_until, now + min(pause, self.max_backoff))
+        elif ticket.timeout:
+            state.limit = max(self.min_limit, state.limit / 2)
+        elif ticket.status_code is not None:
+            state.backoffs = 0
+            if ticket.latency is not None and ticket.latency > self.slow_after:
+                state.limit = max(self.min_limit, state.limit * 0.9)
+            else:
+                # 每轮（约 limit 个请求）并发加一
+                cap = ticket.max_limit or self.max_limit
+                state.limit = max(state.limit, min(cap, state.limit + 1 / state.limit))
+
+    def stats(self):
+        """各主机当前的并发上限、进行中的请求数和剩余暂停时间（秒）"""
+        now = time.monotonic()
+        return {
+            host: {
+                'limit': int(state.limit),
+                'in_flight': state.in_flight,
+                'paused_for': round(max(0.0, state.blocked_until - now), 1),
+            }
+            for host, state in self._hosts.items()
+        }
+
+
+# 事件循环 -> AdaptiveHostLimiter
+_limiters = weakref.WeakKeyDictionary()
+
+# 共享限流器的单主机并发上限；各验证器通过 slot(host, max_limit=...) 使用各自更小的上限
+SHARED_MAX_LIMIT = 32
+
+
+def get_host_limiter():
+    """获取当前事件循环共享的主机限流器（须在事件循环中调用）"""
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = AdaptiveHostLimiter(max_limit=SHARED_MAX_LIMIT)
+    return limiter
@@ -0,0 +1,140 @@
+"""
+页面就绪策略模块
+
+决定 PageScanner 导航后等待到什么程度才开始检测。networkidle 在带统计信标或长轮询的
+页面上迟迟不能满足，因此提供多种可选策略：
+
+    domcontentloaded - DOM 解析完成
+    load             - load 事件触发
+    networkidle      - 500ms 内无网络请求（原有行为）
+    dom_quiet        - DOM 解析完成后，连续 quiet_ms 毫秒没有 DOM 变更
+    selector         - DOM 解析完成后，指定选择器出现
+
+导航本身超时视为加载失败；导航完成后的附加等待（dom_quiet / selector）超时只记录警告，
+仍以当前 DOM 继续检测。
+"""
+
+import asyncio
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# 在页面内用 MutationObserver 计数 DOM 变更，连续 quiet 毫秒无变更时返回变更次数
+_DOM_QUIET_SCRIPT = """
+(quiet) => new Promise((resolve) => {
+    let mutations = 0;
+    let timer = null;
+    const observer = new MutationObserver((records) => {
+        mutations += records.length;
+        clearTimeout(timer);
+        timer = setTimeout(done, quiet);
+    });
+    function done() {
+        observer.disconnect();
+        resolve(mutations);
+    }
+    observer.observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+    timer = setTimeout(done, quiet);
+})
+"""
+
+
+class ReadinessStrategy:
+    """
+    页面就绪策略
+
+    Args:
+        wait_until: 传给 page.goto 的加载状态
+        timeout: 导航加附加等待的总超时（毫秒）
+    """
+
+    name = None
+
+    def __init__(self, wait_until='domcontentloaded', timeout=30000):
+        self.wait_until = wait_until
+        self.timeout = timeout
+
+    async def goto(self, page, url):
+        """
+        导航到 url 并等待页面就绪
+
+        Returns:
+            bool: 附加等待是否在超时前满足（导航失败时抛出异常）
+        """
+        start = time.monotonic()
+        await page.goto(url, wait_until=self.wait_until, timeout=self.timeout)
+        remaining = self.timeout - (time.monotonic() - start) * 1000
+        if remaining <= 0:
+            return False
+        try:
+            await self.wait(page, remaining)
+            return True
+        except (asyncio.TimeoutError, PlaywrightTimeoutError):
+            return False
+
+    async def wait(self, page, timeout):
+        """导航完成后的附加等待，子类按需覆盖"""
+
+    def __repr__(self):
+        return f"{type(self).__name__}(wait_until={self.wait_until!r}, timeout={self.timeout})"
+
+
+class LoadStateReadiness(ReadinessStrategy):
+    """等待 page.goto 的加载状态（domcontentloaded / load / networkidle）"""
+
+    def __init__(self, state='load', timeout=30000):
+        super().__init__(wait_until=state, timeout=timeout)
+        self.name = state
+
+
+class DomQuietReadiness(ReadinessStrategy):
+    """DOM 解析完成后，等待连续 quiet_ms 毫秒没有 DOM 变更"""
+
+    name = 'dom_quiet'
+
+    def __init__(self, quiet_ms=500, timeout=30000):
+        super().__init__(timeout=timeout)
+        self.quiet_ms = quiet_ms
+
+    async def wait(self, page, timeout):
+        await asyncio.wait_for(page.evaluate(_DOM_QUIET_SCRIPT, self.quiet_ms), timeout / 1000)
+
+
+class SelectorReadiness(ReadinessStrategy):
+    """DOM 解析完成后，等待指定选择器出现在页面上"""
+
+    name = 'selector'
+
+    def __init__(self, selector, timeout=30000):
+        super().__init__(timeout=timeout)
+        self.selector = selector
+
+    async def wait(self, page, timeout):
+        await page.wait_for_selector(self.selector, state='attached', timeout=timeout)
+
+
+READINESS_STRATEGIES = ('domcontentloaded', 'load', 'networkidle', 'dom_quiet', 'selector')
+
+
+def make_readiness(name='networkidle', timeout=30, quiet_ms=500, selector=None):
+    """
+    按名称创建就绪策略
+
+    Args:
+        name: READINESS_STRATEGIES 中的策略名
+        timeout: 总超时（秒）
+        quiet_ms: dom_quiet 策略要求的 DOM 静默时长（毫秒）
+        selector: selector 策略等待的 CSS 选择器
+
+    Returns:
+        ReadinessStrategy
+    """
+    timeout_ms = timeout * 1000
+    if name in ('domcontentloaded', 'load', 'networkidle'):
+        return LoadStateReadiness(name, timeout=timeout_ms)
+    if name == 'dom_quiet':
+        return DomQuietReadiness(quiet_ms=quiet_ms, timeout=timeout_ms)
+    if name == 'selector':
+        if not selector:
+            raise ValueError("selector readiness requires a selector")
+        return SelectorReadiness(selector, timeout=timeout_ms)
+    raise ValueError(f"Unknown readiness strategy: {name}")
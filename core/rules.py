@@ -0,0 +1,141 @@
+"""
+检测规则注册表
+
+每条规则由 CSS 选择器和可选的提取器组成。ElementDetector 会把所有规则编译进
+同一段页面脚本：所有规则的选择器合并后只做一次 DOM 遍历，提取器在页面内执行，
+新增规则既不会增加 DOM 遍历次数，也不会增加逐元素的 CDP 调用。
+"""
+
+import json
+
+
+class DetectionRule:
+    """
+    检测规则
+
+    Args:
+        name: 规则名称，写入元素记录的 kind 字段
+        selector: CSS 选择器
+        extractor: 可选的 JS 箭头函数源码，形如 "(el) => ({...})"，在页面内对每个
+            命中的元素执行。返回对象中的 href / text 会覆盖通用字段，
+            其余键值放入元素记录的 attributes 字段
+    """
+
+    def __init__(self, name, selector, extractor=None):
+        self.name = name
+        self.selector = selector
+        self.extractor = extractor
+
+    def __repr__(self):
+        return f"DetectionRule({self.name!r}, {self.selector!r})"
+
+
+# 规则按注册顺序匹配，元素的 kind 取第一个命中的规则
+_registry = {}
+
+# 按钮类规则（需要做点击验证、统计为按钮）
+BUTTON_KINDS = ('button', 'submit', 'input_button', 'role_button')
+
+
+# 资源类规则（图片、样式表、脚本等，不是用户可交互的页面内容）
+RESOURCE_KINDS = ('image', 'resource_link', 'script')
+
+
+def is_button(kind, tag):
+    """元素是否为按钮：表单控件同为 input 标签，按规则名区分；旧数据没有 kind 时按标签判断"""
+    return kind in BUTTON_KINDS or (kind is None and tag in ('button', 'input'))
+
+
+def register_rule(rule):
+    """注册（或替换同名的）检测规则"""
+    _registry[rule.name] = rule
+    return rule
+
+
+def unregister_rule(name):
+    """移除检测规则"""
+    _registry.pop(name, None)
+
+
+def get_rules(names=None):
+    """
+    获取已注册的规则
+
+    Args:
+        names: 规则名称列表，为 None 时返回全部规则
+
+    Returns:
+        list: DetectionRule 列表（按注册顺序）
+    """
+    if names is None:
+        return list(_registry.values())
+    return [_registry[name] for name in names if name in _registry]
+
+
+def compile_rules(rules):
+    """把规则列表编译为页面脚本中的 JS 数组字面量"""
+    items = [
+        "{ name: %s, selector: %s, extract: %s }" % (
+            json.dumps(rule.name), json.dumps(rule.selector), rule.extractor or 'null'
+        )
+        for rule in rules
+    ]
+    return "[\n" + ",\n".join(items) + "\n]"
+
+
+# 默认规则：交互元素
+register_rule(DetectionRule('link', 'a[href]'))
+register_rule(DetectionRule('button', 'button'))
+register_rule(DetectionRule('submit', 'input[type="submit"]'))
+register_rule(DetectionRule('input_button', 'input[type="button"]'))
+register_rule(DetectionRule('role_button', '[role="button"]'))
+
+# 默认规则：表单控件
+register_rule(DetectionRule(
+    'form_input',
+    'input:not([type="submit"]):not([type="button"]):not([type="hidden"]), textarea',
+    """(el) => ({
+        name: el.getAttribute('name'),
+        input_type: el.getAttribute('type') || el.tagName.toLowerCase(),
+        required: el.required,
+        disabled: el.disabled
+    })"""
+))
+register_rule(DetectionRule(
+    'select',
+    'select',
+    """(el) => ({
+        name: el.getAttribute('name'),
+        option_count: el.options.length,
+        required: el.required,
+        disabled: el.disabled
+    })"""
+))
+
+# 默认规则：图片与外部资源（资源地址放在 href 字段中）
+register_rule(DetectionRule(
+    'image',
+    'img',
+    """(el) => ({
+        href: el.currentSrc || el.getAttribute('src'),
+        alt: el.getAttribute('alt'),
+        loaded: el.complete && el.naturalWidth > 0
+    })"""
+))
+register_rule(DetectionRule(
+    'resource_link',
+    'link[href]',
+    """(el) => ({
+        href: el.getAttribute('href'),
+        rel: el.getAttribute('rel')
+    })"""
+))
+register_rule(DetectionRule(
+    'script',
+    'script[src]',
+    """(el) => ({
+        href: el.getAttribute('src'),
+        async: el.async,
+        defer: el.defer
+    })"""
+))
@@ -1,17 +1,99 @@
+import ipaddress
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
+from core.readiness import LoadStateReadiness
+from core.network import ResponseRecorder
+from core.metrics import collect_page_metrics
+
+# 资源拦截档位：档位名 -> (拦截的资源类型, 是否拦截第三方请求)
+BLOCK_PROFILES = {
+    'none': (frozenset(), False),
+    'media': (frozenset({'image', 'media'}), False),
+    'media_fonts': (frozenset({'image', 'media', 'font'}), False),
+    'first_party': (frozenset(), True),
+}
+
+
+# 国家顶级域名下常见的公共二级域（co.uk、com.au、co.jp 等），其下一级才是可注册域名
+_PUBLIC_SECOND_LEVELS = frozenset({
+    'ac', 'co', 'com', 'edu', 'gob', 'go', 'gov', 'gv', 'ltd', 'me', 'mil', 'ne', 'net', 'nic',
+    'nom', 'or', 'org', 'plc', 'sch',
+})
+
+
+def _site_of(host):
+    """
+    取可注册域名（如 www.example.co.uk -> example.co.uk），用于判断请求是否属于第一方
+
+    不依赖公共后缀列表：国家顶级域名下的常见公共二级域多取一段；IP 地址和单段主机名原样返回。
+    """
+    host = (host or '').lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return host
+    except ValueError:
+        pass
+    parts = host.split('.')
+    if len(parts) >= 3 and len(parts[-1]) == 2 and parts[-2] in _PUBLIC_SECOND_LEVELS:
+        return '.'.join(parts[-3:])
+    return '.'.join(parts[-2:])
+
 
 class PageScanner:
-    def __init__(self):
+    """
+    页面加载器
+
+    传入 context 时（通常来自 BrowserPool.lease()）直接在该上下文中打开页面，
+    不负责浏览器的启动与关闭；否则自行启动一个独立的浏览器。
+
+    block_profile 为 BLOCK_PROFILES 中的档位名，通过 page.route 在加载时拦截
+    检测用不到的图片、字体、视频或第三方请求，缩短 networkidle 的等待时间。
+
+    readiness 为 core.readiness 中的就绪策略，默认等待 networkidle。
+
+    加载期间浏览器收到的响应记录在 recorder 中，交给 ScanPipeline 入库后供链接验证复用。
+    页面就绪后采集的性能指标（Navigation Timing、绘制、LCP、传输字节数）保存在 metrics 中。
+
+    har 为 core.har.HarArchive 时，在上下文上安装 HAR 录制或回放路由。
+
+    推荐用 open() 租用页面，离开 async with 时页面一定会被关闭：
+
+        async with scanner.open(url) as page:
+            if page:
+                ...
+    """
+
+    def __init__(self, context=None, headless=True, block_profile='none', readiness=None, har=None):
         self.browser = None
-        self.context = None
+        self.context = context
         self.playwright = None
+        self.headless = headless
+        self.owns_browser = context is None
+        if block_profile not in BLOCK_PROFILES:
+            raise ValueError(f"Unknown block profile: {block_profile}")
+        self.block_profile = block_profile
+        self.blocked = 0  # 被拦截的请求数
+        self.readiness = readiness or LoadStateReadiness('networkidle')
+        self.ready = None  # 最近一次扫描的就绪等待是否在超时前满足
+        self.recorder = None  # 最近一次扫描页面的 ResponseRecorder
+        self.metrics = None  # 最近一次扫描页面的性能指标（core.metrics）
+        self.pages_opened = 0
+        self.pages_closed = 0
+        self.js_heap_bytes = None  # 最近一次关闭的页面关闭前的 JS 堆占用
+        self.har = har
+        self._har_attached = False
 
     async def start(self):
+        if not self.owns_browser:
+            return
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=False) # Visible for demo/debugging
+        self.browser = await self.playwright.chromium.launch(headless=self.headless)
         self.context = await self.browser.new_context()
 
     async def stop(self):
+        if not self.owns_browser:
+            return
         if self.context:
             await self.context.close()
         if self.browser:
@@ -22,11 +104,81 @@ class PageScanner:
     async def scan(self, url):
         if not self.context:
             await self.start()
-        
+
+        if self.har and not self._har_attached:
+            await self.har.attach(self.context)
+            self._har_attached = True
+
         page = await self.context.new_page()
+        self.pages_opened += 1
+        self.recorder = ResponseRecorder()
+        self.recorder.attach(page)
+        self.metrics = None
+        if self.block_profile != 'none':
+            await page.route('**/*', self._make_route_handler(url))
         try:
-            await page.goto(url, wait_until="networkidle")
+            self.ready = await self.readiness.goto(page, url)
+            if not self.ready:
+                print(f"Readiness wait timed out for {url}, continuing with current DOM")
+            self.metrics = await collect_page_metrics(page)
             return page
         except Exception as e:
             print(f"Error scanning {url}: {e}")
+            # 加载失败的页面立即关闭，避免残留标签页
+            await self.close_page(page)
             return None
+
+    @asynccontextmanager
+    async def open(self, url):
+        """
+        租用一个加载完成的页面，退出时关闭（加载失败时得到 None）
+        """
+        page = await self.scan(url)
+        try:
+            yield page
+        finally:
+            if page:
+                await self.close_page(page)
+
+    async def close_page(self, page):
+        """记录页面的 JS 堆占用后关闭页面"""
+        if page.is_closed():
+            return
+        try:
+            self.js_heap_bytes = await page.evaluate(
+                "performance.memory ? performance.memory.usedJSHeapSize : null"
+            )
+        except Exception:
+            self.js_heap_bytes = None
+        try:
+            await page.close()
+        except Exception:
+            pass
+        self.pages_closed += 1
+
+    def stats(self):
+        """本扫描器的页面计数与最近一次页面的内存占用"""
+        return {
+            'pages_opened': self.pages_opened,
+            'pages_closed': self.pages_closed,
+            'open_pages': self.pages_opened - self.pages_closed,
+            'js_heap_bytes': self.js_heap_bytes,
+        }
+
+    def _make_route_handler(self, url):
+        resource_types, first_party_only = BLOCK_PROFILES[self.block_profile]
+        site = _site_of(urlparse(url).hostname)
+
+        async def handle(route):
+            request = route.request
+            blocked = request.resource_type in resource_types
+            if not blocked and first_party_only and request.resource_type != 'document':
+                blocked = _site_of(urlparse(request.url).hostname) != site
+            if blocked:
+                self.blocked += 1
+                await route.abort()
+            else:
+                # 交给后续路由处理（如 HAR 回放），没有其他路由时正常发出请求
+                await route.fallback()
+
+        return handle
@@ -4,29 +4,40 @@
 使用 APScheduler 实现定时扫描任务的调度和执行
 """
 
-import asyncio
 import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from data.models import ScheduledTask, db
 from data.storage import StorageManager
+from data.link_cache import LinkStatusCache
 from core.scanner import PageScanner
+from core.browser_pool import get_browser_pool
 from core.detector import ElementDetector
-from core.validator import ElementValidator
+from core.readiness import make_readiness
+from core.pipeline import ScanPipeline
+from core.http import pool_stats
 from ai.client import AIClient
 
 
 class TaskScheduler:
     """定时任务调度器"""
     
-    def __init__(self):
+    def __init__(self, pool_options=None):
+        """
+        Args:
+            pool_options: 创建全局浏览器池时使用的参数（size、contexts_per_browser、recycle_after 等）
+        """
+        self.pool_options = pool_options or {}
         self.scheduler = BackgroundScheduler()
         self.storage = StorageManager()
+        self.link_cache = LinkStatusCache()  # 各任务共享的链接状态缓存
         self.running_tasks = set()  # 跟踪正在运行的任务
     
     def start(self):
-        """启动调度器并加载所有启用的任务"""
+        """启动浏览器池、调度器并加载所有启用的任务"""
+        # 提前启动浏览器池，首个任务不必等待浏览器启动
+        get_browser_pool(**self.pool_options).start()
         self.scheduler.start()
         self._load_tasks()
     
@@ -114,13 +125,8 @@ class TaskScheduler:
             task.last_run_time = datetime.datetime.now()
             task.save()
             
-            # 在新的事件循环中执行异步扫描
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            session_id = loop.run_until_complete(
-                self._run_scan(task)
-            )
-            loop.close()
+            # 在共享浏览器池的事件循环中执行异步扫描
+            session_id = get_browser_pool().run(self._run_scan(task))
             
             # 更新最后扫描会话ID
             if session_id:
@@ -145,64 +151,37 @@ class TaskScheduler:
     
     async def _run_scan(self, task):
         """执行扫描（异步）"""
-        scanner = PageScanner()
-        detector = ElementDetector()
-        
-        await scanner.start()
-        page = await scanner.scan(task.url)
-        
-        if not page:
-            await scanner.stop()
-            return None
-        
-        elements = await detector.detect(page)
-        
-        # 保存到数据库
-        session = self.storage.create_session(task.url)
-        self.storage.save_elements(session.id, elements)
-        
-        # 如果启用验证
-        if task.enable_validation:
-            await self._validate_elements(page, session.id)
-        
-        self.storage.complete_session(session.id)
-        await scanner.stop()
-        
-        return session.id
-    
-    async def _validate_elements(self, page, session_id):
-        """验证元素（异步）"""
-        elements = self.storage.get_elements_by_session(session_id)
-        current_url = page.url
-        
-        async with ElementValidator() as validator:
-            # 验证链接
-            links = [el for el in elements if el.type == 'a' and el.href]
-            for link in links:
-                result = await validator.validate_link(link.href, current_url)
-                self.storage.update_element_validation(link.id, {
-                    'status_code': result['status_code'],
-                    'response_time': result['response_time'],
-                    'error': result['error']
-                })
-            
-            # 验证按钮
-            buttons = [el for el in elements if el.type in ['button', 'input']]
-            for btn in buttons:
-                try:
-                    handle = page.locator(btn.selector).first
-                    result = await validator.validate_button(page, handle)
-                    self.storage.update_element_validation(btn.id, {
-                        'clickable': result['clickable'],
-                        'enabled': result['enabled'],
-                        'error': result.get('error')
-                    })
-                except Exception as e:
-                    self.storage.update_element_validation(btn.id, {
-                        'clickable': False,
-                        'enabled': False,
-                        'error': str(e)
-                    })
+        async with get_browser_pool().lease() as context:
+            try:
+                readiness = make_readiness(task.readiness, timeout=task.load_timeout,
+                                           quiet_ms=task.quiet_ms, selector=task.readiness_selector)
+            except ValueError as e:
+                # 旧版本可能保存了没有选择器的 selector 策略，退回默认的加载状态判定
+                print(f"Task {task.id} readiness {task.readiness!r} is invalid ({e}), using load state")
+                readiness = make_readiness(timeout=task.load_timeout)
+            scanner = PageScanner(context=context, block_profile=task.block_profile, readiness=readiness)
+            async with scanner.open(task.url) as page:
+                if not page:
+                    return None
+
+                # 检测、保存到数据库、验证（如果启用）以流水线方式并行进行
+                detector = ElementDetector(profile=task.detection_profile)
+                # 定时任务反复验证同一批链接，用跨会话缓存避免重复请求
+                pipeline = ScanPipeline(self.storage, detector=detector,
+                                        capture_screenshots=task.capture_screenshots,
+                                        incremental_scrolls=task.incremental_scrolls,
+                                        link_cache=self.link_cache)
+                session_id = await pipeline.run(page, task.url, task.enable_validation,
+                                                recorder=scanner.recorder, metrics=scanner.metrics)
+
+        self.storage.complete_session(session_id)
+
+        # 长时间运行时这些数字应保持平稳
+        stats = scanner.stats()
+        print(f"Task {task.id} page stats: {stats}, pool usage: {get_browser_pool().usage()}, "
+              f"http pool: {pool_stats()}")
+
+        return session_id
     
     def _generate_ai_report(self, session_id):
         """生成AI报告"""
@@ -220,6 +199,7 @@ class TaskScheduler:
             for el in elements:
                 elements_data.append({
                     'type': el.type,
+                    'kind': el.kind,
                     'text': el.text,
                     'href': el.href,
                     'status_code': el.status_code,
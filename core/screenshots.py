@@ -0,0 +1,122 @@
+"""
+元素截图模块
+
+每个页面只截一次整页图，再按检测阶段得到的边界框在线程池中裁剪出各元素的缩略图，
+取代逐元素调用 handle.screenshot 的高开销做法。
+缩略图按内容哈希存放，跨会话完全相同的截图只保存一份。
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+_executor = None
+
+
+def _get_executor():
+    """裁剪共用的线程池（Pillow 在解码、缩放和编码时会释放 GIL）"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4,
+                                       thread_name_prefix='screenshot')
+    return _executor
+
+
+class ScreenshotCropper:
+    """整页截图 + 批量裁剪"""
+
+    def __init__(self, output_dir='screenshots', thumbnail_size=(320, 320), batch_size=50):
+        self.output_dir = output_dir
+        self.thumbnail_size = thumbnail_size
+        self.batch_size = batch_size
+
+    async def capture_page(self, page):
+        """
+        截取整页图片
+
+        Args:
+            page: Playwright Page 对象
+
+        Returns:
+            dict: {'image': 已解码的 PIL Image, 'scale': 设备像素比}
+        """
+        png = await page.screenshot(full_page=True)
+        scale = await page.evaluate("window.devicePixelRatio") or 1
+
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(_get_executor(), self._decode, png)
+        return {'image': image, 'scale': scale}
+
+    async def crop(self, shot, elements):
+        """
+        为主 frame 中可见的元素裁剪缩略图，并写入元素字典的 screenshot_path
+
+        iframe 中元素的边界框相对于各自的 frame，无法对应到整页截图，因此跳过。
+        按 frame_path 判断是否在主 frame 中，与主页面 URL 相同的 iframe 也能区分。
+
+        Args:
+            shot: capture_page() 的返回值
+            elements: ElementDetector 返回的元素字典列表
+        """
+        targets = [
+            el for el in elements
+            if el.get('visible') and el.get('bbox')
+            and el.get('frame_path') == ''
+        ]
+        if not targets:
+            return
+
+        loop = asyncio.get_running_loop()
+        batches = [targets[i:i + self.batch_size] for i in range(0, len(targets), self.batch_size)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(_get_executor(), self._crop_batch, shot['image'], shot['scale'],
+                                 [el['bbox'] for el in batch])
+            for batch in batches
+        ))
+
+        for batch, paths in zip(batches, results):
+            for el, path in zip(batch, paths):
+                if path:
+                    el['screenshot_path'] = path
+
+    @staticmethod
+    def _decode(png):
+        image = Image.open(io.BytesIO(png))
+        image.load()
+        return image
+
+    def _crop_batch(self, image, scale, boxes):
+        """在工作线程中裁剪一批边界框，返回对应的文件路径（无法裁剪时为 None）"""
+        paths = []
+        for box in boxes:
+            left = max(0, int(box['x'] * scale))
+            top = max(0, int(box['y'] * scale))
+            right = min(image.width, int((box['x'] + box['width']) * scale))
+            bottom = min(image.height, int((box['y'] + box['height']) * scale))
+            if right <= left or bottom <= top:
+                paths.append(None)
+                continue
+
+            thumb = image.crop((left, top, right, bottom))
+            thumb.thumbnail(self.thumbnail_size)
+            buffer = io.BytesIO()
+            thumb.save(buffer, format='PNG')
+            paths.append(self._store(buffer.getvalue()))
+        return paths
+
+    def _store(self, data):
+        """按内容哈希写入文件，已存在时直接复用"""
+        digest = hashlib.sha256(data).hexdigest()
+        directory = os.path.join(self.output_dir, digest[:2])
+        path = os.path.join(directory, f"{digest}.png")
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return path
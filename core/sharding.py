@@ -0,0 +1,310 @@
+"""
+多进程分片爬取模块
+
+单个进程的事件循环要同时处理 evaluate 结果的 JSON 解码、检测和入库，大规模爬取时会
+占满一个 CPU 核。ShardedCrawler 按 URL 哈希把待爬队列分片给多个工作进程，每个进程
+运行自己的浏览器池和扫描流水线；工作进程不直接写数据库，而是把每个页面的结果发回主进程，
+由主进程作为唯一的写入者存入 SQLite。
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+import zlib
+from types import SimpleNamespace
+from core.crawler import CrawlFrontier, seed_frontier
+from core.sitemap import CrawlDelay
+
+
+def shard_for(url, shards):
+    """按 URL 的稳定哈希选择分片（不能用 hash()，它在各进程中随机化）"""
+    return zlib.crc32(url.encode('utf-8')) % shards
+
+
+class _ShardStorage:
+    """
+    工作进程中的存储替身：实现 ScanPipeline 用到的存储接口，只把结果记在内存中，
+    由主进程统一写入数据库
+    """
+
+    def __init__(self):
+        self.elements = []
+        self.validations = {}  # 元素在 elements 中的位置 -> 验证结果
+        self.responses = []
+        self.metrics = None
+
+    def create_session(self, url, crawl_id=None, depth=None):
+        return SimpleNamespace(id=0)
+
+    def save_network_responses(self, session_id, records):
+        self.responses.extend(records)
+        return len(records)
+
+    def save_page_metrics(self, session_id, metrics):
+        self.metrics = metrics
+
+    def get_network_responses(self, session_id):
+        return {record['url']: record for record in self.responses}
+
+    def save_elements(self, session_id, elements_data):
+        saved = []
+        for el_data in elements_data:
+            saved.append(SimpleNamespace(
+                id=len(self.elements),
+                type=el_data.get('type'),
+                kind=el_data.get('kind'),
+                href=el_data.get('href'),
+                frame_url=el_data.get('frame_url'),
+                frame_path=el_data.get('frame_path'),
+                selector=el_data.get('selector'),
+                unique_selector=el_data.get('unique_selector'),
+                element_index=el_data.get('index'),
+            ))
+            self.elements.append(el_data)
+        return saved
+
+    def update_element_validation(self, element_id, validation_data):
+        self.validations[element_id] = validation_data
+
+    def batch_update_validations(self, validations):
+        self.validations.update(validations)
+
+    def update_validation_groups(self, groups):
+        for element_ids, validation_data in groups:
+            for element_id in element_ids:
+                self.validations[element_id] = validation_data
+
+
+async def _scan_page(pool, url, depth, options):
+    """在工作进程中扫描一个页面，返回发给主进程的结果"""
+    from core.detector import ElementDetector
+    from core.pipeline import ScanPipeline
+    from core.scanner import PageScanner
+
+    result = {'url': url, 'depth': depth, 'ok': False, 'error': None,
+              'elements': [], 'validations': {}, 'responses': [], 'metrics': None, 'links': []}
+    storage = _ShardStorage()
+    async with pool.lease() as context:
+        scanner = PageScanner(context=context, block_profile=options['block_profile'],
+                              readiness=options['readiness'])
+        async with scanner.open(url) as page:
+            if not page:
+                result['error'] = 'Page load failed'
+                return result
+            final_url = page.url
+            pipeline = ScanPipeline(storage, detector=ElementDetector(profile=options['detection_profile']),
+                                    log=lambda msg: None, **options['pipeline'])
+            await pipeline.run(page, url, options['enable_validation'], recorder=scanner.recorder,
+                               metrics=scanner.metrics)
+
+    result.update(ok=True, final_url=final_url, elements=storage.elements,
+                  validations=storage.validations, responses=storage.responses, metrics=storage.metrics)
+    # 链接按所在框架的地址解析，由主进程加入待爬队列
+    result['links'] = [
+        (el['href'], el.get('frame_url') or final_url)
+        for el in storage.elements if el.get('type') == 'a' and el.get('href')
+    ]
+    return result
+
+
+def _worker_main(tasks, results, options):
+    """
+    工作进程入口：从 tasks 取 (url, depth)，扫描结果放入 results，收到 None 时退出
+
+    每个进程有自己的浏览器池，最多同时扫描 options['concurrency'] 个页面。
+    """
+    from core.browser_pool import BrowserPool
+
+    pool = BrowserPool(size=1, contexts_per_browser=options['concurrency'])
+    slots = threading.BoundedSemaphore(options['concurrency'])
+    futures = []
+
+    def done(future, url, depth):
+        try:
+            results.put(future.result())
+        except Exception as e:
+            results.put({'url': url, 'depth': depth, 'ok': False, 'error': str(e), 'links': []})
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            url, depth = task
+            slots.acquire()
+            future = pool.submit(_scan_page(pool, url, depth, options))
+            future.add_done_callback(lambda f, url=url, depth=depth: done(f, url, depth))
+            futures.append(future)
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+    finally:
+        pool.shutdown()
+
+
+class ShardedCrawler:
+    """
+    多进程分片整站爬取
+
+    参数与 SiteCrawler 相同，另有：
+        processes: 工作进程数（每个进程一个浏览器）
+        concurrency: 每个工作进程同时扫描的页面数
+
+    readiness 等扫描参数会序列化后传给各工作进程。
+    """
+
+    def __init__(self, storage, processes=None, concurrency=4, max_depth=2, max_pages=100,
+                 include_patterns=None, exclude_patterns=None, enable_validation=False,
+                 detection_profile='full', block_profile='none', readiness=None,
+                 use_sitemap=False, respect_robots=False, log=print, **pipeline_options):
+        self.storage = storage
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.include_patterns = include_patterns
+        self.exclude_patterns = exclude_patterns
+        self.use_sitemap = use_sitemap
+        self.respect_robots = respect_robots
+        self.log = log
+        self.options = {
+            'concurrency': concurrency,
+            'enable_validation': enable_validation,
+            'detection_profile': detection_profile,
+            'block_profile': block_profile,
+            'readiness': readiness,
+            'pipeline': pipeline_options,
+        }
+        self.pages_scanned = 0
+        self._delay = CrawlDelay()
+
+    def run(self, seed_url):
+        """
+        爬取整站（阻塞直到完成，在普通线程中调用）
+
+        Returns:
+            int: CrawlSession ID
+        """
+        frontier = CrawlFrontier(seed_url, self.max_depth, self.max_pages,
+                                 self.include_patterns, self.exclude_patterns)
+        crawl = self.storage.create_crawl(frontier.seed_url, self.max_depth, self.max_pages)
+        self.pages_scanned = 0
+        try:
+            self._delay = asyncio.run(seed_frontier(frontier, self.use_sitemap, self.respect_robots, self.log))
+        except Exception:
+            self.storage.complete_crawl(crawl.id, 0, 'failed')
+            raise
+
+        # spawn：子进程不继承主进程的浏览器线程、Qt 和数据库连接
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        task_queues = [ctx.Queue() for _ in range(self.processes)]
+        workers = [ctx.Process(target=_worker_main, args=(tasks, results, self.options), daemon=True)
+                   for tasks in task_queues]
+        for worker in workers:
+            worker.start()
+
+        status = 'completed'
+        pending = {}  # 已分发、尚未返回结果的地址 -> (分片序号, 深度)
+        dead = set()  # 意外退出的工作进程的分片序号
+        try:
+            self._dispatch(frontier, task_queues, pending, dead)
+            while pending or len(frontier):
+                # 有 Crawl-delay 时待爬队列可能还没分发完，到时间后继续分发
+                timeout = max(0.05, min(1, self._delay.remaining())) if len(frontier) else 1
+                try:
+                    result = results.get(timeout=timeout)
+                except queue.Empty:
+                    self._reap_workers(crawl.id, workers, pending, dead)
+                    self._dispatch(frontier, task_queues, pending, dead)
+                    continue
+                if pending.pop(result['url'], None) is None:
+                    # 该地址已因工作进程退出记为失败
+                    continue
+                self._write(crawl.id, result)
+                if result['ok'] and result['depth'] < self.max_depth:
+                    frontier.mark_seen(result.get('final_url'))
+                    for href, base in result['links']:
+                        frontier.add(href, result['depth'] + 1, base=base)
+                self._dispatch(frontier, task_queues, pending, dead)
+        except Exception as e:
+            status = 'failed'
+            self.log(f"爬取失败: {e}")
+            raise
+        finally:
+            for tasks in task_queues:
+                tasks.put(None)
+            for worker in workers:
+                worker.join(timeout=30)
+                if worker.is_alive():
+                    worker.terminate()
+            self.storage.complete_crawl(crawl.id, self.pages_scanned, status)
+
+        self.log(f"爬取完成，{self.processes} 个进程共扫描 {self.pages_scanned} 个页面")
+        return crawl.id
+
+    def _dispatch(self, frontier, task_queues, pending, dead=()):
+        """
+        把待爬队列中的地址按哈希分发给各工作进程，记入 pending
+
+        哈希到已退出进程的地址改发给其余进程中的一个（仍按哈希选择）。
+        """
+        alive = [shard for shard in range(len(task_queues)) if shard not in dead]
+        while True:
+            # 遵守 Crawl-delay：每个间隔只分发一个页面
+            if self._delay.remaining():
+                return
+            item = frontier.pop()
+            if item is None:
+                return
+            url, depth = item
+            self._delay.reserve()
+            shard = shard_for(url, len(task_queues))
+            if shard in dead:
+                shard = alive[shard_for(url, len(alive))]
+            task_queues[shard].put((url, depth))
+            pending[url] = (shard, depth)
+
+    def _reap_workers(self, crawl_id, workers, pending, dead):
+        """
+        检查意外退出的工作进程：分发给它、尚未返回结果的地址记为失败，之后不再向它分发
+
+        Raises:
+            RuntimeError: 所有工作进程都已退出
+        """
+        for shard, worker in enumerate(workers):
+            if shard in dead or worker.is_alive():
+                continue
+            dead.add(shard)
+            lost = [(url, depth) for url, (owner, depth) in pending.items() if owner == shard]
+            self.log(f"工作进程 {shard} 意外退出（exitcode {worker.exitcode}），{len(lost)} 个页面记为失败")
+            for url, depth in lost:
+                del pending[url]
+                self._write(crawl_id, {'url': url, 'depth': depth, 'ok': False,
+                                       'error': 'Crawl worker process exited', 'links': []})
+        if len(dead) == len(workers):
+            raise RuntimeError("All crawl worker processes exited unexpectedly")
+
+    def _write(self, crawl_id, result):
+        """主进程作为唯一写入者保存一个页面的结果"""
+        session = self.storage.create_session(result['url'], crawl_id=crawl_id, depth=result['depth'])
+        if not result['ok']:
+            self.storage.complete_session(session.id, 'failed')
+            self.log(f"页面扫描失败: {result['url']} ({result['error']})")
+            return
+
+        if result['responses']:
+            self.storage.save_network_responses(session.id, result['responses'])
+        if result.get('metrics'):
+            self.storage.save_page_metrics(session.id, result['metrics'])
+        rows = self.storage.save_elements(session.id, result['elements'])
+        self.storage.batch_update_validations(
+            (rows[index].id, data) for index, data in result['validations'].items()
+        )
+        self.storage.complete_session(session.id)
+        self.pages_scanned += 1
+        self.log(f"[{self.pages_scanned}] {result['url']}（第 {result['depth']} 层）{len(rows)} 个元素")
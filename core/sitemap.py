@@ -0,0 +1,226 @@
+"""
+robots.txt 与 sitemap 模块
+
+整站爬取开始前读取 robots.txt 和 sitemap，把站点地图中的页面一次性加入待爬队列，
+不必逐层打开中间页面才能发现深层链接。sitemap 边下载边解析（XMLPullParser），
+支持嵌套的 sitemap 索引和 gzip 压缩的 sitemap，上万个地址的站点地图也不会整体载入内存。
+robots.txt 的 Disallow 规则用于过滤待爬队列，Crawl-delay 用于控制页面打开的间隔。
+"""
+
+import asyncio
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import aiohttp
+from core.urls import absolute_url, normalize_url, same_origin
+
+USER_AGENT = 'AICheckerBot'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class RobotsRules:
+    """
+    robots.txt 规则
+
+    Args:
+        text: robots.txt 内容；为 None（不存在或无法获取）时允许全部地址
+        user_agent: 匹配 robots.txt 中 User-agent 的名称
+    """
+
+    def __init__(self, text=None, user_agent=USER_AGENT):
+        self.user_agent = user_agent
+        self._parser = RobotFileParser()
+        self._parser.parse((text or '').splitlines())
+
+    def allowed(self, url):
+        """是否允许抓取该地址"""
+        return self._parser.can_fetch(self.user_agent, url)
+
+    @property
+    def crawl_delay(self):
+        """Crawl-delay（秒），未设置时为 None"""
+        delay = self._parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    @property
+    def sitemaps(self):
+        """robots.txt 中声明的 sitemap 地址"""
+        return self._parser.site_maps() or []
+
+
+class SitemapParser:
+    """
+    sitemap 流式解析器：分块喂入原始字节，逐个取出解析到的地址
+
+    gzip 压缩的内容（按文件头判断）会先流式解压。urlset 中的 <loc> 作为页面地址，
+    sitemapindex 中的 <loc> 作为子 sitemap 地址。
+    """
+
+    def __init__(self):
+        self._xml = ET.XMLPullParser(events=('start', 'end'))
+        self._gzip = None
+        self._started = False
+        self._index = False
+        self._root = None  # urlset / sitemapindex 根元素
+
+    def feed(self, chunk):
+        """
+        喂入一块数据
+
+        Returns:
+            list: [(kind, url)]，kind 为 'page' 或 'sitemap'
+        """
+        if not self._started:
+            self._started = True
+            if chunk.startswith(_GZIP_MAGIC):
+                self._gzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._gzip:
+            chunk = self._gzip.decompress(chunk)
+        self._xml.feed(chunk)
+        return self._read_events()
+
+    def close(self):
+        """结束输入，返回剩余的地址"""
+        if self._gzip:
+            self._xml.feed(self._gzip.flush())
+        self._xml.close()
+        return self._read_events()
+
+    def _read_events(self):
+        found = []
+        for event, elem in self._xml.read_events():
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                if tag == 'sitemapindex':
+                    self._index = True
+                continue
+            if tag == 'loc' and elem.text:
+                found.append(('sitemap' if self._index else 'page', elem.text.strip()))
+            elif tag in ('url', 'sitemap'):
+                # 条目处理完即清空，并从根元素上摘除已处理的条目，内存占用不随 sitemap 大小增长
+                elem.clear()
+                self._root.clear()
+        return found
+
+
+class SiteHints:
+    """
+    读取站点的 robots.txt 和 sitemap
+
+    Args:
+        seed_url: 站点中的任意地址（通常是爬取种子）
+        timeout: 连接和读取的超时（秒），大的 sitemap 边读边解析，不限制总时长
+        max_sitemaps: 最多读取的 sitemap 文件数（含嵌套索引）
+        user_agent: 请求使用的 User-Agent，同时用于匹配 robots.txt 规则
+    """
+
+    def __init__(self, seed_url, timeout=30, max_sitemaps=50, user_agent=USER_AGENT):
+        self.seed_url = normalize_url(seed_url)
+        parts = urlsplit(self.seed_url)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        self.user_agent = user_agent
+        self.robots = RobotsRules(user_agent=user_agent)
+
+    async def load_robots(self, session):
+        """获取 robots.txt（不存在或出错时允许全部地址）"""
+        try:
+            async with session.get(f"{self.origin}/robots.txt") as response:
+                if response.status == 200:
+                    self.robots = RobotsRules(await response.text(errors='replace'), self.user_agent)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return self.robots
+
+    async def iter_pages(self, session, log=print):
+        """
+        依次读取 sitemap（robots.txt 声明的，未声明时使用 /sitemap.xml），
+        逐个产出与种子同源的页面绝对地址
+        """
+        pending = [absolute_url(url) for url in self.robots.sitemaps] or [f"{self.origin}/sitemap.xml"]
+        visited = set()
+        while pending and len(visited) < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            key = normalize_url(sitemap_url)
+            if not key or key in visited:
+                continue
+            visited.add(key)
+            try:
+                async with session.get(sitemap_url) as response:
+                    if response.status != 200:
+                        continue
+                    parser = SitemapParser()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        for item in self._accept(parser.feed(chunk), pending):
+                            yield item
+                    for item in self._accept(parser.close(), pending):
+                        yield item
+            except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError, zlib.error) as e:
+                log(f"读取 sitemap 失败: {sitemap_url} ({e})")
+
+    def _accept(self, found, pending):
+        for kind, url in found:
+            url = absolute_url(url, self.origin)
+            if not url:
+                continue
+            if kind == 'sitemap':
+                pending.append(url)
+            elif same_origin(normalize_url(url), self.seed_url):
+                yield url
+
+    async def seed(self, frontier, use_sitemap=True, respect_robots=True, log=print):
+        """
+        读取 robots.txt，并把 sitemap 中的页面加入待爬队列（作为第 0 层）
+
+        respect_robots 为真时，robots.txt 的 Disallow 规则同时用于过滤待爬队列。
+
+        Returns:
+            RobotsRules
+        """
+        headers = {'User-Agent': self.user_agent}
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+            await self.load_robots(session)
+            if respect_robots:
+                frontier.robots = self.robots
+            if not use_sitemap:
+                return self.robots
+            added = 0
+            async for url in self.iter_pages(session, log):
+                if frontier.scheduled >= frontier.max_pages:
+                    break
+                added += frontier.add(url, 0)
+        log(f"从 sitemap 加入 {added} 个页面")
+        return self.robots
+
+
+class CrawlDelay:
+    """
+    按 robots.txt 的 Crawl-delay 控制页面打开的间隔（所有并发任务共用）
+
+    reserve() 预约下一个时间点并返回需要等待的秒数，由调用方自行 sleep，
+    以便同时用于 asyncio 和普通线程。
+    """
+
+    def __init__(self, delay=None):
+        self.delay = delay or 0
+        self._next = 0.0
+
+    def reserve(self):
+        """预约下一次打开页面的时间，返回需要等待的秒数"""
+        if not self.delay:
+            return 0
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.delay
+        return start - now
+
+    def remaining(self):
+        """距离下一个可用时间点的秒数（不预约）"""
+        return max(0.0, self._next - time.monotonic()) if self.delay else 0
@@ -0,0 +1,82 @@
+"""
+URL 规范化工具
+
+把写法不同但指向同一资源的 URL 归一，用于爬取去重和链接验证去重：
+补全相对地址、协议和主机名小写、去掉默认端口和片段（#...）、空路径补 "/"、
+查询参数按原样排序。
+
+规范化结果只用作去重的键：参数顺序可能有意义，服务器也不一定接受改写后的写法，
+实际访问的地址用 absolute_url() 得到（只补全相对地址、去掉片段）。
+"""
+
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_FETCHABLE_SCHEMES = ('http', 'https')
+
+
+def absolute_url(url, base=None):
+    """
+    补全为可访问的绝对地址（去掉片段，空路径补 "/"，其余保持原样）
+
+    Returns:
+        str: 绝对地址；非 http(s) 地址或无法解析时返回 None
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        parts.port
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in _FETCHABLE_SCHEMES or not parts.hostname:
+        return None
+    return urlunsplit((parts.scheme, parts.netloc, parts.path or '/', parts.query, ''))
+
+
+def normalize_url(url, base=None):
+    """
+    规范化 URL
+
+    Args:
+        url: 原始地址（可以是相对地址）
+        base: 解析相对地址的基准 URL
+
+    Returns:
+        str: 规范化后的绝对地址；非 http(s) 地址（mailto:、javascript: 等）或无法解析时返回 None
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in _FETCHABLE_SCHEMES or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if ':' in host:
+        # IPv6 地址需要保留方括号
+        host = f"[{host}]"
+    if port and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    path = parts.path or '/'
+    # 不解码再编码，"?a" 与 "?a=" 以及转义写法保持区分
+    query = '&'.join(sorted(param for param in parts.query.split('&') if param))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def same_origin(url, other):
+    """两个已规范化的 URL 是否同源（协议、主机、端口均相同）"""
+    a, b = urlsplit(url), urlsplit(other)
+    return (a.scheme, a.netloc) == (b.scheme, b.netloc)
@@ -1,43 +1,75 @@
 import asyncio
 import aiohttp
-from urllib.parse import urljoin
+from contextlib import asynccontextmanager
+from urllib.parse import urljoin, urlsplit
+from core.urls import normalize_url
+from core.ratelimit import THROTTLE_STATUSES, get_host_limiter, parse_retry_after
+from core.http import BROWSER_HEADERS, get_http_session, has_http_owner
 
 class ElementValidator:
     """
     验证页面元素的可用性和交互性
     """
     
-    def __init__(self, timeout=5):
+    def __init__(self, timeout=5, known_responses=None, offline=False, on_result=None,
+                 max_concurrent=20, per_host=8, link_cache=None, max_retries=3, shared_session=None,
+                 host_limiter=None):
+        """
+        Args:
+            timeout: 请求超时（秒）
+            known_responses: {规范化 URL: 响应字典}，页面加载时浏览器已收到的响应
+                （见 StorageManager.get_network_responses），命中时不再发起请求
+            offline: 离线模式（HAR 回放），known_responses 中没有的链接不发起请求
+            on_result: 在线验证得到结果后的回调 on_result(规范化 URL, 结果)，用于 HAR 录制
+            max_concurrent: 本验证器同时进行的链接请求总数上限
+            per_host: 同一主机同时进行的链接请求数上限。每个主机从 2 个并发开始，响应正常时逐步放宽到该上限，
+                遇到 429 / 503 或超时时减半（见 core.ratelimit.AdaptiveHostLimiter）
+            link_cache: data.link_cache.LinkStatusCache，跨会话的链接状态缓存；未过期的结果直接使用，
+                过期的用 If-None-Match / If-Modified-Since 条件请求重新验证
+            max_retries: 收到 429 / 503 时，按 Retry-After（没有时指数退避）等待后重试的次数
+            shared_session: 使用当前事件循环的共享会话（见 core.http），连接和 DNS 缓存跨扫描复用；
+                为 False 时使用独立会话，退出时关闭。为 None 时只在有所有者负责关闭共享会话的
+                事件循环（浏览器池）中使用共享会话
+            host_limiter: AdaptiveHostLimiter，默认使用当前事件循环共享的限流器（core.ratelimit.get_host_limiter），
+                同时扫描的各个页面对同一主机共用并发名额，一个页面遇到的 Retry-After 暂停对其他页面同样生效
+        """
         self.timeout = timeout
         self.session = None
+        self.shared_session = shared_session
+        self._owns_session = False
+        self.known_responses = known_responses or {}
+        self.known_hits = 0  # 直接使用已记录响应的次数
+        self.dedup_hits = 0  # 与已验证（或正在验证）的地址重复、直接复用结果的次数
+        self.link_cache = link_cache
+        self.cache_hits = 0  # 直接使用未过期缓存的次数
+        self.revalidated = 0  # 条件请求返回 304、沿用缓存结果的次数
+        self._results = {}  # 规范化 URL -> 验证任务，同一验证器内每个地址只验证一次
+        self.offline = offline
+        self.on_result = on_result
+        self.max_retries = max_retries
+        self.retries = 0  # 被限流后重试的次数
+        self.per_host = per_host
+        self.host_limiter = host_limiter
+        self._global_limit = asyncio.Semaphore(max_concurrent)
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        # 添加真实浏览器请求头,避免403错误
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.timeout),
-            headers=headers
-        )
+        # 会话在第一次真正发起请求时获取，离线回放或全部命中缓存时不建立连接
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """异步上下文管理器出口"""
-        if self.session:
+        """异步上下文管理器出口（共享会话不关闭，留给后续扫描复用）"""
+        if self.session and self._owns_session:
             await self.session.close()
+        self.session = None
+        self._owns_session = False
     
     async def validate_link(self, url, base_url=None):
         """
         验证链接可用性
+
+        规范化后相同的地址（相对 / 绝对写法、主机名大小写、#片段、默认端口不同）只验证一次，
+        并发的重复调用等待同一个请求的结果。
         
         Args:
             url: 目标 URL
@@ -51,10 +83,6 @@ class ElementValidator:
                 'error': str
             }
         """
-        # 处理相对路径
-        if base_url and not url.startswith(('http://', 'https://', '//')):
-            url = urljoin(base_url, url)
-        
         # 跳过特殊协议
         if url.startswith(('javascript:', 'mailto:', 'tel:', '#')):
             return {
@@ -63,30 +91,161 @@ class ElementValidator:
                 'response_time': 0,
                 'error': 'Non-HTTP protocol'
             }
+
+        # 相对路径和协议相对地址（//cdn.example.com/x）都按基础 URL 解析，请求解析后的绝对地址
+        if base_url:
+            url = urljoin(base_url, url)
+
+        normalized = normalize_url(url)
+        if normalized is None:
+            return await self._check_link(url, base_url, None)
+        task = self._results.get(normalized)
+        if task is None:
+            task = asyncio.ensure_future(self._check_link(url, base_url, normalized))
+            self._results[normalized] = task
+        else:
+            self.dedup_hits += 1
+        # shield：某个调用方被取消时不影响共享同一结果的其他调用方
+        return dict(await asyncio.shield(task))
+
+    async def _check_link(self, url, base_url, normalized):
+        """验证一个地址：优先使用已记录的响应，否则在限流下发起请求"""
+        # 浏览器在页面加载时已请求过该地址，直接使用记录的结果
+        known = self.known_responses.get(normalized)
+        if known:
+            self.known_hits += 1
+            return {
+                'valid': 200 <= known['status_code'] < 400,
+                'status_code': known['status_code'],
+                'response_time': known.get('response_time') or 0,
+                'error': None
+            }
+        
+        if self.offline:
+            return {
+                'valid': None,
+                'status_code': None,
+                'response_time': 0,
+                'error': 'Not in recording'
+            }
         
+        cached = self.link_cache.lookup(normalized) if self.link_cache and normalized else None
+        if cached and cached['fresh']:
+            self.cache_hits += 1
+            result = self._cached_result(cached)
+        else:
+            conditional = {}
+            if cached and cached.get('etag'):
+                conditional['If-None-Match'] = cached['etag']
+            if cached and cached.get('last_modified'):
+                conditional['If-Modified-Since'] = cached['last_modified']
+            result = await self._request_with_backoff(url, base_url, conditional)
+            etag, last_modified = result.pop('etag', None), result.pop('last_modified', None)
+            # 限流响应不代表链接本身的状态，不写入缓存
+            if self.link_cache and normalized and result['status_code'] not in THROTTLE_STATUSES:
+                if result['status_code'] == 304 and cached:
+                    # 未变化：沿用缓存的状态，只刷新检查时间
+                    self.revalidated += 1
+                    self.link_cache.touch(normalized)
+                    result = dict(self._cached_result(cached), response_time=result['response_time'])
+                else:
+                    self.link_cache.store(normalized, result, etag, last_modified)
+        if self.on_result and normalized:
+            self.on_result(normalized, result)
+        return result
+
+    @staticmethod
+    def _cached_result(cached):
+        return {
+            'valid': 200 <= cached['status_code'] < 400,
+            'status_code': cached['status_code'],
+            'response_time': cached.get('response_time') or 0,
+            'error': None
+        }
+    
+    async def _request_with_backoff(self, url, base_url, conditional):
+        """
+        在限流下请求链接；429 / 503 时等待该主机的暂停结束后重试
+
+        重试用尽后仍为 429 时，结果记为无法判断（valid 为 None），而不是链接失效。
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self._limit(url) as ticket:
+                result = await self._request_link(url, base_url, conditional)
+                retry_after = parse_retry_after(result.pop('retry_after', None))
+                ticket.report(result['status_code'], result['response_time'],
+                              timeout=result['error'] == 'Timeout', retry_after=retry_after)
+            if result['status_code'] not in THROTTLE_STATUSES or attempt == self.max_retries:
+                break
+            if retry_after is not None and retry_after > self._get_host_limiter().max_backoff:
+                # 服务器要求等待的时间过长，不再重试
+                break
+            self.retries += 1
+
+        if result['status_code'] == 429:
+            result.update(valid=None, error='Rate limited (429)')
+        return result
+
+    @asynccontextmanager
+    async def _limit(self, url):
+        """占用一个请求名额：先占主机名额，再占全局名额（等待主机名额时不占用全局名额）"""
+        host = urlsplit(url).netloc.lower()
+        async with self._get_host_limiter().slot(host, max_limit=self.per_host) as ticket:
+            async with self._global_limit:
+                yield ticket
+
+    def _get_host_limiter(self):
+        if self.host_limiter is None:
+            self.host_limiter = get_host_limiter()
+        return self.host_limiter
+
+    def _get_session(self):
+        if self.session is None:
+            shared = self.shared_session
+            if shared is None:
+                shared = has_http_owner()
+            if shared:
+                self.session = get_http_session()
+            else:
+                # 添加真实浏览器请求头,避免403错误
+                self.session = aiohttp.ClientSession(headers=BROWSER_HEADERS)
+                self._owns_session = True
+        return self.session
+
+    async def _request_link(self, url, base_url, conditional=None):
+        """
+        在线请求链接（HEAD 优先，403/405 时回退 GET）
+
+        conditional 为条件请求头；结果中附带响应的 etag、last_modified（供缓存使用）和 retry_after
+        """
         try:
             start_time = asyncio.get_event_loop().time()
             
             # 添加Referer头以模拟真实浏览器行为
-            extra_headers = {}
+            extra_headers = dict(conditional or {})
             if base_url:
                 extra_headers['Referer'] = base_url
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            session = self._get_session()
             
             # 首先尝试 HEAD 请求减少开销
-            async with self.session.head(url, allow_redirects=True, headers=extra_headers) as response:
+            async with session.head(url, allow_redirects=True, headers=extra_headers, timeout=timeout) as response:
                 response_time = asyncio.get_event_loop().time() - start_time
                 
                 # 如果HEAD请求返回403或405(Method Not Allowed),尝试GET请求
                 if response.status in [403, 405]:
                     try:
                         start_time = asyncio.get_event_loop().time()
-                        async with self.session.get(url, allow_redirects=True, headers=extra_headers) as get_response:
+                        async with session.get(url, allow_redirects=True, headers=extra_headers, timeout=timeout) as get_response:
                             response_time = asyncio.get_event_loop().time() - start_time
                             return {
                                 'valid': 200 <= get_response.status < 400,
                                 'status_code': get_response.status,
                                 'response_time': round(response_time, 3),
-                                'error': None
+                                'error': None,
+                                'etag': get_response.headers.get('ETag'),
+                                'last_modified': get_response.headers.get('Last-Modified'),
+                                'retry_after': get_response.headers.get('Retry-After'),
                             }
                     except Exception:
                         # GET请求也失败,返回HEAD的结果
@@ -96,7 +255,10 @@ class ElementValidator:
                     'valid': 200 <= response.status < 400,
                     'status_code': response.status,
                     'response_time': round(response_time, 3),
-                    'error': None
+                    'error': None,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'retry_after': response.headers.get('Retry-After'),
                 }
         except asyncio.TimeoutError:
             return {
@@ -174,23 +336,25 @@ class ElementValidator:
                 'error': str(e)
             }
     
-    async def batch_validate_links(self, links, base_url=None, max_concurrent=10):
+    async def batch_validate_links(self, links, base_url=None, max_concurrent=None):
         """
-        批量验证链接
+        批量并发验证链接（并发数受验证器的 max_concurrent 和 per_host 限制）
         
         Args:
             links: URL 列表
             base_url: 基础 URL
-            max_concurrent: 最大并发数
+            max_concurrent: 本批最大并发数（在验证器自身的限制之外再加一层），为 None 时不另加限制
         
         Returns:
-            list: 验证结果列表
+            list: 验证结果列表（与 links 顺序一致）
         """
+        if max_concurrent is None:
+            return await asyncio.gather(*(self.validate_link(link, base_url) for link in links))
+
         semaphore = asyncio.Semaphore(max_concurrent)
-        
+
         async def validate_with_semaphore(url):
             async with semaphore:
                 return await self.validate_link(url, base_url)
-        
-        tasks = [validate_with_semaphore(link) for link in links]
-        return await asyncio.gather(*tasks)
+
+        return await asyncio.gather(*(validate_with_semaphore(link) for link in links))
@@ -0,0 +1,89 @@
+"""
+链接状态缓存
+
+定时任务每次执行都要验证同一批外部链接，而这些链接很少变化。LinkStatusCache 把链接的状态码、
+ETag、Last-Modified 和检查时间按规范化 URL 存入 LinkStatus 表，跨会话共享：
+未过期的记录直接使用，不发起请求；过期的记录由 ElementValidator 带上
+If-None-Match / If-Modified-Since 重新验证，服务器返回 304 时只刷新检查时间。
+"""
+
+import datetime
+from data.models import LinkStatus, init_db
+
+# 各状态类别的有效期（秒）：正常链接很少变化，错误可能很快恢复
+DEFAULT_TTLS = {
+    2: 24 * 3600,
+    3: 24 * 3600,
+    4: 3600,
+    5: 600,
+}
+
+
+class LinkStatusCache:
+    """
+    跨会话的链接状态缓存
+
+    Args:
+        ttls: {状态类别（2/3/4/5）: 有效期秒数}，覆盖 DEFAULT_TTLS 中的对应项；
+            有效期为 0 的类别不缓存
+    """
+
+    def __init__(self, ttls=None):
+        init_db()
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+
+    def ttl_for(self, status_code):
+        """状态码对应的有效期（秒）"""
+        return self.ttls.get(status_code // 100, 0)
+
+    def lookup(self, url):
+        """
+        查询缓存
+
+        Args:
+            url: 规范化后的地址
+
+        Returns:
+            dict: {'status_code', 'response_time', 'etag', 'last_modified', 'checked_at', 'fresh'}；
+                没有记录时返回 None
+        """
+        entry = LinkStatus.get_or_none(LinkStatus.url == url)
+        if entry is None:
+            return None
+        age = (datetime.datetime.now() - entry.checked_at).total_seconds()
+        return {
+            'status_code': entry.status_code,
+            'response_time': entry.response_time,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'checked_at': entry.checked_at,
+            'fresh': age < self.ttl_for(entry.status_code),
+        }
+
+    def store(self, url, result, etag=None, last_modified=None):
+        """保存一次在线验证的结果（没有状态码的超时 / 连接错误不缓存）"""
+        status = result.get('status_code')
+        if status is None or status == 304 or not self.ttl_for(status):
+            return
+        LinkStatus.insert(
+            url=url,
+            status_code=status,
+            response_time=result.get('response_time'),
+            etag=etag,
+            last_modified=last_modified,
+            checked_at=datetime.datetime.now(),
+        ).on_conflict(
+            conflict_target=[LinkStatus.url],
+            preserve=[LinkStatus.status_code, LinkStatus.response_time, LinkStatus.etag,
+                      LinkStatus.last_modified, LinkStatus.checked_at],
+        ).execute()
+
+    def touch(self, url):
+        """条件请求返回 304：状态未变，刷新检查时间"""
+        LinkStatus.update(checked_at=datetime.datetime.now()).where(LinkStatus.url == url).execute()
+
+    def purge(self, older_than_days=30):
+        """删除长期未检查的记录，返回删除的条数"""
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+        return LinkStatus.delete().where(LinkStatus.checked_at < cutoff).execute()
@@ -1,5 +1,6 @@
 from peewee import *
 import datetime
+from core.rules import BUTTON_KINDS
 
 db = SqliteDatabase('aichecker.db')
 
@@ -7,11 +8,23 @@ class BaseModel(Model):
     class Meta:
         database = db
 
+class CrawlSession(BaseModel):
+    """整站爬取记录，每个被扫描的页面对应一个 ScanSession"""
+    seed_url = CharField()
+    start_time = DateTimeField(default=datetime.datetime.now)
+    end_time = DateTimeField(null=True)
+    status = CharField(default='pending') # pending, completed, failed
+    max_depth = IntegerField(default=2)
+    max_pages = IntegerField(default=100)
+    pages_scanned = IntegerField(default=0)
+
 class ScanSession(BaseModel):
     url = CharField()
     start_time = DateTimeField(default=datetime.datetime.now)
     end_time = DateTimeField(null=True)
     status = CharField(default='pending') # pending, completed, failed
+    crawl = ForeignKeyField(CrawlSession, null=True, backref='pages')  # 所属的整站爬取（单页扫描为空）
+    depth = IntegerField(null=True)  # 距种子页面的链接层数
     
     def get_element_count(self):
         """获取此会话的元素总数"""
@@ -34,7 +47,11 @@ class ScanSession(BaseModel):
         ).count()
         
         # 统计按钮状态
-        buttons = self.elements.where(PageElement.type.in_(['button', 'input']))
+        # 表单控件同为 input 标签，按规则名区分；旧数据没有 kind 时按标签判断
+        buttons = self.elements.where(
+            PageElement.kind.in_(BUTTON_KINDS) |
+            (PageElement.kind.is_null() & PageElement.type.in_(['button', 'input']))
+        )
         button_total = buttons.count()
         button_clickable = buttons.where(PageElement.clickable == True).count()
         
@@ -59,11 +76,20 @@ class ScanSession(BaseModel):
 class PageElement(BaseModel):
     session = ForeignKeyField(ScanSession, backref='elements')
     type = CharField() # a, button, etc.
+    kind = CharField(null=True)  # 命中的检测规则名称（link, button, form_input 等）
+    attributes = TextField(null=True)  # 规则提取器返回的附加属性（JSON）
     text = TextField(null=True)
     href = TextField(null=True)
     element_id = CharField(null=True)
     class_name = CharField(null=True)
     selector = CharField()
+    matched_selectors = TextField(null=True)  # 命中该元素的全部选择器（JSON 数组，选择器本身可能含逗号）
+    unique_selector = TextField(null=True)  # 唯一定位该元素的 CSS 路径
+    element_index = IntegerField(null=True)  # 元素在 selector 匹配结果中的序号
+    frame_url = TextField(null=True)  # 元素所在 frame 的 URL
+    frame_path = CharField(null=True)  # 元素所在 frame 在 frame 树中的位置（各层子 frame 序号，主 frame 为空）
+    shadow_path = TextField(null=True)  # shadow host 路径（不在 shadow DOM 中时为空）
+    fingerprint = CharField(null=True, index=True)  # 跨会话识别同一元素的指纹
     visible = BooleanField(default=True)
     screenshot_path = CharField(null=True)
     created_at = DateTimeField(default=datetime.datetime.now)
@@ -81,6 +107,46 @@ class PageElement(BaseModel):
     clickable = BooleanField(null=True)  # 是否可点击
     enabled = BooleanField(null=True)  # 是否启用
 
+class NetworkResponse(BaseModel):
+    """页面加载期间浏览器收到的响应，链接验证时优先查此表"""
+    session = ForeignKeyField(ScanSession, backref='responses')
+    url = TextField(index=True)  # 规范化后的请求地址
+    final_url = TextField(null=True)  # 重定向后的最终地址
+    status_code = IntegerField()
+    response_time = FloatField(null=True)  # 到收到响应头的耗时（秒）
+    resource_type = CharField(null=True)  # document / script / image 等
+    redirect_chain = TextField(null=True)  # 重定向经过的地址（JSON 数组）
+    created_at = DateTimeField(default=datetime.datetime.now)
+
+class PageMetrics(BaseModel):
+    """页面性能指标（时间为相对导航开始的毫秒数，大小为字节），见 core.metrics"""
+    session = ForeignKeyField(ScanSession, backref='metrics', unique=True)
+    navigation_type = CharField(null=True)  # navigate / reload / back_forward
+    dns_time = FloatField(null=True)  # DNS 解析耗时
+    connect_time = FloatField(null=True)  # TCP/TLS 连接耗时
+    ttfb = FloatField(null=True)  # 收到文档首字节
+    response_end = FloatField(null=True)  # 文档下载完成
+    dom_interactive = FloatField(null=True)
+    dom_content_loaded = FloatField(null=True)  # DOMContentLoaded 事件结束
+    load_event = FloatField(null=True)  # load 事件结束（就绪时尚未触发则为空）
+    first_paint = FloatField(null=True)
+    first_contentful_paint = FloatField(null=True)
+    largest_contentful_paint = FloatField(null=True)
+    document_transfer_size = IntegerField(null=True)  # 文档传输字节数
+    total_transfer_size = IntegerField(null=True)  # 文档与全部资源的传输字节数
+    total_decoded_size = IntegerField(null=True)  # 解压后的总字节数
+    resource_count = IntegerField(null=True)  # 资源请求数
+    created_at = DateTimeField(default=datetime.datetime.now)
+
+class LinkStatus(BaseModel):
+    """跨会话的链接状态缓存（见 data.link_cache）"""
+    url = TextField(unique=True)  # 规范化后的地址
+    status_code = IntegerField()
+    response_time = FloatField(null=True)
+    etag = TextField(null=True)  # 响应的 ETag，用于 If-None-Match
+    last_modified = CharField(null=True)  # 响应的 Last-Modified，用于 If-Modified-Since
+    checked_at = DateTimeField(default=datetime.datetime.now)  # 最近一次确认状态的时间
+
 class AIReport(BaseModel):
     session = ForeignKeyField(ScanSession, backref='reports', null=True)
     element = ForeignKeyField(PageElement, backref='reports', null=True)
@@ -101,6 +167,14 @@ class ScheduledTask(BaseModel):
     # 扫描选项
     enable_validation = BooleanField(default=False)  # 是否启用验证
     generate_ai_report = BooleanField(default=False)  # 是否生成AI报告
+    capture_screenshots = BooleanField(default=False)  # 是否保存元素截图
+    detection_profile = CharField(default='full')  # 检测档位: full / visible / viewport
+    incremental_scrolls = IntegerField(default=0)  # 滚动增量检测屏数，0 表示关闭
+    block_profile = CharField(default='none')  # 资源拦截档位: none / media / media_fonts / first_party
+    readiness = CharField(default='networkidle')  # 页面就绪策略，见 core.readiness
+    readiness_selector = CharField(null=True)  # selector 策略等待的选择器
+    quiet_ms = IntegerField(default=500)  # dom_quiet 策略要求的静默时长（毫秒）
+    load_timeout = IntegerField(default=30)  # 页面加载超时（秒）
     
     # 执行记录
     last_run_time = DateTimeField(null=True)  # 最后执行时间
@@ -109,14 +183,18 @@ class ScheduledTask(BaseModel):
     
     created_at = DateTimeField(default=datetime.datetime.now)
 
+# 所有数据表，按外键依赖排序
+MODELS = [CrawlSession, ScanSession, PageElement, NetworkResponse, PageMetrics, LinkStatus, AIReport, ScheduledTask]
+
+
 def init_db():
     # 检查数据库是否已连接，避免重复连接
     if not db.is_closed():
         # 数据库已连接，只需确保表存在
-        db.create_tables([ScanSession, PageElement, AIReport, ScheduledTask], safe=True)
+        db.create_tables(MODELS, safe=True)
     else:
         # 数据库未连接，先连接再创建表
         db.connect()
-        db.create_tables([ScanSession, PageElement, AIReport, ScheduledTask], safe=True)
+        db.create_tables(MODELS, safe=True)
 
 
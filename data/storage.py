@@ -1,12 +1,14 @@
-from data.models import db, ScanSession, PageElement, AIReport, init_db
+from peewee import chunked
+from data.models import db, CrawlSession, ScanSession, PageElement, NetworkResponse, PageMetrics, AIReport, init_db
 import datetime
+import json
 
 class StorageManager:
     def __init__(self):
         init_db()
 
-    def create_session(self, url):
-        return ScanSession.create(url=url)
+    def create_session(self, url, crawl_id=None, depth=None):
+        return ScanSession.create(url=url, crawl_id=crawl_id, depth=depth)
 
     def complete_session(self, session_id, status='completed'):
         session = ScanSession.get_by_id(session_id)
@@ -15,24 +17,110 @@ class StorageManager:
         session.save()
         return session
 
+    def create_crawl(self, seed_url, max_depth=2, max_pages=100):
+        return CrawlSession.create(seed_url=seed_url, max_depth=max_depth, max_pages=max_pages)
+
+    def complete_crawl(self, crawl_id, pages_scanned, status='completed'):
+        crawl = CrawlSession.get_by_id(crawl_id)
+        crawl.end_time = datetime.datetime.now()
+        crawl.pages_scanned = pages_scanned
+        crawl.status = status
+        crawl.save()
+        return crawl
+
+    def get_crawl_pages(self, crawl_id):
+        """获取整站爬取中各页面的扫描会话（按层数、开始时间排序）"""
+        return (ScanSession
+                .select()
+                .where(ScanSession.crawl == crawl_id)
+                .order_by(ScanSession.depth, ScanSession.start_time))
+
     def save_elements(self, session_id, elements_data):
         """
         Bulk save detected elements.
         elements_data: list of dicts from ElementDetector
+        返回新建的 PageElement 列表，便于流式检测时直接交给验证阶段
         """
+        saved = []
         with db.atomic():
             for el_data in elements_data:
-                PageElement.create(
+                element = PageElement.create(
                     session_id=session_id,
                     type=el_data.get('type'),
+                    kind=el_data.get('kind'),
+                    attributes=json.dumps(el_data['attributes'], ensure_ascii=False)
+                    if el_data.get('attributes') else None,
                     text=el_data.get('text'),
                     href=el_data.get('href'),
                     element_id=el_data.get('id'),
                     class_name=el_data.get('class'),
                     selector=el_data.get('selector'),
+                    matched_selectors=json.dumps(el_data['selectors'], ensure_ascii=False)
+                    if el_data.get('selectors') else None,
+                    unique_selector=el_data.get('unique_selector'),
+                    element_index=el_data.get('index'),
+                    frame_url=el_data.get('frame_url'),
+                    frame_path=el_data.get('frame_path'),
+                    shadow_path=el_data.get('shadow_path'),
+                    fingerprint=el_data.get('fingerprint'),
                     visible=el_data.get('visible', True),
                     screenshot_path=el_data.get('screenshot_path')
                 )
+                saved.append(element)
+        return saved
+
+    def save_network_responses(self, session_id, records):
+        """批量保存 ResponseRecorder 记录的网络响应"""
+        rows = [{
+            'session': session_id,
+            'url': record['url'],
+            'final_url': record.get('final_url'),
+            'status_code': record['status_code'],
+            'response_time': record.get('response_time'),
+            'resource_type': record.get('resource_type'),
+            'redirect_chain': json.dumps(record['redirect_chain']) if record.get('redirect_chain') else None,
+        } for record in records]
+        with db.atomic():
+            for batch in chunked(rows, 100):
+                NetworkResponse.insert_many(batch).execute()
+        return len(rows)
+
+    def get_network_responses(self, session_id):
+        """获取会话中记录的网络响应，返回 {规范化 URL: 响应字典}"""
+        query = NetworkResponse.select().where(NetworkResponse.session == session_id)
+        return {
+            r.url: {
+                'url': r.url,
+                'final_url': r.final_url,
+                'status_code': r.status_code,
+                'response_time': r.response_time,
+                'resource_type': r.resource_type,
+                'redirect_chain': json.loads(r.redirect_chain) if r.redirect_chain else None,
+            }
+            for r in query
+        }
+
+    def save_page_metrics(self, session_id, metrics):
+        """保存页面性能指标（core.metrics.collect_page_metrics 的结果）"""
+        from core.metrics import METRIC_FIELDS
+        return PageMetrics.create(session=session_id, **{key: metrics.get(key) for key in METRIC_FIELDS})
+
+    def get_page_metrics(self, session_id):
+        """获取会话的页面性能指标，未记录时返回 None"""
+        return PageMetrics.get_or_none(PageMetrics.session == session_id)
+
+    def get_metrics_history(self, url, limit=50):
+        """
+        获取同一 URL 历次扫描的性能指标（最新的在前），用于发现页面变慢
+
+        Returns:
+            list: PageMetrics 对象列表（session 已预加载）
+        """
+        return (PageMetrics.select(PageMetrics, ScanSession)
+                .join(ScanSession)
+                .where(ScanSession.url == url)
+                .order_by(ScanSession.start_time.desc(), ScanSession.id.desc())
+                .limit(limit))
 
     def get_recent_sessions(self, limit=10):
         return ScanSession.select().order_by(ScanSession.start_time.desc()).limit(limit)
@@ -40,6 +128,22 @@ class StorageManager:
     def get_elements_by_session(self, session_id):
         return PageElement.select().where(PageElement.session == session_id)
     
+    def get_element_history(self, fingerprint, limit=50):
+        """
+        按指纹获取同一元素在各次扫描中的记录（最新的在前）
+        
+        Args:
+            fingerprint: 元素指纹
+            limit: 最多返回的记录数
+            
+        Returns:
+            list: PageElement 对象列表
+        """
+        return (PageElement.select()
+                .where(PageElement.fingerprint == fingerprint)
+                .order_by(PageElement.session.desc())
+                .limit(limit))
+    
     def save_report(self, content, session_id=None, element_id=None):
         return AIReport.create(
             content=content,
@@ -56,25 +160,41 @@ class StorageManager:
             validation_data: 验证结果字典
         """
         element = PageElement.get_by_id(element_id)
-        element.validated = True
-        element.validation_time = datetime.datetime.now()
-        
+        for field, value in self._validation_fields(validation_data).items():
+            setattr(element, field, value)
+        element.save()
+        return element
+
+    def update_validation_groups(self, groups):
+        """
+        把同一个验证结果批量写入多个元素（同一地址的链接共享一次验证）
+
+        Args:
+            groups: [(element_ids, validation_data), ...]，每组一条 UPDATE ... WHERE id IN (...)
+        """
+        with db.atomic():
+            for element_ids, validation_data in groups:
+                fields = self._validation_fields(validation_data)
+                for batch in chunked(element_ids, 500):
+                    PageElement.update(fields).where(PageElement.id.in_(batch)).execute()
+
+    @staticmethod
+    def _validation_fields(validation_data):
+        """验证结果字典 -> PageElement 字段"""
+        fields = {'validated': True, 'validation_time': datetime.datetime.now()}
         # 链接验证结果
         if 'status_code' in validation_data:
-            element.status_code = validation_data['status_code']
+            fields['status_code'] = validation_data['status_code']
         if 'response_time' in validation_data:
-            element.response_time = validation_data['response_time']
+            fields['response_time'] = validation_data['response_time']
         if 'error' in validation_data:
-            element.validation_error = validation_data['error']
-        
+            fields['validation_error'] = validation_data['error']
         # 按钮验证结果
         if 'clickable' in validation_data:
-            element.clickable = validation_data['clickable']
+            fields['clickable'] = validation_data['clickable']
         if 'enabled' in validation_data:
-            element.enabled = validation_data['enabled']
-        
-        element.save()
-        return element
+            fields['enabled'] = validation_data['enabled']
+        return fields
     
     def batch_update_validations(self, validations):
         """
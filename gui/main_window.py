@@ -3,15 +3,20 @@ from PySide6.QtCore import Qt
 from gui.views import DashboardView, ScanView, ScanHistoryView, AIAnalysisView
 from gui.scheduled_view import ScheduledScanView
 from core.scheduler import TaskScheduler
+from core.browser_pool import shutdown_browser_pool
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, pool_options=None):
+        """
+        Args:
+            pool_options: 浏览器池参数（见 core.browser_pool.pool_options_from_env），手动扫描与定时任务共用
+        """
         super().__init__()
         self.setWindowTitle("AIChecker - 智能网页巡检")
         self.resize(1200, 800)
         
         # 初始化调度器
-        self.scheduler = TaskScheduler()
+        self.scheduler = TaskScheduler(pool_options=pool_options)
         self.scheduler.start()
         
         # Central Widget
@@ -100,7 +105,8 @@ class MainWindow(QMainWindow):
         self.stack.setCurrentWidget(self.scheduled_view)
     
     def closeEvent(self, event):
-        """关闭窗口时停止调度器"""
+        """关闭窗口时停止调度器并关闭浏览器池"""
         self.scheduler.stop()
+        shutdown_browser_pool()
         event.accept()
 
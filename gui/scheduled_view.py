@@ -5,11 +5,13 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                                QTableWidget, QTableWidgetItem, QHeaderView, QDialog,
                                QLineEdit, QRadioButton, QButtonGroup, QCheckBox, QSpinBox,
-                               QMessageBox, QFormLayout)
+                               QMessageBox, QFormLayout, QComboBox)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
 from data.models import ScheduledTask
 from data.storage import StorageManager
+from gui.views import DETECTION_PROFILES, BLOCK_PROFILES, READINESS_STRATEGIES
+from core.readiness import make_readiness
 import datetime
 
 
@@ -261,10 +263,49 @@ class TaskEditDialog(QDialog):
         options_layout = QVBoxLayout(options_group)
         self.check_validation = QCheckBox("启用元素验证")
         self.check_ai_report = QCheckBox("自动生成AI报告")
+        self.check_screenshots = QCheckBox("保存元素截图")
         options_layout.addWidget(self.check_validation)
         options_layout.addWidget(self.check_ai_report)
+        options_layout.addWidget(self.check_screenshots)
         layout.addRow("扫描选项:", options_group)
         
+        # 检测档位
+        self.profile_combo = QComboBox()
+        for label, profile in DETECTION_PROFILES:
+            self.profile_combo.addItem(label, profile)
+        layout.addRow("检测范围:", self.profile_combo)
+        
+        # 资源拦截
+        self.block_combo = QComboBox()
+        for label, profile in BLOCK_PROFILES:
+            self.block_combo.addItem(label, profile)
+        layout.addRow("资源拦截:", self.block_combo)
+        
+        # 页面就绪策略
+        self.readiness_combo = QComboBox()
+        for label, strategy in READINESS_STRATEGIES:
+            self.readiness_combo.addItem(label, strategy)
+        layout.addRow("页面就绪判定:", self.readiness_combo)
+        self.readiness_selector_input = QLineEdit()
+        self.readiness_selector_input.setPlaceholderText("“指定选择器出现”时填写，如 #main")
+        layout.addRow("等待选择器:", self.readiness_selector_input)
+        self.quiet_ms_input = QSpinBox()
+        self.quiet_ms_input.setRange(100, 10000)
+        self.quiet_ms_input.setSingleStep(100)
+        self.quiet_ms_input.setValue(500)
+        layout.addRow("DOM 静默时长(毫秒):", self.quiet_ms_input)
+        self.load_timeout_input = QSpinBox()
+        self.load_timeout_input.setRange(5, 300)
+        self.load_timeout_input.setValue(30)
+        layout.addRow("页面加载超时(秒):", self.load_timeout_input)
+        
+        # 增量检测
+        self.scrolls_input = QSpinBox()
+        self.scrolls_input.setRange(0, 100)
+        self.scrolls_input.setValue(0)
+        self.scrolls_input.setToolTip("全量检测后继续逐屏滚动，捕获懒加载内容；0 表示关闭")
+        layout.addRow("滚动增量检测屏数:", self.scrolls_input)
+        
         # 如果是编辑模式，填充数据
         if task:
             if task.schedule_type == 'interval':
@@ -276,6 +317,14 @@ class TaskEditDialog(QDialog):
             
             self.check_validation.setChecked(task.enable_validation)
             self.check_ai_report.setChecked(task.generate_ai_report)
+            self.check_screenshots.setChecked(task.capture_screenshots)
+            self.profile_combo.setCurrentIndex(max(0, self.profile_combo.findData(task.detection_profile)))
+            self.scrolls_input.setValue(task.incremental_scrolls)
+            self.block_combo.setCurrentIndex(max(0, self.block_combo.findData(task.block_profile)))
+            self.readiness_combo.setCurrentIndex(max(0, self.readiness_combo.findData(task.readiness)))
+            self.readiness_selector_input.setText(task.readiness_selector or '')
+            self.quiet_ms_input.setValue(task.quiet_ms)
+            self.load_timeout_input.setValue(task.load_timeout)
         else:
             self.radio_interval.setChecked(True)
         
@@ -289,6 +338,16 @@ class TaskEditDialog(QDialog):
         btn_layout.addWidget(btn_cancel)
         layout.addRow("", btn_layout)
     
+    def accept(self):
+        """保存前检查就绪策略，避免保存每次执行都会失败的任务"""
+        try:
+            make_readiness(self.readiness_combo.currentData(),
+                           selector=self.readiness_selector_input.text().strip())
+        except ValueError:
+            QMessageBox.warning(self, "提示", "“指定选择器出现”需要填写等待选择器")
+            return
+        super().accept()
+    
     def get_task_data(self):
         """获取任务数据"""
         data = {
@@ -296,6 +355,14 @@ class TaskEditDialog(QDialog):
             'url': self.url_input.text(),
             'enable_validation': self.check_validation.isChecked(),
             'generate_ai_report': self.check_ai_report.isChecked(),
+            'capture_screenshots': self.check_screenshots.isChecked(),
+            'detection_profile': self.profile_combo.currentData(),
+            'incremental_scrolls': self.scrolls_input.value(),
+            'block_profile': self.block_combo.currentData(),
+            'readiness': self.readiness_combo.currentData(),
+            'readiness_selector': self.readiness_selector_input.text().strip() or None,
+            'quiet_ms': self.quiet_ms_input.value(),
+            'load_timeout': self.load_timeout_input.value(),
         }
         
         if self.radio_interval.isChecked():
@@ -1,12 +1,52 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, 
                                QTableWidget, QTableWidgetItem, QHeaderView, QTextEdit, QProgressBar)
 from PySide6.QtCore import Qt, QThread, Signal
-import asyncio
+import os
+from urllib.parse import urlparse
 from core.scanner import PageScanner
+from core.browser_pool import get_browser_pool
 from core.detector import ElementDetector
+from core.readiness import make_readiness
+from core.pipeline import ScanPipeline
+from core.crawler import SiteCrawler
+from core.sharding import ShardedCrawler
+from core.har import HarArchive
+from core.metrics import format_metrics
 from data.storage import StorageManager
+from data.link_cache import LinkStatusCache
 from ai.client import AIClient
 
+# 检测档位（显示名称, ElementDetector 的 profile 参数）
+DETECTION_PROFILES = [
+    ("完整检测", "full"),
+    ("仅可见元素", "visible"),
+    ("仅首屏可见元素（冒烟检查）", "viewport"),
+]
+
+# 资源拦截档位（显示名称, PageScanner 的 block_profile 参数）
+BLOCK_PROFILES = [
+    ("不拦截", "none"),
+    ("拦截图片和视频", "media"),
+    ("拦截图片、视频和字体", "media_fonts"),
+    ("仅加载第一方请求", "first_party"),
+]
+
+# 页面就绪策略（显示名称, make_readiness 的 name 参数）
+READINESS_STRATEGIES = [
+    ("网络空闲 (networkidle)", "networkidle"),
+    ("load 事件", "load"),
+    ("DOM 解析完成 (domcontentloaded)", "domcontentloaded"),
+    ("DOM 静默一段时间", "dom_quiet"),
+    ("指定选择器出现", "selector"),
+]
+
+# HAR 录制 / 回放（显示名称, HarArchive 的 mode 参数）
+HAR_MODES = [
+    ("不使用", None),
+    ("录制到 HAR", "record"),
+    ("从 HAR 回放（离线）", "replay"),
+]
+
 class DashboardView(QWidget):
     def __init__(self):
         super().__init__()
@@ -19,98 +59,99 @@ class ScanWorker(QThread):
     finished = Signal(object)
     log = Signal(str)
 
-    def __init__(self, url, enable_validation=False):
+    def __init__(self, url, enable_validation=False, capture_screenshots=False, detection_profile='full',
+                 incremental_scrolls=0, block_profile='none', readiness=None, har_mode=None, har_path=None):
         super().__init__()
         self.url = url
         self.enable_validation = enable_validation
+        self.capture_screenshots = capture_screenshots
+        self.detection_profile = detection_profile
+        self.incremental_scrolls = incremental_scrolls
+        self.block_profile = block_profile
+        self.readiness = readiness
+        self.har_mode = har_mode
+        self.har_path = har_path
 
     def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(self._scan())
+        # 扫描协程在共享浏览器池的事件循环中执行，本线程只等待结果
+        try:
+            results = get_browser_pool().run(self._scan())
+        except Exception as e:
+            self.log.emit(f"扫描失败: {e}")
+            results = None
         self.finished.emit(results)
-        loop.close()
 
     async def _scan(self):
-        from core.validator import ElementValidator
-        
-        self.log.emit(f"正在启动扫描器: {self.url}")
-        scanner = PageScanner()
-        detector = ElementDetector()
+        self.log.emit(f"正在获取浏览器: {self.url}")
         storage = StorageManager()
-        
-        await scanner.start()
-        page = await scanner.scan(self.url)
-        
-        if not page:
-            self.log.emit("页面加载失败")
-            await scanner.stop()
-            return None
-            
-        self.log.emit("页面加载成功，正在检测元素...")
-        elements = await detector.detect(page)
-        self.log.emit(f"检测到 {len(elements)} 个元素")
-        
-        # Save to DB
-        session = storage.create_session(self.url)
-        storage.save_elements(session.id, elements)
-        
-        # 验证元素（如果启用）
-        if self.enable_validation:
-            self.log.emit("\n开始验证元素...")
-            await self._validate_elements(page, session.id, storage)
-        
-        storage.complete_session(session.id)
-        await scanner.stop()
-        return session.id
-    
-    async def _validate_elements(self, page, session_id, storage):
-        """验证元素的可用性"""
-        from core.validator import ElementValidator
-        
-        # 获取数据库中的元素
-        elements = storage.get_elements_by_session(session_id)
-        current_url = page.url
-        
-        async with ElementValidator() as validator:
-            # 验证链接
-            links = [el for el in elements if el.type == 'a' and el.href]
-            if links:
-                self.log.emit(f"验证 {len(links)} 个链接...")
-                for i, link in enumerate(links):
-                    result = await validator.validate_link(link.href, current_url)
-                    storage.update_element_validation(link.id, {
-                        'status_code': result['status_code'],
-                        'response_time': result['response_time'],
-                        'error': result['error']
-                    })
-                    if (i + 1) % 50 == 0:
-                        self.log.emit(f"  已验证 {i + 1}/{len(links)} 个链接")
-            
-            # 验证按钮
-            buttons = [el for el in elements if el.type in ['button', 'input']]
-            if buttons:
-                self.log.emit(f"验证 {len(buttons)} 个按钮...")
-                for i, btn in enumerate(buttons):
-                    try:
-                        # 重新定位元素
-                        handle = page.locator(btn.selector).first
-                        result = await validator.validate_button(page, handle)
-                        storage.update_element_validation(btn.id, {
-                            'clickable': result['clickable'],
-                            'enabled': result['enabled'],
-                            'error': result.get('error')
-                        })
-                    except Exception as e:
-                        storage.update_element_validation(btn.id, {
-                            'clickable': False,
-                            'enabled': False,
-                            'error': str(e)
-                        })
-                    if (i + 1) % 50 == 0:
-                        self.log.emit(f"  已验证 {i + 1}/{len(buttons)} 个按钮")
-        
-        self.log.emit("验证完成!")
+        har = HarArchive(self.har_path, self.har_mode) if self.har_mode else None
+
+        async with get_browser_pool().lease() as context:
+            scanner = PageScanner(context=context, block_profile=self.block_profile,
+                                  readiness=self.readiness, har=har)
+            async with scanner.open(self.url) as page:
+                if not page:
+                    self.log.emit("页面加载失败")
+                    return None
+
+                if scanner.ready is False:
+                    self.log.emit("等待页面就绪超时，按当前 DOM 继续检测")
+
+                if scanner.blocked:
+                    self.log.emit(f"已拦截 {scanner.blocked} 个资源请求")
+                if scanner.metrics:
+                    self.log.emit(f"页面性能: {format_metrics(scanner.metrics)}")
+                self.log.emit("页面加载成功，正在检测元素...")
+
+                # 检测、入库、验证（如果启用）以流水线方式并行进行
+                detector = ElementDetector(profile=self.detection_profile)
+                pipeline = ScanPipeline(storage, detector=detector, log=self.log.emit,
+                                        capture_screenshots=self.capture_screenshots,
+                                        incremental_scrolls=self.incremental_scrolls,
+                                        link_cache=LinkStatusCache())
+                session_id = await pipeline.run(page, self.url, self.enable_validation,
+                                                recorder=scanner.recorder, har=har, metrics=scanner.metrics)
+
+            stats = scanner.stats()
+            if stats['js_heap_bytes']:
+                self.log.emit(f"页面已关闭，关闭前 JS 堆占用 {stats['js_heap_bytes'] / 1048576:.1f} MB")
+
+        # HAR 在上下文关闭（归还租用）时写入，链接验证结果随后保存
+        if har:
+            har.save()
+            if har.recording:
+                self.log.emit(f"已录制到 {har.path}")
+
+        storage.complete_session(session_id)
+        return session_id
+
+class CrawlWorker(QThread):
+    """整站爬取：从种子 URL 出发并发扫描同源页面，processes > 1 时分片到多个工作进程"""
+    finished = Signal(object)
+    log = Signal(str)
+
+    def __init__(self, url, crawl_options, processes=1, **scan_options):
+        super().__init__()
+        self.url = url
+        self.crawl_options = crawl_options
+        self.processes = processes
+        self.scan_options = scan_options
+
+    def run(self):
+        try:
+            if self.processes > 1:
+                crawler = ShardedCrawler(StorageManager(), processes=self.processes, log=self.log.emit,
+                                         **self.crawl_options, **self.scan_options)
+                results = crawler.run(self.url)
+            else:
+                # 分片爬取的工作进程不写数据库，只有进程内爬取使用链接状态缓存
+                crawler = SiteCrawler(StorageManager(), log=self.log.emit, link_cache=LinkStatusCache(),
+                                      **self.crawl_options, **self.scan_options)
+                results = get_browser_pool().run(crawler.run(self.url))
+        except Exception as e:
+            self.log.emit(f"爬取失败: {e}")
+            results = None
+        self.finished.emit(results)
 
 class ScanView(QWidget):
     scan_completed = Signal(int)  # 发送扫描完成信号,携带session_id
@@ -124,12 +165,113 @@ class ScanView(QWidget):
         layout.addWidget(QLabel("目标网址:"))
         layout.addWidget(self.url_input)
         
+        # 检测档位
+        from PySide6.QtWidgets import QCheckBox, QComboBox, QSpinBox, QHBoxLayout
+        self.profile_combo = QComboBox()
+        for label, profile in DETECTION_PROFILES:
+            self.profile_combo.addItem(label, profile)
+        layout.addWidget(QLabel("检测范围:"))
+        layout.addWidget(self.profile_combo)
+        
+        # 资源拦截
+        self.block_combo = QComboBox()
+        for label, profile in BLOCK_PROFILES:
+            self.block_combo.addItem(label, profile)
+        layout.addWidget(QLabel("资源拦截（检测只需要 DOM，拦截可加快加载）:"))
+        layout.addWidget(self.block_combo)
+        
+        # 页面就绪策略
+        self.readiness_combo = QComboBox()
+        for label, strategy in READINESS_STRATEGIES:
+            self.readiness_combo.addItem(label, strategy)
+        layout.addWidget(QLabel("页面就绪判定:"))
+        layout.addWidget(self.readiness_combo)
+        
+        readiness_options = QHBoxLayout()
+        self.readiness_selector_input = QLineEdit()
+        self.readiness_selector_input.setPlaceholderText("等待出现的选择器（如 #main）")
+        self.quiet_ms_input = QSpinBox()
+        self.quiet_ms_input.setRange(100, 10000)
+        self.quiet_ms_input.setSingleStep(100)
+        self.quiet_ms_input.setValue(500)
+        self.quiet_ms_input.setSuffix(" ms 静默")
+        self.load_timeout_input = QSpinBox()
+        self.load_timeout_input.setRange(5, 300)
+        self.load_timeout_input.setValue(30)
+        self.load_timeout_input.setSuffix(" 秒超时")
+        readiness_options.addWidget(self.readiness_selector_input)
+        readiness_options.addWidget(self.quiet_ms_input)
+        readiness_options.addWidget(self.load_timeout_input)
+        layout.addLayout(readiness_options)
+        
+        # HAR 录制 / 回放
+        har_options = QHBoxLayout()
+        self.har_combo = QComboBox()
+        for label, mode in HAR_MODES:
+            self.har_combo.addItem(label, mode)
+        self.har_path_input = QLineEdit()
+        self.har_path_input.setPlaceholderText("HAR 文件路径（留空则使用 recordings/<主机名>.har）")
+        har_options.addWidget(self.har_combo)
+        har_options.addWidget(self.har_path_input)
+        layout.addWidget(QLabel("HAR 录制 / 回放（回放时不访问网络，验证结果也取自录制）:"))
+        layout.addLayout(har_options)
+        
+        # 增量检测（单页应用 / 无限滚动）
+        self.scrolls_input = QSpinBox()
+        self.scrolls_input.setRange(0, 100)
+        self.scrolls_input.setValue(0)
+        layout.addWidget(QLabel("滚动增量检测屏数（0 表示关闭，适用于单页应用和无限滚动）:"))
+        layout.addWidget(self.scrolls_input)
+        
         # 验证选项
-        from PySide6.QtWidgets import QCheckBox
         self.validate_checkbox = QCheckBox("启用元素验证（检查链接状态码和按钮可点击性）")
         self.validate_checkbox.setChecked(False)
         layout.addWidget(self.validate_checkbox)
         
+        self.screenshot_checkbox = QCheckBox("保存元素截图（整页截图一次后裁剪）")
+        self.screenshot_checkbox.setChecked(False)
+        layout.addWidget(self.screenshot_checkbox)
+        
+        # 整站爬取
+        self.crawl_checkbox = QCheckBox("整站爬取（从该网址出发扫描同源链接）")
+        layout.addWidget(self.crawl_checkbox)
+        crawl_options = QHBoxLayout()
+        self.crawl_pages_input = QSpinBox()
+        self.crawl_pages_input.setRange(1, 5000)
+        self.crawl_pages_input.setValue(100)
+        self.crawl_pages_input.setPrefix("最多 ")
+        self.crawl_pages_input.setSuffix(" 个页面")
+        self.crawl_depth_input = QSpinBox()
+        self.crawl_depth_input.setRange(0, 20)
+        self.crawl_depth_input.setValue(2)
+        self.crawl_depth_input.setPrefix("深度 ")
+        self.crawl_concurrency_input = QSpinBox()
+        self.crawl_concurrency_input.setRange(1, 32)
+        self.crawl_concurrency_input.setValue(4)
+        self.crawl_concurrency_input.setPrefix("并发 ")
+        self.crawl_processes_input = QSpinBox()
+        self.crawl_processes_input.setRange(1, os.cpu_count() or 1)
+        self.crawl_processes_input.setValue(1)
+        self.crawl_processes_input.setPrefix("进程 ")
+        self.crawl_processes_input.setToolTip("大于 1 时按 URL 分片到多个进程，每个进程各自启动浏览器，并发数为每个进程的并发")
+        self.crawl_exclude_input = QLineEdit()
+        self.crawl_exclude_input.setPlaceholderText("排除规则（正则，逗号分隔，如 /logout, \\?print=）")
+        crawl_options.addWidget(self.crawl_pages_input)
+        crawl_options.addWidget(self.crawl_depth_input)
+        crawl_options.addWidget(self.crawl_concurrency_input)
+        crawl_options.addWidget(self.crawl_processes_input)
+        crawl_options.addWidget(self.crawl_exclude_input)
+        layout.addLayout(crawl_options)
+        crawl_hints = QHBoxLayout()
+        self.crawl_sitemap_checkbox = QCheckBox("从 sitemap 批量加入页面")
+        self.crawl_sitemap_checkbox.setChecked(True)
+        self.crawl_robots_checkbox = QCheckBox("遵守 robots.txt（Disallow 与 Crawl-delay）")
+        self.crawl_robots_checkbox.setChecked(True)
+        crawl_hints.addWidget(self.crawl_sitemap_checkbox)
+        crawl_hints.addWidget(self.crawl_robots_checkbox)
+        crawl_hints.addStretch()
+        layout.addLayout(crawl_hints)
+        
         self.btn_start = QPushButton("开始扫描")
         self.btn_start.clicked.connect(self.start_scan)
         layout.addWidget(self.btn_start)
@@ -149,9 +291,44 @@ class ScanView(QWidget):
         self.btn_start.setEnabled(False)
         
         enable_validation = self.validate_checkbox.isChecked()
-        self.worker = ScanWorker(url, enable_validation)
+        capture_screenshots = self.screenshot_checkbox.isChecked()
+        detection_profile = self.profile_combo.currentData()
+        incremental_scrolls = self.scrolls_input.value()
+        block_profile = self.block_combo.currentData()
+        try:
+            readiness = make_readiness(self.readiness_combo.currentData(),
+                                       timeout=self.load_timeout_input.value(),
+                                       quiet_ms=self.quiet_ms_input.value(),
+                                       selector=self.readiness_selector_input.text().strip())
+        except ValueError:
+            self.log_area.append("“指定选择器出现”需要填写选择器")
+            self.btn_start.setEnabled(True)
+            return
+        if self.crawl_checkbox.isChecked():
+            exclude = [p.strip() for p in self.crawl_exclude_input.text().split(',') if p.strip()]
+            crawl_options = {
+                'max_pages': self.crawl_pages_input.value(),
+                'max_depth': self.crawl_depth_input.value(),
+                'concurrency': self.crawl_concurrency_input.value(),
+                'exclude_patterns': exclude,
+                'use_sitemap': self.crawl_sitemap_checkbox.isChecked(),
+                'respect_robots': self.crawl_robots_checkbox.isChecked(),
+            }
+            self.worker = CrawlWorker(url, crawl_options, self.crawl_processes_input.value(),
+                                      enable_validation=enable_validation,
+                                      detection_profile=detection_profile, block_profile=block_profile,
+                                      readiness=readiness, capture_screenshots=capture_screenshots,
+                                      incremental_scrolls=incremental_scrolls)
+            self.worker.finished.connect(self.crawl_finished)
+        else:
+            har_mode = self.har_combo.currentData()
+            har_path = self.har_path_input.text().strip()
+            if har_mode and not har_path:
+                har_path = os.path.join('recordings', f"{urlparse(url).hostname or 'page'}.har")
+            self.worker = ScanWorker(url, enable_validation, capture_screenshots, detection_profile,
+                                     incremental_scrolls, block_profile, readiness, har_mode, har_path)
+            self.worker.finished.connect(self.scan_finished)
         self.worker.log.connect(self.log_area.append)
-        self.worker.finished.connect(self.scan_finished)
         self.worker.start()
         
     def scan_finished(self, session_id):
@@ -163,6 +340,16 @@ class ScanView(QWidget):
             self.scan_completed.emit(session_id)
         else:
             self.log_area.append("扫描失败")
+    
+    def crawl_finished(self, crawl_id):
+        self.btn_start.setEnabled(True)
+        if crawl_id:
+            self.log_area.append(f"爬取完成! 爬取记录 ID: {crawl_id}，各页面已保存到扫描历史")
+            seed_session = StorageManager().get_crawl_pages(crawl_id).first()
+            if seed_session:
+                self.scan_completed.emit(seed_session.id)
+        else:
+            self.log_area.append("爬取失败")
 
 class ResultsView(QWidget):
     def __init__(self):
@@ -434,6 +621,7 @@ URL: {summary['url']}
 按钮总数: {summary['button_total']}
 可点击按钮: {summary['button_clickable']}
 """
+        details += self._format_page_metrics(session_id, summary['url'])
 
         text_edit.setPlainText(details)
         summary_layout.addWidget(text_edit)
@@ -518,7 +706,32 @@ URL: {summary['url']}
         layout.addWidget(btn_close)
         
         dialog.exec()
-    
+
+    def _format_page_metrics(self, session_id, url):
+        """页面性能指标文本，并与同一 URL 的上一次扫描对比"""
+        metrics = self.storage.get_page_metrics(session_id)
+        if not metrics:
+            return ""
+        previous = next((m for m in self.storage.get_metrics_history(url, limit=20)
+                         if m.session_id < session_id), None)
+        rows = [
+            ("TTFB", 'ttfb'), ("首次绘制 (FP)", 'first_paint'), ("首次内容绘制 (FCP)", 'first_contentful_paint'),
+            ("最大内容绘制 (LCP)", 'largest_contentful_paint'), ("DOMContentLoaded", 'dom_content_loaded'),
+            ("load 事件", 'load_event'),
+        ]
+        text = f"\n页面性能\n{'='*50}\n"
+        for label, field in rows:
+            value = getattr(metrics, field)
+            line = f"{label}: {value:.0f} ms" if value is not None else f"{label}: -"
+            before = getattr(previous, field) if previous else None
+            if value is not None and before:
+                line += f"（上次 {before:.0f} ms，{(value - before) / before:+.0%}）"
+            text += line + "\n"
+        size = metrics.total_transfer_size
+        text += f"资源数: {metrics.resource_count or 0}\n"
+        text += f"传输量: {size / 1024:.0f} KB\n" if size is not None else "传输量: -\n"
+        return text
+
     def view_session_elements(self, session_id):
         """查看会话的所有元素列表"""
         from PySide6.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QLabel, QHeaderView
@@ -673,6 +886,7 @@ class AIAnalysisWorker(QThread):
             for el in elements:
                 elements_data.append({
                     'type': el.type,
+                    'kind': el.kind,
                     'text': el.text,
                     'href': el.href,
                     'status_code': el.status_code,
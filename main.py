@@ -1,10 +1,11 @@
 import sys
 from PySide6.QtWidgets import QApplication
 from gui.main_window import MainWindow
+from core.browser_pool import pool_options_from_env
 
 def main():
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(pool_options=pool_options_from_env())
     window.show()
     sys.exit(app.exec())
 
@@ -1,44 +1,82 @@
 """
-数据库迁移脚本 - 添加验证字段到 PageElement 表
+数据库迁移脚本 - 为已有数据库补充新增的字段
 """
 import sqlite3
 import os
 
 DB_PATH = 'aichecker.db'
 
+# (表名, 列名, 迁移语句)
+MIGRATIONS = [
+    # 验证相关字段
+    ('pageelement', 'validated', "ALTER TABLE pageelement ADD COLUMN validated INTEGER DEFAULT 0"),
+    ('pageelement', 'validation_time', "ALTER TABLE pageelement ADD COLUMN validation_time DATETIME"),
+    ('pageelement', 'status_code', "ALTER TABLE pageelement ADD COLUMN status_code INTEGER"),
+    ('pageelement', 'response_time', "ALTER TABLE pageelement ADD COLUMN response_time REAL"),
+    ('pageelement', 'validation_error', "ALTER TABLE pageelement ADD COLUMN validation_error TEXT"),
+    ('pageelement', 'clickable', "ALTER TABLE pageelement ADD COLUMN clickable INTEGER"),
+    ('pageelement', 'enabled', "ALTER TABLE pageelement ADD COLUMN enabled INTEGER"),
+    # 整站爬取
+    ('scansession', 'crawl_id', "ALTER TABLE scansession ADD COLUMN crawl_id INTEGER REFERENCES crawlsession (id)"),
+    ('scansession', 'depth', "ALTER TABLE scansession ADD COLUMN depth INTEGER"),
+    # 元素唯一定位
+    ('pageelement', 'unique_selector', "ALTER TABLE pageelement ADD COLUMN unique_selector TEXT"),
+    ('pageelement', 'element_index', "ALTER TABLE pageelement ADD COLUMN element_index INTEGER"),
+    ('pageelement', 'matched_selectors', "ALTER TABLE pageelement ADD COLUMN matched_selectors TEXT"),
+    # frame 与 shadow DOM 信息
+    ('pageelement', 'frame_url', "ALTER TABLE pageelement ADD COLUMN frame_url TEXT"),
+    ('pageelement', 'shadow_path', "ALTER TABLE pageelement ADD COLUMN shadow_path TEXT"),
+    ('pageelement', 'frame_path', "ALTER TABLE pageelement ADD COLUMN frame_path VARCHAR(255)"),
+    # 元素指纹
+    ('pageelement', 'fingerprint', "ALTER TABLE pageelement ADD COLUMN fingerprint VARCHAR(255)"),
+    # 检测规则
+    ('pageelement', 'kind', "ALTER TABLE pageelement ADD COLUMN kind VARCHAR(255)"),
+    ('pageelement', 'attributes', "ALTER TABLE pageelement ADD COLUMN attributes TEXT"),
+    # 定时任务扫描选项
+    ('scheduledtask', 'capture_screenshots', "ALTER TABLE scheduledtask ADD COLUMN capture_screenshots INTEGER DEFAULT 0"),
+    ('scheduledtask', 'detection_profile', "ALTER TABLE scheduledtask ADD COLUMN detection_profile VARCHAR(255) NOT NULL DEFAULT 'full'"),
+    ('scheduledtask', 'incremental_scrolls', "ALTER TABLE scheduledtask ADD COLUMN incremental_scrolls INTEGER NOT NULL DEFAULT 0"),
+    ('scheduledtask', 'block_profile', "ALTER TABLE scheduledtask ADD COLUMN block_profile VARCHAR(255) NOT NULL DEFAULT 'none'"),
+    ('scheduledtask', 'readiness', "ALTER TABLE scheduledtask ADD COLUMN readiness VARCHAR(255) NOT NULL DEFAULT 'networkidle'"),
+    ('scheduledtask', 'readiness_selector', "ALTER TABLE scheduledtask ADD COLUMN readiness_selector VARCHAR(255)"),
+    ('scheduledtask', 'quiet_ms', "ALTER TABLE scheduledtask ADD COLUMN quiet_ms INTEGER NOT NULL DEFAULT 500"),
+    ('scheduledtask', 'load_timeout', "ALTER TABLE scheduledtask ADD COLUMN load_timeout INTEGER NOT NULL DEFAULT 30"),
+]
+
+# 新增字段对应的索引（与 peewee 的命名方式一致）
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS pageelement_fingerprint ON pageelement (fingerprint)",
+    "CREATE INDEX IF NOT EXISTS scansession_crawl_id ON scansession (crawl_id)",
+]
+
 def migrate():
     """执行数据库迁移"""
-    
+
     if not os.path.exists(DB_PATH):
         print(f"❌ 数据库文件不存在: {DB_PATH}")
         return False
-    
+
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    
+
     try:
-        # 检查是否已经有验证字段
-        cursor.execute("PRAGMA table_info(pageelement)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'validated' in columns:
-            print("✅ 验证字段已存在，无需迁移")
-            return True
-        
-        print("开始数据库迁移...")
-        
-        # 添加验证相关字段
-        migrations = [
-            "ALTER TABLE pageelement ADD COLUMN validated INTEGER DEFAULT 0",
-            "ALTER TABLE pageelement ADD COLUMN validation_time DATETIME",
-            "ALTER TABLE pageelement ADD COLUMN status_code INTEGER",
-            "ALTER TABLE pageelement ADD COLUMN response_time REAL",
-            "ALTER TABLE pageelement ADD COLUMN validation_error TEXT",
-            "ALTER TABLE pageelement ADD COLUMN clickable INTEGER",
-            "ALTER TABLE pageelement ADD COLUMN enabled INTEGER"
-        ]
-        
-        for migration in migrations:
+        # 找出尚未添加的字段
+        pending = []
+        existing = {}
+        for table, column, migration in MIGRATIONS:
+            if table not in existing:
+                cursor.execute(f"PRAGMA table_info({table})")
+                existing[table] = [col[1] for col in cursor.fetchall()]
+            # 表不存在时由 init_db 直接按最新模型创建
+            if existing[table] and column not in existing[table]:
+                pending.append(migration)
+
+        if not pending:
+            print("✅ 所有字段已存在，无需迁移")
+        else:
+            print("开始数据库迁移...")
+
+        for migration in pending:
             try:
                 cursor.execute(migration)
                 print(f"  ✅ {migration[:50]}...")
@@ -47,16 +85,19 @@ def migrate():
                     print(f"  ⚠️  列已存在，跳过")
                 else:
                     raise
-        
+
+        for index in INDEXES:
+            cursor.execute(index)
+
         conn.commit()
         print("✅ 数据库迁移完成!")
         return True
-        
+
     except Exception as e:
         print(f"❌ 迁移失败: {e}")
         conn.rollback()
         return False
-        
+
     finally:
         conn.close()
 
@@ -31,5 +31,26 @@ class TestAIClient(unittest.TestCase):
         mock_client_instance.chat.completions.create.assert_called_once()
         print("AI Client Test Passed!")
 
+    @patch('ai.client.OpenAI')
+    def test_session_prompt_counts_buttons_by_kind(self, mock_openai):
+        client = AIClient(api_key="test-key")
+        elements = [
+            {"type": "button", "kind": "button", "text": "Go"},
+            {"type": "input", "kind": "form_input"},
+            {"type": "input", "kind": "form_input"},
+        ]
+        prompt = client._construct_session_prompt({'url': "https://example.com/", 'duration': 1.0}, elements)
+        self.assertIn("按钮数: 1", prompt)
+
+    @patch('ai.client.OpenAI')
+    def test_session_prompt_skips_resources_in_details(self, mock_openai):
+        client = AIClient(api_key="test-key")
+        elements = [{"type": "link", "kind": "resource_link", "href": f"/style{i}.css"} for i in range(60)]
+        elements.append({"type": "a", "kind": "link", "text": "Pricing", "href": "/pricing"})
+        prompt = client._construct_session_prompt({'url': "https://example.com/", 'duration': 1.0}, elements)
+        self.assertIn("资源数(图片/样式表/脚本): 60", prompt)
+        self.assertIn("1. 类型: a, 文本: Pricing", prompt)
+        self.assertNotIn("style0.css", prompt)
+
 if __name__ == '__main__':
     unittest.main()
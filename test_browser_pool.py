@@ -0,0 +1,223 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core.browser_pool import BrowserPool, pool_options_from_env
+from core.scanner import PageScanner
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        if 'fail' in url:
+            raise RuntimeError('net::ERR_NAME_NOT_RESOLVED')
+
+    async def evaluate(self, script, args=None):
+        return 8 * 1048576
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self, browser=None):
+        self.browser = browser
+        self.handlers = []
+        self.pages = []
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        for handler in self.handlers:
+            handler(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+        if self.browser:
+            self.browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+        self.starts = 0
+
+    async def start(self):
+        self.starts += 1
+        await asyncio.sleep(0)
+        return self
+
+    async def stop(self):
+        pass
+
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = patch('core.browser_pool.async_playwright', lambda: self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _open_pages(self, pool, count):
+        async def scan():
+            async with pool.lease() as context:
+                for _ in range(count):
+                    await context.new_page()
+                return context
+        return pool.run(scan())
+
+    def test_reuses_browser_and_recycles(self):
+        pool = BrowserPool(size=1, recycle_after=3)
+        try:
+            first = self._open_pages(pool, 1)
+            self._open_pages(pool, 1)
+            self.assertTrue(first.closed)
+            self.assertEqual(len(self.playwright.chromium.launched), 1)
+
+            # 第 3 个页面达到回收阈值，归还后重新启动浏览器
+            self._open_pages(pool, 1)
+            self._open_pages(pool, 1)
+            self.assertEqual(len(self.playwright.chromium.launched), 2)
+            self.assertEqual(pool.stats['recycled'], 1)
+        finally:
+            pool.shutdown()
+
+    def test_warm_start_and_background_relaunch(self):
+        pool = BrowserPool(size=2, recycle_after=1)
+        try:
+            # 启动池即在后台启动全部浏览器，Playwright 只启动一次
+            pool.run(asyncio.sleep(0.05))
+            self.assertEqual(len(self.playwright.chromium.launched), 2)
+            self.assertEqual(self.playwright.starts, 1)
+
+            # 达到回收阈值的浏览器关闭后立即在后台重启，不等下一次租用
+            self._open_pages(pool, 1)
+            pool.run(asyncio.sleep(0.05))
+            self.assertEqual(pool.stats['recycled'], 1)
+            self.assertEqual(len(self.playwright.chromium.launched), 3)
+            self.assertEqual(pool.run(self._browsers(pool)), 2)
+        finally:
+            pool.shutdown()
+
+    def test_lazy_pool(self):
+        pool = BrowserPool(size=2, warm=False)
+        try:
+            pool.run(asyncio.sleep(0.05))
+            self.assertEqual(len(self.playwright.chromium.launched), 0)
+        finally:
+            pool.shutdown()
+
+    @staticmethod
+    async def _browsers(pool):
+        return pool.usage()['browsers']
+
+    def test_relaunches_disconnected_browser(self):
+        pool = BrowserPool(size=1)
+        try:
+            self._open_pages(pool, 1)
+            self.playwright.chromium.launched[0].connected = False
+            self._open_pages(pool, 1)
+            self.assertEqual(len(self.playwright.chromium.launched), 2)
+            self.assertEqual(pool.stats['unhealthy'], 1)
+        finally:
+            pool.shutdown()
+
+    def test_concurrent_contexts_share_browser(self):
+        pool = BrowserPool(size=2, contexts_per_browser=2)
+        try:
+            async def scan_many():
+                async def scan():
+                    async with pool.lease():
+                        await asyncio.sleep(0.01)
+                await asyncio.gather(*(scan() for _ in range(4)))
+            pool.run(scan_many())
+            # 4 个并发上下文均匀分布到 2 个浏览器上
+            self.assertEqual(len(self.playwright.chromium.launched), 2)
+            self.assertEqual(pool.stats['leases'], 4)
+        finally:
+            pool.shutdown()
+
+
+class TestPoolOptions(unittest.TestCase):
+    def test_from_env(self):
+        options = pool_options_from_env({'AICHECKER_BROWSERS': '4', 'AICHECKER_RECYCLE_AFTER': '0',
+                                         'AICHECKER_CONTEXTS_PER_BROWSER': 'many'})
+        self.assertEqual(options, {'size': 4, 'recycle_after': 0})
+
+
+class TestPageLease(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = patch('core.browser_pool.async_playwright', lambda: self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_closed_after_scan_and_failure(self):
+        pool = BrowserPool(size=1)
+        try:
+            async def scan():
+                async with pool.lease() as context:
+                    scanner = PageScanner(context=context)
+                    async with scanner.open("https://example.com/") as page:
+                        self.assertIsNotNone(page)
+                        self.assertEqual(pool.usage()['pages'], 1)
+                    async with scanner.open("https://fail.example.com/") as page:
+                        self.assertIsNone(page)
+                    return scanner.stats(), pool.usage()
+            stats, usage = pool.run(scan())
+            self.assertEqual(stats['pages_opened'], 2)
+            self.assertEqual(stats['open_pages'], 0)
+            self.assertEqual(stats['js_heap_bytes'], 8 * 1048576)
+            self.assertEqual(usage['pages'], 0)
+            self.assertEqual(pool.run(self._usage(pool))['contexts'], 0)
+        finally:
+            pool.shutdown()
+
+    @staticmethod
+    async def _usage(pool):
+        return pool.usage()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from data.models import CrawlSession
+from data.storage import StorageManager
+from core.crawler import CrawlFrontier, SiteCrawler
+from core.urls import absolute_url, normalize_url
+from testutils import MemoryDatabaseTestCase, FakePage
+
+# 模拟站点：页面 URL -> 页面上的链接
+SITE = {
+    "https://example.com/": ["/a", "/b#top", "https://example.com/a?", "https://other.com/x", "mailto:me@example.com"],
+    "https://example.com/a": ["/", "/c", "/files/report.pdf"],
+    "https://example.com/b": ["/c", "/admin/settings"],
+    "https://example.com/c": ["/d"],
+    "https://example.com/d": [],
+}
+
+
+class SitePage(FakePage):
+    """按 SITE 返回当前页面上的链接"""
+    url = None
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return False
+
+    async def close(self):
+        pass
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.url = url
+
+    async def evaluate(self, script, args=None):
+        links = SITE.get(self.url, [])
+        if args['op'] == 'collect':
+            return len(links)
+        return [{"type": "a", "text": href, "href": href, "selector": "a[href]", "index": i}
+                for i, href in enumerate(links)][args['start']:args['end']]
+
+
+class FakeContext:
+    async def new_page(self):
+        return SitePage()
+
+
+class FakePool:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            yield FakeContext()
+        finally:
+            self.active -= 1
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_url("HTTPS://Example.com:443/a?b=2&a=1#frag"), "https://example.com/a?a=1&b=2")
+        self.assertEqual(normalize_url("../x", "http://example.com:8080/a/b"), "http://example.com:8080/x")
+        self.assertEqual(normalize_url("https://example.com"), "https://example.com/")
+        self.assertIsNone(normalize_url("javascript:void(0)"))
+
+    def test_bare_query_keys_and_escapes_kept(self):
+        self.assertEqual(normalize_url("https://example.com/s?foo&b=%2F"), "https://example.com/s?b=%2F&foo")
+        self.assertNotEqual(normalize_url("https://example.com/s?foo"), normalize_url("https://example.com/s?foo="))
+
+    def test_ipv6_host(self):
+        self.assertEqual(normalize_url("http://[::1]:8080/x"), "http://[::1]:8080/x")
+        self.assertEqual(normalize_url("http://[2001:DB8::1]:80/"), "http://[2001:db8::1]/")
+        self.assertEqual(absolute_url("/y", "http://[::1]:8080/x#top"), "http://[::1]:8080/y")
+
+    def test_frontier_queues_original_url(self):
+        frontier = CrawlFrontier("https://example.com/", max_depth=1)
+        frontier.pop()
+        self.assertTrue(frontier.add("/search?q=a&page=2&raw#top", 1, base="https://example.com/"))
+        # 规范化的写法只用于去重
+        self.assertFalse(frontier.add("/search?raw&page=2&q=a", 1, base="https://example.com/"))
+        self.assertEqual(frontier.pop(), ("https://example.com/search?q=a&page=2&raw", 1))
+
+
+class TestCrawler(MemoryDatabaseTestCase):
+    def test_frontier_limits(self):
+        frontier = CrawlFrontier("https://example.com", max_depth=1, max_pages=3,
+                                 exclude_patterns=[r"/admin/"])
+        self.assertFalse(frontier.add("/", 1, base="https://example.com/"))
+        self.assertFalse(frontier.add("/admin/x", 1, base="https://example.com/"))
+        self.assertFalse(frontier.add("/deep", 2, base="https://example.com/"))
+        self.assertTrue(frontier.add("/a", 1, base="https://example.com/"))
+        self.assertTrue(frontier.add("/b", 1, base="https://example.com/"))
+        self.assertFalse(frontier.add("/c", 1, base="https://example.com/"))
+        self.assertEqual(len(frontier), 3)
+
+    def test_crawl_site(self):
+        storage = StorageManager()
+        pool = FakePool()
+        crawler = SiteCrawler(storage, pool=pool, concurrency=3, max_depth=2, max_pages=10,
+                              exclude_patterns=[r"/admin/"], log=lambda msg: None)
+        crawl_id = asyncio.run(crawler.run("https://example.com"))
+
+        crawl = CrawlSession.get_by_id(crawl_id)
+        pages = {s.url: s.depth for s in storage.get_crawl_pages(crawl_id)}
+        # /d 在第 3 层，超过 max_depth
+        self.assertEqual(pages, {"https://example.com/": 0, "https://example.com/a": 1,
+                                 "https://example.com/b": 1, "https://example.com/c": 2})
+        self.assertEqual(crawl.pages_scanned, 4)
+        self.assertEqual(crawl.status, 'completed')
+        self.assertGreater(pool.peak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from playwright.async_api import async_playwright
+from core.detector import ElementDetector, element_fingerprint, frame_path, locate_element
+from core.rules import DetectionRule, get_rules, register_rule, unregister_rule
+
+
+class TestElementFingerprint(unittest.TestCase):
+    def test_whitespace_and_case_insensitive(self):
+        a = {"type": "A", "text": "  Contact   Us\n", "href": "/contact", "unique_selector": "#nav > a"}
+        b = {"type": "a", "text": "contact us", "href": "/contact ", "unique_selector": "#nav > a"}
+        self.assertEqual(element_fingerprint(a), element_fingerprint(b))
+        self.assertEqual(len(element_fingerprint(a)), 16)
+
+    def test_selector_distinguishes_elements(self):
+        a = {"type": "a", "text": "More", "href": "/more", "unique_selector": "li:nth-of-type(1) > a"}
+        b = dict(a, unique_selector="li:nth-of-type(2) > a")
+        self.assertNotEqual(element_fingerprint(a), element_fingerprint(b))
+
+    def test_frame_distinguishes_elements(self):
+        # 两个相同的广告 iframe 中的同一个按钮
+        a = {"type": "a", "text": "Ad", "href": "https://ads.example.net/c", "unique_selector": "#ad",
+             "frame_url": "https://ads.example.net/slot", "frame_path": "0"}
+        b = dict(a, frame_path="1")
+        self.assertNotEqual(element_fingerprint(a), element_fingerprint(b))
+        # 主 frame 中的元素指纹与没有 frame_path 的旧记录相同
+        main = dict(a, frame_path='')
+        legacy = {key: value for key, value in a.items() if key not in ('frame_url', 'frame_path')}
+        self.assertEqual(element_fingerprint(main), element_fingerprint(legacy))
+
+
+class TestDetectionRules(unittest.TestCase):
+    def tearDown(self):
+        unregister_rule('video')
+
+    def test_registered_rule_compiled_into_script(self):
+        register_rule(DetectionRule('video', 'video', "(el) => ({ href: el.currentSrc })"))
+        detector = ElementDetector()
+        self.assertIn('video', detector.selectors)
+        self.assertIn('"video"', detector.script)
+        self.assertNotIn('__RULES__', detector.script)
+
+    def test_rule_subset(self):
+        detector = ElementDetector(rules=get_rules(['link', 'button', 'missing']))
+        self.assertEqual(detector.selectors, ['a[href]', 'button'])
+
+
+
+class RecordingFrame:
+    url = "https://example.com/"
+
+    def __init__(self):
+        self.calls = []
+
+    async def evaluate(self, script, args=None):
+        self.calls.append(args)
+        return [] if args['op'] == 'drain' else True
+
+
+class TestIncrementalProfile(unittest.TestCase):
+    def test_profile_applies_to_baseline_and_drain(self):
+        # 基线也按档位过滤，被过滤的元素之后显示出来时仍能在 drain 中报告
+        frame = RecordingFrame()
+        page = type('Page', (), {'frames': [frame]})()
+        detector = ElementDetector(profile='visible')
+
+        async def scenario():
+            await detector.start_incremental(page)
+            await detector.detect_new(page)
+
+        asyncio.run(scenario())
+        self.assertEqual(frame.calls, [{'op': 'observe', 'profile': 'visible'},
+                                       {'op': 'drain', 'profile': 'visible'}])
+        self.assertIn('state.pending', detector.script)
+
+
+class TreeFrame:
+    """带 frame 树关系的 frame，evaluate 返回一个元素"""
+
+    def __init__(self, url, parent=None):
+        self.url = url
+        self.parent_frame = parent
+        self.child_frames = []
+        if parent:
+            parent.child_frames.append(self)
+
+    async def evaluate(self, script, args=None):
+        return [{"type": "button", "text": "OK", "selector": "button", "unique_selector": "#ok"}]
+
+    def locator(self, selector):
+        return (self, selector)
+
+
+class TestFramePath(unittest.TestCase):
+    def setUp(self):
+        # 两个 URL 相同的广告 iframe，第二个中还嵌套了一个同 URL 的 iframe
+        self.main = TreeFrame("https://example.com/")
+        self.ad1 = TreeFrame("https://ads.example.net/slot", self.main)
+        self.ad2 = TreeFrame("https://ads.example.net/slot", self.main)
+        self.nested = TreeFrame("https://ads.example.net/slot", self.ad2)
+        self.page = SimpleNamespace(main_frame=self.main, frames=[self.main, self.ad1, self.ad2, self.nested])
+
+    def element(self, frame_url, path):
+        return SimpleNamespace(frame_url=frame_url, frame_path=path, unique_selector="#ok",
+                               selector="button", element_index=0)
+
+    def test_detect_records_frame_path(self):
+        records = asyncio.run(ElementDetector().detect(self.page))
+        self.assertEqual([r['frame_path'] for r in records], ['', '0', '1', '1/0'])
+        self.assertEqual(frame_path(self.nested), '1/0')
+
+    def test_locate_by_path_among_same_url_frames(self):
+        url = "https://ads.example.net/slot"
+        self.assertIs(locate_element(self.page, self.element(url, '1'))[0], self.ad2)
+        self.assertIs(locate_element(self.page, self.element(url, '1/0'))[0], self.nested)
+        self.assertIs(locate_element(self.page, self.element("https://example.com/", ''))[0], self.main)
+
+    def test_stale_or_missing_path_falls_back_to_url(self):
+        url = "https://ads.example.net/slot"
+        # 旧记录没有 frame_path，frame 树变化后路径越界或指向其他 URL
+        self.assertIs(locate_element(self.page, self.element(url, None))[0], self.ad1)
+        self.assertIs(locate_element(self.page, self.element(url, '5'))[0], self.ad1)
+        self.assertIs(locate_element(self.page, self.element("https://example.com/", '1'))[0], self.main)
+
+
+
+def as_element(record):
+    """把检测结果转换为 locate_element 使用的元素记录"""
+    return SimpleNamespace(frame_url=record['frame_url'], frame_path=record['frame_path'],
+                           unique_selector=record['unique_selector'], selector=record['selector'],
+                           element_index=record['index'])
+
+
+class TestDetectScriptInBrowser(unittest.TestCase):
+    """在真实浏览器中执行检测脚本；没有可用的 Playwright 浏览器时跳过"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        cls.playwright = None
+        try:
+            cls.playwright = cls.loop.run_until_complete(async_playwright().start())
+            cls.browser = cls.loop.run_until_complete(cls.playwright.chromium.launch())
+        except Exception as e:
+            cls.tearDownClass()
+            raise unittest.SkipTest(f"Playwright browser not available: {e}")
+
+    @classmethod
+    def tearDownClass(cls):
+        if getattr(cls, 'browser', None):
+            cls.loop.run_until_complete(cls.browser.close())
+            cls.browser = None
+        if cls.playwright:
+            cls.loop.run_until_complete(cls.playwright.stop())
+            cls.playwright = None
+        cls.loop.close()
+
+    def setUp(self):
+        self.page = self.wait(self.browser.new_page())
+        self.addCleanup(self.wait, self.page.close())
+
+    def wait(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def detect(self, html, profile='full'):
+        self.wait(self.page.set_content(html))
+        return self.wait(ElementDetector(profile=profile).detect(self.page))
+
+    def test_single_evaluate_extracts_everything(self):
+        frame = self.page.main_frame
+        calls = []
+        evaluate = frame.evaluate
+
+        async def counting(script, arg=None):
+            calls.append(arg)
+            return await evaluate(script, arg)
+
+        frame.evaluate = counting
+        records = self.detect("""
+            <nav id="nav"><a href="/a" class="item">First</a><a href="/b">Second</a></nav>
+            <button>Save</button>
+        """)
+        self.assertEqual(calls, [{'op': 'all', 'profile': 'full'}])
+        self.assertEqual([(r['kind'], r['text'], r['href']) for r in records],
+                         [('link', 'First', '/a'), ('link', 'Second', '/b'), ('button', 'Save', None)])
+        first = records[0]
+        self.assertEqual((first['class'], first['unique_selector'], first['frame_path']),
+                         ('item', '#nav > a:nth-of-type(1)', ''))
+        self.assertTrue(first['visible'])
+        self.assertGreater(first['bbox']['width'], 0)
+
+    def test_overlapping_rules_deduped(self):
+        records = self.detect('<button role="button">Go</button><div role="button">Menu</div>')
+        self.assertEqual(len(records), 2)
+        button, menu = records
+        self.assertEqual((button['kind'], button['selectors']), ('button', ['button', '[role="button"]']))
+        self.assertEqual((menu['kind'], menu['selectors']), ('role_button', ['[role="button"]']))
+        # 序号与规则选择器的匹配顺序一致，旧记录的 selector + 序号仍能定位
+        self.assertEqual(self.wait(self.page.locator(menu['selector']).nth(menu['index']).inner_text()), 'Menu')
+
+    def test_shadow_roots_and_iframes(self):
+        records = self.detect("""
+            <div id="host"></div>
+            <iframe srcdoc="<a href='https://example.com/ad'>First ad</a>"></iframe>
+            <iframe srcdoc="<a href='https://example.com/ad'>Second ad</a>"></iframe>
+            <script>
+                const shadow = document.getElementById('host').attachShadow({mode: 'open'});
+                shadow.innerHTML = '<section><button>Inside</button></section>';
+            </script>
+        """)
+        by_text = {r['text']: r for r in records}
+        self.assertEqual(set(by_text), {'Inside', 'First ad', 'Second ad'})
+
+        inside = by_text['Inside']
+        self.assertEqual((inside['shadow_path'], inside['frame_path']), ('#host', ''))
+        first, second = by_text['First ad'], by_text['Second ad']
+        self.assertEqual(first['frame_url'], second['frame_url'])
+        self.assertEqual((first['frame_path'], second['frame_path']), ('0', '1'))
+        self.assertNotEqual(first['fingerprint'], second['fingerprint'])
+
+        # 每条记录都能在所在的 frame / shadow root 中唯一定位到原来的元素
+        for text, record in by_text.items():
+            locator = locate_element(self.page, as_element(record))
+            self.assertEqual(self.wait(locator.count()), 1)
+            self.assertEqual(self.wait(locator.inner_text()), text)
+
+    def test_id_anchor_unique_across_shadow_roots(self):
+        # Playwright 的 CSS 选择器穿透 shadow root：页面上的 #go 也会匹配组件内的 #go
+        records = self.detect("""
+            <main><button id="go">Outer</button></main>
+            <div id="widget"></div>
+            <script>
+                const shadow = document.getElementById('widget').attachShadow({mode: 'open'});
+                shadow.innerHTML = '<button id="go">Inner</button>';
+            </script>
+        """)
+        by_text = {r['text']: r for r in records}
+        self.assertNotIn('#go', by_text['Outer']['unique_selector'])
+        for text, record in by_text.items():
+            locator = locate_element(self.page, as_element(record))
+            self.assertEqual(self.wait(locator.count()), 1)
+            self.assertEqual(self.wait(locator.inner_text()), text)
+
+    def test_profiles_filter_in_page(self):
+        html = """
+            <a href="/top">Top</a>
+            <a href="/hidden" style="display: none">Hidden</a>
+            <a href="/invisible" style="visibility: hidden">Invisible</a>
+            <div style="height: 3000px"></div>
+            <a href="/below">Below</a>
+        """
+        texts = {profile: [r['href'] for r in self.detect(html, profile)]
+                 for profile in ElementDetector.PROFILES}
+        self.assertEqual(texts['full'], ['/top', '/hidden', '/invisible', '/below'])
+        self.assertEqual(texts['visible'], ['/top', '/below'])
+        self.assertEqual(texts['viewport'], ['/top'])
+
+
+if __name__ == '__main__':
+    unittest.main()
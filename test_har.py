@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from data.storage import StorageManager
+from core.har import HarArchive, parse_har_entries
+from core.pipeline import ScanPipeline
+from testutils import MemoryDatabaseTestCase, FakePage
+
+HAR = {"log": {"entries": [
+    {"request": {"method": "GET", "url": "https://example.com/"},
+     "response": {"status": 200, "redirectURL": ""}, "time": 85.0},
+    {"request": {"method": "GET", "url": "https://example.com/old"},
+     "response": {"status": 301, "redirectURL": "/new"}, "time": 10.0},
+    {"request": {"method": "GET", "url": "https://example.com/new"},
+     "response": {"status": 200, "redirectURL": ""}, "time": 20.0},
+    {"request": {"method": "POST", "url": "https://example.com/api"},
+     "response": {"status": 500, "redirectURL": ""}, "time": 5.0},
+]}}
+
+
+class TestHar(MemoryDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.har_path = os.path.join(self.tmp.name, 'site.har')
+        with open(self.har_path, 'w', encoding='utf-8') as f:
+            json.dump(HAR, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_entries_follows_redirects(self):
+        entries = parse_har_entries(HAR)
+        self.assertEqual(set(entries), {"https://example.com/", "https://example.com/old", "https://example.com/new"})
+        self.assertEqual(entries["https://example.com/old"]['status_code'], 200)
+        self.assertEqual(entries["https://example.com/old"]['final_url'], "https://example.com/new")
+        self.assertEqual(entries["https://example.com/"]['response_time'], 0.085)
+
+    def test_record_links_then_replay_offline(self):
+        recording = HarArchive(self.har_path, 'record')
+        recording.record_result("https://example.com/contact", {'status_code': 404, 'response_time': 0.3})
+        recording.save()
+
+        records = [
+            {"type": "a", "text": "Old", "href": "/old", "selector": "a[href]", "index": 0},
+            {"type": "a", "text": "Contact", "href": "/contact", "selector": "a[href]", "index": 1},
+            {"type": "a", "text": "Unknown", "href": "/unknown", "selector": "a[href]", "index": 2},
+        ]
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None)
+        replay = HarArchive(self.har_path, 'replay')
+        session_id = asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True, har=replay))
+
+        results = {el.text: (el.status_code, el.validation_error)
+                   for el in storage.get_elements_by_session(session_id)}
+        self.assertEqual(results, {"Old": (200, None), "Contact": (404, None),
+                                   "Unknown": (None, 'Not in recording')})
+
+    def test_replay_requires_file(self):
+        with self.assertRaises(FileNotFoundError):
+            HarArchive(os.path.join(self.tmp.name, 'missing.har'), 'replay')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+import warnings
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.http import (configure_http_pool, get_http_session, close_http_session, own_http_session, pool_stats,
+                       HTTP_POOL_OPTIONS)
+from core.validator import ElementValidator
+
+
+class TestSharedHttpSession(unittest.TestCase):
+    def test_session_shared_per_loop_and_connections_reused(self):
+        async def handle(request):
+            return web.Response(text="ok")
+
+        async def validate(urls):
+            async with ElementValidator() as validator:
+                await validator.batch_validate_links(urls)
+                return validator.session
+
+        async def scenario():
+            # 与浏览器池相同，登记为会在结束前关闭共享会话的事件循环
+            own_http_session(asyncio.get_running_loop())
+            app = web.Application()
+            app.router.add_route('*', '/{name}', handle)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                # 三次扫描依次验证，后两次复用第一次留下的连接
+                first = await validate([str(server.make_url('/a'))])
+                second = await validate([str(server.make_url('/b'))])
+                await validate([str(server.make_url('/c'))])
+                stats = pool_stats()
+                return first, second, first is get_http_session(), stats
+            finally:
+                await close_http_session()
+                await server.close()
+
+        first, second, still_shared, stats = asyncio.run(scenario())
+        self.assertIs(first, second)
+        self.assertTrue(still_shared)
+        self.assertTrue(first.closed)
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['requests'], 3)
+        self.assertEqual(stats[0]['connections_created'], 1)
+        self.assertEqual(stats[0]['connections_reused'], 2)
+        self.assertEqual(stats[0]['idle_connections'], 1)
+        self.assertEqual(pool_stats(), [])
+
+    def test_standalone_validator_uses_private_session(self):
+        async def handle(request):
+            return web.Response(text="ok")
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_route('*', '/', handle)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                async with ElementValidator() as validator:
+                    result = await validator.validate_link(str(server.make_url('/')))
+                    session = validator.session
+                return result, session, pool_stats()
+            finally:
+                await server.close()
+
+        # 没有所有者的事件循环中不留下未关闭的共享会话
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', ResourceWarning)
+            result, session, stats = asyncio.run(scenario())
+        self.assertTrue(result['valid'])
+        self.assertTrue(session.closed)
+        self.assertEqual(stats, [])
+
+    def test_configure_pool(self):
+        original = dict(HTTP_POOL_OPTIONS)
+        try:
+            configure_http_pool(limit=7, limit_per_host=3)
+
+            async def scenario():
+                get_http_session()
+                try:
+                    return pool_stats()[0]
+                finally:
+                    await close_http_session()
+
+            stats = asyncio.run(scenario())
+            self.assertEqual((stats['limit'], stats['limit_per_host']), (7, 3))
+            with self.assertRaises(ValueError):
+                configure_http_pool(max_connections=5)
+        finally:
+            HTTP_POOL_OPTIONS.update(original)
+
+
+if __name__ == '__main__':
+    unittest.main()
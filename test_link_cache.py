@@ -0,0 +1,80 @@
+import asyncio
+import datetime
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from data.models import LinkStatus
+from data.link_cache import LinkStatusCache
+from core.validator import ElementValidator
+from testutils import MemoryDatabaseTestCase
+
+
+class TestLinkStatusCache(MemoryDatabaseTestCase):
+    def age(self, url, seconds):
+        checked_at = datetime.datetime.now() - datetime.timedelta(seconds=seconds)
+        LinkStatus.update(checked_at=checked_at).where(LinkStatus.url == url).execute()
+
+    def test_ttl_per_status_class(self):
+        cache = LinkStatusCache(ttls={5: 0})
+        cache.store("https://example.com/ok", {'status_code': 200, 'response_time': 0.2}, etag='"v1"')
+        cache.store("https://example.com/missing", {'status_code': 404})
+        cache.store("https://example.com/down", {'status_code': 503})
+        cache.store("https://example.com/timeout", {'status_code': None, 'error': 'Timeout'})
+
+        self.age("https://example.com/ok", 2 * 3600)
+        self.age("https://example.com/missing", 2 * 3600)
+        self.assertTrue(cache.lookup("https://example.com/ok")['fresh'])
+        self.assertFalse(cache.lookup("https://example.com/missing")['fresh'])
+        self.assertIsNone(cache.lookup("https://example.com/down"))
+        self.assertIsNone(cache.lookup("https://example.com/timeout"))
+
+        cache.store("https://example.com/ok", {'status_code': 301}, etag=None)
+        self.assertEqual(cache.lookup("https://example.com/ok")['status_code'], 301)
+        self.assertEqual(LinkStatus.select().count(), 2)
+
+    def test_validator_uses_cache_and_conditional_requests(self):
+        url = None
+        requests = []
+
+        async def handle(request):
+            requests.append(request.headers.get('If-None-Match'))
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304, headers={'ETag': '"v1"'})
+            return web.Response(text="ok", headers={'ETag': '"v1"'})
+
+        async def validate(cache):
+            async with ElementValidator(link_cache=cache) as validator:
+                result = await validator.validate_link(url)
+            return result, validator
+
+        async def scenario():
+            nonlocal url
+            app = web.Application()
+            app.router.add_route('*', '/page', handle)
+            server = TestServer(app)
+            await server.start_server()
+            url = str(server.make_url('/page'))
+            cache = LinkStatusCache()
+            try:
+                first, _ = await validate(cache)
+                cached, fresh_validator = await validate(cache)
+                self.age(url, 2 * 86400)
+                revalidated, stale_validator = await validate(cache)
+                return first, cached, fresh_validator, revalidated, stale_validator
+            finally:
+                await server.close()
+
+        first, cached, fresh_validator, revalidated, stale_validator = asyncio.run(scenario())
+        self.assertEqual(first['status_code'], 200)
+        # 第二次直接使用未过期的缓存，第三次带 If-None-Match 请求并得到 304
+        self.assertEqual(requests, [None, '"v1"'])
+        self.assertEqual(cached['status_code'], 200)
+        self.assertEqual(fresh_validator.cache_hits, 1)
+        self.assertEqual(revalidated['status_code'], 200)
+        self.assertTrue(revalidated['valid'])
+        self.assertEqual(stale_validator.revalidated, 1)
+        self.assertTrue(LinkStatusCache().lookup(url)['fresh'])
+
+
+if __name__ == '__main__':
+    unittest.main()
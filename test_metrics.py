@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from data.storage import StorageManager
+from core.metrics import collect_page_metrics, format_metrics
+from core.pipeline import ScanPipeline
+from testutils import MemoryDatabaseTestCase, FakePage
+
+METRICS = {
+    'navigation_type': 'navigate', 'dns_time': 12.0, 'connect_time': 30.5, 'ttfb': 180.2,
+    'response_end': 220.0, 'dom_interactive': 450.0, 'dom_content_loaded': 480.3, 'load_event': None,
+    'first_paint': 300.0, 'first_contentful_paint': 310.0, 'largest_contentful_paint': 900.7,
+    'document_transfer_size': 15000, 'total_transfer_size': 820000, 'total_decoded_size': 2100000,
+    'resource_count': 42,
+}
+
+
+class MetricsPage(FakePage):
+    """无参数的 evaluate 返回性能指标，没有指标时模拟页面已跳转"""
+
+    def __init__(self, metrics=None):
+        super().__init__()
+        self.metrics = metrics
+
+    async def evaluate(self, script, args=None):
+        if args is None:
+            if self.metrics is None:
+                raise RuntimeError("Execution context was destroyed")
+            return self.metrics
+        return await super().evaluate(script, args)
+
+
+class TestPageMetrics(MemoryDatabaseTestCase):
+    def test_collect(self):
+        self.assertEqual(asyncio.run(collect_page_metrics(MetricsPage(METRICS))), METRICS)
+        self.assertIsNone(asyncio.run(collect_page_metrics(MetricsPage())))
+        self.assertIn("LCP 901ms", format_metrics(METRICS))
+        self.assertIn("load -", format_metrics(METRICS))
+
+    def test_pipeline_saves_metrics_and_history(self):
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None)
+        first = asyncio.run(pipeline.run(FakePage(), "https://example.com/", metrics=METRICS))
+        slower = dict(METRICS, largest_contentful_paint=1500.0)
+        second = asyncio.run(pipeline.run(FakePage(), "https://example.com/", metrics=slower))
+        asyncio.run(pipeline.run(FakePage(), "https://example.com/other", metrics=METRICS))
+        untracked = asyncio.run(pipeline.run(FakePage(), "https://example.com/"))
+
+        metrics = storage.get_page_metrics(first)
+        self.assertEqual(metrics.ttfb, 180.2)
+        self.assertEqual(metrics.resource_count, 42)
+        self.assertIsNone(metrics.load_event)
+        self.assertIsNone(storage.get_page_metrics(untracked))
+
+        history = list(storage.get_metrics_history("https://example.com/"))
+        self.assertEqual([m.session_id for m in history], [second, first])
+        self.assertEqual(history[0].largest_contentful_paint, 1500.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+from data.storage import StorageManager
+from core.network import ResponseRecorder
+from core.pipeline import ScanPipeline
+from core.validator import ElementValidator
+from testutils import MemoryDatabaseTestCase, FakePage, FakeRequest, FakeResponse
+
+
+class TestResponseRecorder(unittest.TestCase):
+    def test_records_final_status_for_redirect_chain(self):
+        recorder = ResponseRecorder()
+        first = FakeRequest("http://example.com/old")
+        final = FakeRequest("https://example.com/new", redirected_from=first)
+        recorder._on_response(FakeResponse(first, 301))
+        recorder._on_response(FakeResponse(final, 200))
+        recorder._on_response(FakeResponse(FakeRequest("https://example.com/api", method='POST'), 500))
+
+        self.assertEqual(set(recorder.records), {"http://example.com/old", "https://example.com/new"})
+        old = recorder.records["http://example.com/old"]
+        self.assertEqual(old['status_code'], 200)
+        self.assertEqual(old['final_url'], "https://example.com/new")
+        self.assertEqual(old['redirect_chain'], ["http://example.com/old"])
+        self.assertEqual(old['response_time'], 0.12)
+
+        self.assertEqual(len(recorder.take()), 2)
+        self.assertEqual(recorder.take(), [])
+
+
+class TestKnownResponses(MemoryDatabaseTestCase):
+    def test_pipeline_validates_from_recorded_responses(self):
+        recorder = ResponseRecorder()
+        recorder._on_response(FakeResponse(FakeRequest("https://example.com/about"), 200))
+        recorder._on_response(FakeResponse(FakeRequest("https://example.com/gone"), 404))
+        records = [
+            {"type": "a", "text": "About", "href": "/about", "selector": "a[href]", "index": 0},
+            {"type": "a", "text": "Gone", "href": "gone#top", "selector": "a[href]", "index": 1},
+        ]
+
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None)
+        session_id = asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True,
+                                              recorder=recorder))
+
+        self.assertEqual(len(storage.get_network_responses(session_id)), 2)
+        codes = {el.text: el.status_code for el in storage.get_elements_by_session(session_id)}
+        self.assertEqual(codes, {"About": 200, "Gone": 404})
+
+    def test_responses_recorded_during_detection_are_used(self):
+        recorder = ResponseRecorder()
+
+        class LoadingPage(FakePage):
+            """检测期间页面才请求到 /late"""
+
+            async def evaluate(self, script, args=None):
+                if args and args['op'] == 'extract':
+                    recorder._on_response(FakeResponse(FakeRequest("https://example.com/late"), 503))
+                return await super().evaluate(script, args)
+
+        records = [{"type": "a", "text": "Late", "href": "/late", "selector": "a[href]", "index": 0}]
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None)
+        session_id = asyncio.run(pipeline.run(LoadingPage(records), "https://example.com/", True,
+                                              recorder=recorder))
+
+        [element] = storage.get_elements_by_session(session_id)
+        self.assertEqual(element.status_code, 503)
+        self.assertEqual(len(storage.get_network_responses(session_id)), 1)
+
+    def test_validator_uses_known_response(self):
+        validator = ElementValidator(known_responses={
+            "https://example.com/a": {'status_code': 503, 'response_time': 0.2}
+        })
+        # 未进入异步上下文（没有 HTTP 会话），命中记录时不应发起请求
+        result = asyncio.run(validator.validate_link("/a", "https://example.com/x"))
+        self.assertEqual(result['status_code'], 503)
+        self.assertFalse(result['valid'])
+        self.assertEqual(validator.known_hits, 1)
+
+    def test_protocol_relative_link_resolved_against_base(self):
+        validator = ElementValidator(known_responses={
+            "https://cdn.example.com/lib.js": {'status_code': 200, 'response_time': 0.1}
+        })
+
+        async def scenario():
+            first = await validator.validate_link("//cdn.example.com/lib.js", "https://example.com/x")
+            second = await validator.validate_link("https://cdn.example.com/lib.js", "https://example.com/x")
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertTrue(first['valid'])
+        self.assertEqual(second, first)
+        self.assertEqual((validator.known_hits, validator.dedup_hits), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
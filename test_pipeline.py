@@ -0,0 +1,210 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from data.models import ScanSession
+from data.storage import StorageManager
+from core.pipeline import ScanPipeline
+from core.validator import ElementValidator
+from testutils import MemoryDatabaseTestCase, FakePage
+
+
+class FakeValidator:
+    def __init__(self, **kwargs):
+        self.known_hits = 0
+        self.dedup_hits = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+        self.retries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def validate_link(self, url, base_url=None):
+        return {'valid': True, 'status_code': 200, 'response_time': 0.1, 'error': None}
+
+    async def validate_button(self, page, handle):
+        return {'clickable': True, 'enabled': True, 'click_result': 'ok', 'error': None}
+
+
+class BlockingButtonValidator(FakeValidator):
+    """按钮验证一直进行，直到被取消"""
+    cancelled = False
+
+    async def validate_button(self, page, handle):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            BlockingButtonValidator.cancelled = True
+            raise
+
+
+class SlowValidator(FakeValidator):
+    """记录同时进行中的链接验证数"""
+    active = 0
+    peak = 0
+
+    async def validate_link(self, url, base_url=None):
+        SlowValidator.active += 1
+        SlowValidator.peak = max(SlowValidator.peak, SlowValidator.active)
+        await asyncio.sleep(0.01)
+        SlowValidator.active -= 1
+        return await super().validate_link(url, base_url)
+
+
+class CountingValidator(ElementValidator):
+    """不发起网络请求，只统计全局和各主机的并发请求数"""
+
+    requests = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        CountingValidator.requests = 0
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+
+    async def _request_link(self, url, base_url, conditional=None):
+        CountingValidator.requests += 1
+        host = url.split('/')[2]
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        self.peak_total = max(self.peak_total, sum(self.active.values()))
+        await asyncio.sleep(0.01)
+        self.active[host] -= 1
+        return {'valid': True, 'status_code': 200, 'response_time': 0.01, 'error': None}
+
+
+class TestLinkConcurrency(unittest.TestCase):
+    def test_global_and_per_host_limits(self):
+        validator = CountingValidator(max_concurrent=3, per_host=2)
+        links = [f"https://{host}.example.com/{i}" for host in ('a', 'b', 'c') for i in range(6)]
+        results = asyncio.run(validator.batch_validate_links(links))
+
+        self.assertEqual(len(results), 18)
+        self.assertEqual(validator.peak_total, 3)
+        self.assertTrue(all(peak <= 2 for peak in validator.peak.values()))
+
+    def test_batch_max_concurrent_keyword(self):
+        validator = CountingValidator(max_concurrent=10, per_host=8)
+        links = [f"https://{host}.example.com/{i}" for host in ('a', 'b', 'c') for i in range(3)]
+        results = asyncio.run(validator.batch_validate_links(links, max_concurrent=1))
+
+        self.assertEqual(len(results), 9)
+        self.assertEqual(validator.peak_total, 1)
+
+
+class TestScanPipeline(MemoryDatabaseTestCase):
+    @patch('core.pipeline.ElementValidator', FakeValidator)
+    def test_stream_save_and_validate(self):
+        records = [
+            {"type": "a", "text": f"Link {i}", "href": f"/link{i}", "selector": "a[href]",
+             "selectors": ["a[href]"], "unique_selector": f"a:nth-of-type({i + 1})", "index": i}
+            for i in range(5)
+        ]
+        records.append({"type": "button", "text": "Go", "selector": "button",
+                        "selectors": ["button", '[role="button"]'],
+                        "unique_selector": "#go", "index": 0})
+        # 选择器本身含逗号（form_input 规则）时也能还原
+        form_input = 'input:not([type="submit"]):not([type="button"]):not([type="hidden"]), textarea'
+        records.append({"type": "textarea", "text": "", "selector": form_input,
+                        "selectors": [form_input, "textarea.note"], "unique_selector": "#note", "index": 0})
+
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None, chunk_size=2)
+        session_id = asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True))
+
+        elements = list(storage.get_elements_by_session(session_id))
+        self.assertEqual(len(elements), 7)
+        # 表单控件不需要验证
+        self.assertTrue(all(el.validated for el in elements if el.type != 'textarea'))
+        button = [el for el in elements if el.type == 'button'][0]
+        self.assertTrue(button.clickable)
+        self.assertEqual(json.loads(button.matched_selectors), ["button", '[role="button"]'])
+        textarea = [el for el in elements if el.type == 'textarea'][0]
+        self.assertEqual(json.loads(textarea.matched_selectors), [form_input, "textarea.note"])
+
+
+    @patch('core.pipeline.ElementValidator', FakeValidator)
+    def test_incremental_scroll(self):
+        records = [{"type": "a", "text": "Home", "href": "/", "selector": "a[href]", "index": 0}]
+        lazy = [{"type": "a", "text": f"Item {i}", "href": f"/item{i}", "selector": "a[href]",
+                 "unique_selector": f"#feed > a:nth-of-type({i + 1})", "index": None}
+                for i in range(3)]
+
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None, incremental_scrolls=5)
+        session_id = asyncio.run(pipeline.run(FakePage(records, lazy), "https://example.com/", True))
+
+        elements = list(storage.get_elements_by_session(session_id))
+        self.assertEqual(len(elements), 4)
+        self.assertTrue(all(el.validated for el in elements))
+
+    @patch('core.pipeline.locate_element', lambda page, element: element.selector)
+    @patch('core.pipeline.ElementValidator', BlockingButtonValidator)
+    def test_detection_error_cancels_validation(self):
+        records = [{"type": "button", "text": "Go", "selector": "button", "index": 0}]
+
+        async def failing_stream(page, chunk_size):
+            yield records
+            await asyncio.sleep(0.01)
+            raise RuntimeError("frame detached")
+
+        async def scenario():
+            storage = StorageManager()
+            pipeline = ScanPipeline(storage, log=lambda msg: None)
+            pipeline.detector.detect_stream = failing_stream
+            with self.assertRaises(RuntimeError):
+                await pipeline.run(FakePage(records), "https://example.com/", True)
+            return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+        BlockingButtonValidator.cancelled = False
+        leftover = asyncio.run(scenario())
+        self.assertEqual(leftover, [])
+        self.assertTrue(BlockingButtonValidator.cancelled)
+
+    @patch('core.pipeline.ElementValidator', SlowValidator)
+    def test_links_validated_concurrently(self):
+        records = [{"type": "a", "text": f"Link {i}", "href": f"/link{i}", "selector": "a[href]", "index": i}
+                   for i in range(10)]
+        SlowValidator.peak = 0
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None, chunk_size=4)
+        session_id = asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True))
+
+        self.assertGreater(SlowValidator.peak, 1)
+        self.assertTrue(all(el.status_code == 200 for el in storage.get_elements_by_session(session_id)))
+
+    @patch('core.pipeline.ElementValidator', CountingValidator)
+    def test_duplicate_links_validated_once(self):
+        hrefs = ["/about", "/about#team", "HTTPS://Example.com/about", "https://example.com:443/about",
+                 "/contact", "contact#form", "/about"]
+        records = [{"type": "a", "text": f"Link {i}", "href": href, "selector": "a[href]", "index": i}
+                   for i, href in enumerate(hrefs)]
+        storage = StorageManager()
+        pipeline = ScanPipeline(storage, log=lambda msg: None, chunk_size=3)
+        session_id = asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True))
+
+        elements = list(storage.get_elements_by_session(session_id))
+        self.assertTrue(all(el.validated and el.status_code == 200 for el in elements))
+        # 7 个链接只有 2 个不同地址，跨块的重复也只请求一次
+        self.assertEqual(CountingValidator.requests, 2)
+
+    def test_form_inputs_not_counted_as_buttons(self):
+        storage = StorageManager()
+        session = storage.create_session("https://example.com/")
+        storage.save_elements(session.id, [
+            {"type": "button", "kind": "button", "text": "Go", "selector": "button"},
+            {"type": "input", "kind": "form_input", "selector": "input"},
+            {"type": "input", "kind": "form_input", "selector": "input"},
+            {"type": "input", "kind": "submit", "selector": "input"},
+            {"type": "input", "selector": "input"},  # 旧数据没有 kind
+        ])
+        self.assertEqual(ScanSession.get_by_id(session.id).get_validation_summary()['button_total'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
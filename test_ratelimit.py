@@ -0,0 +1,155 @@
+import asyncio
+import time
+import unittest
+from email.utils import formatdate
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.ratelimit import AdaptiveHostLimiter, parse_retry_after
+from core.validator import ElementValidator
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertEqual(parse_retry_after(formatdate(time.time() - 30, usegmt=True)), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestAdaptiveHostLimiter(unittest.TestCase):
+    def test_grows_when_healthy_and_halves_on_throttle(self):
+        limiter = AdaptiveHostLimiter(initial=2, max_limit=8)
+
+        async def scenario():
+            for _ in range(60):
+                async with limiter.slot("a.example.com") as ticket:
+                    ticket.report(200, 0.05)
+            grown = limiter.stats()["a.example.com"]['limit']
+            async with limiter.slot("a.example.com") as ticket:
+                ticket.report(429, 0.05, retry_after=0.3)
+            throttled = limiter.stats()["a.example.com"]
+
+            start = time.monotonic()
+            async with limiter.slot("a.example.com") as ticket:
+                ticket.report(200, 0.05)
+            return grown, throttled, time.monotonic() - start
+
+        grown, throttled, waited = asyncio.run(scenario())
+        self.assertEqual(grown, 8)
+        self.assertEqual(throttled['limit'], 4)
+        self.assertGreater(throttled['paused_for'], 0)
+        # 暂停期间新的请求要等到 Retry-After 之后
+        self.assertGreaterEqual(waited, 0.25)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_slow_and_timeout_tighten(self):
+        limiter = AdaptiveHostLimiter(initial=4, max_limit=8, slow_after=1.0)
+
+        async def scenario():
+            async with limiter.slot("b.example.com") as ticket:
+                ticket.report(None, 5, timeout=True)
+            after_timeout = limiter.stats()["b.example.com"]['limit']
+            for _ in range(5):
+                async with limiter.slot("b.example.com") as ticket:
+                    ticket.report(200, 3.0)
+            return after_timeout, limiter.stats()["b.example.com"]['limit']
+
+        after_timeout, after_slow = asyncio.run(scenario())
+        self.assertEqual(after_timeout, 2)
+        self.assertEqual(after_slow, 1)
+
+
+class TestValidatorBackoff(unittest.TestCase):
+    def test_rate_limited_links_retried_not_failed(self):
+        calls = {'count': 0}
+
+        async def handle(request):
+            calls['count'] += 1
+            # 前两个请求被限流
+            if calls['count'] <= 2:
+                return web.Response(status=429, headers={'Retry-After': '1'})
+            return web.Response(text="ok")
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_route('*', '/{name}', handle)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                urls = [str(server.make_url(f'/p{i}')) for i in range(5)]
+                async with ElementValidator(per_host=4) as validator:
+                    start = time.monotonic()
+                    results = await validator.batch_validate_links(urls)
+                    return results, validator, time.monotonic() - start
+            finally:
+                await server.close()
+
+        results, validator, elapsed = asyncio.run(scenario())
+        self.assertTrue(all(r['status_code'] == 200 and r['valid'] for r in results))
+        self.assertEqual(validator.retries, 2)
+        self.assertGreaterEqual(elapsed, 0.9)
+
+    def test_limiter_shared_across_validators(self):
+        throttled = asyncio.Event()
+
+        async def handle(request):
+            if request.path == '/a' and not throttled.is_set():
+                throttled.set()
+                return web.Response(status=429, headers={'Retry-After': '1'})
+            return web.Response(text="ok")
+
+        async def other_page(url):
+            # 另一个页面的验证器在第一个页面被限流后才开始请求同一主机
+            await throttled.wait()
+            await asyncio.sleep(0.05)
+            async with ElementValidator() as validator:
+                start = time.monotonic()
+                result = await validator.validate_link(url)
+                return result, validator, time.monotonic() - start
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_route('*', '/{name}', handle)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                async with ElementValidator() as first:
+                    first_result, (second_result, second, waited) = await asyncio.gather(
+                        first.validate_link(str(server.make_url('/a'))),
+                        other_page(str(server.make_url('/b'))),
+                    )
+                return first, first_result, second, second_result, waited
+            finally:
+                await server.close()
+
+        first, first_result, second, second_result, waited = asyncio.run(scenario())
+        self.assertIs(first.host_limiter, second.host_limiter)
+        self.assertEqual(first.retries, 1)
+        self.assertTrue(first_result['valid'] and second_result['valid'])
+        # 第一个页面收到的 Retry-After 对第二个页面同样生效
+        self.assertGreaterEqual(waited, 0.8)
+
+    def test_persistent_429_is_not_reported_as_broken(self):
+        async def handle(request):
+            return web.Response(status=429, headers={'Retry-After': '3600'})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_route('*', '/', handle)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                async with ElementValidator() as validator:
+                    return await validator.validate_link(str(server.make_url('/')))
+            finally:
+                await server.close()
+
+        result = asyncio.run(scenario())
+        self.assertEqual(result['status_code'], 429)
+        self.assertIsNone(result['valid'])
+        self.assertEqual(result['error'], 'Rate limited (429)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+from core.readiness import make_readiness, LoadStateReadiness, DomQuietReadiness, SelectorReadiness
+
+
+class FakePage:
+    def __init__(self, settle_after=0.0):
+        self.settle_after = settle_after
+        self.goto_args = None
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.goto_args = (url, wait_until, timeout)
+
+    async def evaluate(self, script, quiet):
+        # 模拟 DOM 在 settle_after 秒后才静默
+        await asyncio.sleep(self.settle_after)
+        return 3
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        return selector
+
+
+class TestReadiness(unittest.TestCase):
+    def test_make_readiness(self):
+        self.assertIsInstance(make_readiness('load'), LoadStateReadiness)
+        self.assertIsInstance(make_readiness('dom_quiet', quiet_ms=200), DomQuietReadiness)
+        self.assertIsInstance(make_readiness('selector', selector='#main'), SelectorReadiness)
+        with self.assertRaises(ValueError):
+            make_readiness('selector')
+        with self.assertRaises(ValueError):
+            make_readiness('never')
+
+    def test_load_state_passes_timeout_to_goto(self):
+        page = FakePage()
+        ready = asyncio.run(make_readiness('domcontentloaded', timeout=5).goto(page, 'https://example.com/'))
+        self.assertTrue(ready)
+        self.assertEqual(page.goto_args, ('https://example.com/', 'domcontentloaded', 5000))
+
+    def test_dom_quiet_timeout_is_soft(self):
+        strategy = DomQuietReadiness(quiet_ms=100, timeout=50)
+        page = FakePage(settle_after=1)
+        self.assertFalse(asyncio.run(strategy.goto(page, 'https://example.com/')))
+        self.assertEqual(page.goto_args[1], 'domcontentloaded')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from core.scanner import PageScanner, _site_of
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type='script'):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = 'abort'
+
+    async def fallback(self):
+        self.outcome = 'fallback'
+
+
+class TestFirstParty(unittest.TestCase):
+    def test_site_of(self):
+        self.assertEqual(_site_of("www.example.com"), "example.com")
+        self.assertEqual(_site_of("static.example.co.uk"), "example.co.uk")
+        self.assertEqual(_site_of("shop.example.com.au"), "example.com.au")
+        self.assertEqual(_site_of("cdn.example.io"), "example.io")
+        self.assertEqual(_site_of("192.168.1.10"), "192.168.1.10")
+        self.assertEqual(_site_of("::1"), "::1")
+        self.assertEqual(_site_of("localhost"), "localhost")
+
+    def test_first_party_profile(self):
+        scanner = PageScanner(context=object(), block_profile='first_party')
+        handle = scanner._make_route_handler("https://www.example.co.uk/")
+
+        def outcome(url, resource_type='script'):
+            route = FakeRoute(url, resource_type)
+            asyncio.run(handle(route))
+            return route.outcome
+
+        self.assertEqual(outcome("https://static.example.co.uk/app.js"), 'fallback')
+        # 同在 co.uk 下的其他站点不是第一方
+        self.assertEqual(outcome("https://tracker.co.uk/t.js"), 'abort')
+        self.assertEqual(outcome("https://ads.other.co.uk/a.js"), 'abort')
+        # 页面导航本身不拦截
+        self.assertEqual(outcome("https://other.example.com/", 'document'), 'fallback')
+        self.assertEqual(scanner.blocked, 2)
+
+    def test_ip_hosts_compared_exactly(self):
+        scanner = PageScanner(context=object(), block_profile='first_party')
+        handle = scanner._make_route_handler("http://10.0.0.5:8080/")
+        same, other = FakeRoute("http://10.0.0.5:8080/a.js"), FakeRoute("http://20.0.0.5/a.js")
+        asyncio.run(handle(same))
+        asyncio.run(handle(other))
+        self.assertEqual((same.outcome, other.outcome), ('fallback', 'abort'))
+
+    def test_media_profile_blocks_by_type(self):
+        scanner = PageScanner(context=object(), block_profile='media')
+        handle = scanner._make_route_handler("https://example.com/")
+        image, script = FakeRoute("https://example.com/a.png", 'image'), FakeRoute("https://cdn.net/a.js")
+        asyncio.run(handle(image))
+        asyncio.run(handle(script))
+        self.assertEqual((image.outcome, script.outcome), ('abort', 'fallback'))
+
+
+if __name__ == '__main__':
+    unittest.main()
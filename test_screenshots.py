@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from PIL import Image
+from core.screenshots import ScreenshotCropper
+
+
+def make_image(width=200, height=100):
+    """左半边红色、右半边蓝色的测试图片"""
+    image = Image.new('RGB', (width, height), 'red')
+    image.paste(Image.new('RGB', (width // 2, height), 'blue'), (width // 2, 0))
+    return image
+
+
+class TestScreenshotCropper(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cropper = ScreenshotCropper(output_dir=self.tmp.name, thumbnail_size=(320, 320))
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.tmp.name) for name in names]
+
+    def test_crop_bounds_and_scale(self):
+        # 设备像素比为 2：CSS 坐标 (10, 5, 20x10) 对应图片中的 (20, 10, 40x20)
+        [path] = self.cropper._crop_batch(make_image(), 2, [{'x': 10, 'y': 5, 'width': 20, 'height': 10}])
+        with Image.open(path) as thumb:
+            self.assertEqual(thumb.size, (40, 20))
+            self.assertEqual(thumb.getpixel((0, 0)), (255, 0, 0))
+
+    def test_clamped_to_image(self):
+        boxes = [
+            {'x': 150, 'y': -20, 'width': 100, 'height': 50},  # 超出右边和上边，裁剪到图片范围内
+            {'x': 250, 'y': 10, 'width': 20, 'height': 10},  # 完全在图片外
+            {'x': 10, 'y': 10, 'width': 0, 'height': 10},  # 零宽
+        ]
+        clamped, outside, empty = self.cropper._crop_batch(make_image(), 1, boxes)
+        with Image.open(clamped) as thumb:
+            self.assertEqual(thumb.size, (50, 30))
+            self.assertEqual(thumb.getpixel((0, 0)), (0, 0, 255))
+        self.assertIsNone(outside)
+        self.assertIsNone(empty)
+
+    def test_identical_crops_share_one_file(self):
+        image = make_image()
+        boxes = [{'x': 0, 'y': 0, 'width': 20, 'height': 20}, {'x': 20, 'y': 40, 'width': 20, 'height': 20},
+                 {'x': 120, 'y': 0, 'width': 20, 'height': 20}]
+        first, same, other = self.cropper._crop_batch(image, 1, boxes)
+        # 跨会话再次裁剪相同内容也复用同一个文件
+        [again] = ScreenshotCropper(output_dir=self.tmp.name)._crop_batch(image, 1, boxes[:1])
+
+        self.assertEqual(first, same)
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_crop_skips_hidden_and_iframe_elements(self):
+        shot = {'image': make_image(), 'scale': 1}
+        bbox = {'x': 0, 'y': 0, 'width': 10, 'height': 10}
+        elements = [
+            {'visible': True, 'bbox': bbox, 'frame_url': "https://example.com/", 'frame_path': ''},
+            {'visible': False, 'bbox': bbox, 'frame_url': "https://example.com/", 'frame_path': ''},
+            {'visible': True, 'bbox': bbox, 'frame_url': "https://ads.example.net/frame", 'frame_path': '0'},
+            # 与主页面 URL 相同的 iframe
+            {'visible': True, 'bbox': bbox, 'frame_url': "https://example.com/", 'frame_path': '1'},
+        ]
+        asyncio.run(self.cropper.crop(shot, elements))
+        self.assertEqual(['screenshot_path' in el for el in elements], [True, False, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+from data.models import ScanSession, PageElement
+from data.storage import StorageManager
+from core.network import ResponseRecorder
+from core.crawler import CrawlFrontier
+from core.pipeline import ScanPipeline
+from core.sharding import ShardedCrawler, _ShardStorage, shard_for
+from testutils import MemoryDatabaseTestCase, FakePage, FakeRequest, FakeResponse
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class FakeWorker:
+    alive = True
+    exitcode = None
+
+    def is_alive(self):
+        return self.alive
+
+
+class TestSharding(MemoryDatabaseTestCase):
+    def test_shard_is_stable(self):
+        urls = [f"https://example.com/p{i}" for i in range(50)]
+        shards = [shard_for(url, 4) for url in urls]
+        self.assertEqual(shards, [shard_for(url, 4) for url in urls])
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+
+    def test_worker_result_merged_by_single_writer(self):
+        # 工作进程一侧：流水线写入内存存储
+        recorder = ResponseRecorder()
+        recorder._on_response(FakeResponse(FakeRequest("https://example.com/about"), 200))
+        recorder._on_response(FakeResponse(FakeRequest("https://example.com/gone"), 404))
+        records = [
+            {"type": "a", "text": "About", "href": "/about", "selector": "a[href]", "index": 0},
+            {"type": "a", "text": "Gone", "href": "/gone", "selector": "a[href]", "index": 1},
+        ]
+        shard_storage = _ShardStorage()
+        pipeline = ScanPipeline(shard_storage, log=lambda msg: None)
+        asyncio.run(pipeline.run(FakePage(records), "https://example.com/", True, recorder=recorder))
+        self.assertEqual(len(shard_storage.validations), 2)
+        self.assertEqual(PageElement.select().count(), 0)
+
+        # 主进程一侧：入库并把验证结果对应到新建的元素
+        storage = StorageManager()
+        crawler = ShardedCrawler(storage, processes=2, log=lambda msg: None)
+        crawl = storage.create_crawl("https://example.com/")
+        crawler._write(crawl.id, {
+            'url': "https://example.com/", 'depth': 0, 'ok': True, 'error': None,
+            'elements': shard_storage.elements, 'validations': shard_storage.validations,
+            'responses': shard_storage.responses, 'links': [],
+        })
+        crawler._write(crawl.id, {'url': "https://example.com/down", 'depth': 1, 'ok': False,
+                                  'error': 'Page load failed', 'links': []})
+
+        pages = {s.url: s.status for s in storage.get_crawl_pages(crawl.id)}
+        self.assertEqual(pages, {"https://example.com/": 'completed', "https://example.com/down": 'failed'})
+        session = ScanSession.get(ScanSession.url == "https://example.com/")
+        codes = {el.text: el.status_code for el in storage.get_elements_by_session(session.id)}
+        self.assertEqual(codes, {"About": 200, "Gone": 404})
+        self.assertEqual(len(storage.get_network_responses(session.id)), 2)
+        self.assertEqual(crawler.pages_scanned, 1)
+
+    def test_crashed_worker_fails_its_pages_and_is_skipped(self):
+        storage = StorageManager()
+        crawler = ShardedCrawler(storage, processes=2, log=lambda msg: None)
+        crawl = storage.create_crawl("https://example.com/")
+        task_queues = [FakeQueue(), FakeQueue()]
+        workers = [FakeWorker(), FakeWorker()]
+        pending, dead = {}, set()
+        frontier = CrawlFrontier("https://example.com/", max_depth=1, max_pages=50)
+        for i in range(20):
+            frontier.add(f"https://example.com/p{i}", 1)
+        crawler._dispatch(frontier, task_queues, pending, dead)
+        crashed = [url for url, _ in task_queues[1].items]
+        self.assertTrue(crashed)
+
+        # 分片 1 的进程退出：它尚未返回的地址记为失败，之后的地址都发给分片 0
+        workers[1].alive = False
+        crawler._reap_workers(crawl.id, workers, pending, dead)
+        self.assertEqual(dead, {1})
+        self.assertEqual({shard for shard, _ in pending.values()}, {0})
+        pages = {s.url: s.status for s in storage.get_crawl_pages(crawl.id)}
+        self.assertEqual(pages, dict.fromkeys(crashed, 'failed'))
+
+        for i in range(20, 40):
+            frontier.add(f"https://example.com/p{i}", 1)
+        before = len(task_queues[1].items)
+        crawler._dispatch(frontier, task_queues, pending, dead)
+        self.assertEqual(len(task_queues[1].items), before)
+        self.assertEqual(len(pending), 40 + 1 - len(crashed))
+
+        workers[0].alive = False
+        with self.assertRaises(RuntimeError):
+            crawler._reap_workers(crawl.id, workers, pending, dead)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.crawler import CrawlFrontier
+from core.sitemap import CrawlDelay, RobotsRules, SiteHints, SitemapParser
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+ROBOTS = """User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+Sitemap: {origin}/sitemap_index.xml
+"""
+
+INDEX = f"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex {NS}>
+  <sitemap><loc>{{origin}}/sitemap-pages.xml.gz</loc></sitemap>
+  <sitemap><loc>{{origin}}/sitemap-docs.xml</loc></sitemap>
+</sitemapindex>"""
+
+
+def urlset(urls):
+    entries = ''.join(f"<url><loc>{url}</loc><lastmod>2024-01-01</lastmod></url>" for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'
+
+
+def parse_in_chunks(data, size=37):
+    parser = SitemapParser()
+    found = []
+    for i in range(0, len(data), size):
+        found.extend(parser.feed(data[i:i + size]))
+    return found + parser.close()
+
+
+class TestSitemapParser(unittest.TestCase):
+    def test_urlset_streamed_in_chunks(self):
+        urls = [f"https://example.com/p{i}" for i in range(200)]
+        found = parse_in_chunks(urlset(urls).encode())
+        self.assertEqual(found, [('page', url) for url in urls])
+
+    def test_processed_entries_released(self):
+        parser = SitemapParser()
+        data = urlset([f"https://example.com/p{i}" for i in range(500)]).encode()
+        for i in range(0, len(data), 64):
+            parser.feed(data[i:i + 64])
+            # 根元素上最多留下尚未解析完的一个条目
+            self.assertLessEqual(len(parser._root or []), 1)
+        self.assertEqual(len(parser.close()), 0)
+        self.assertEqual(len(parser._root), 0)
+
+    def test_gzip_and_index(self):
+        data = gzip.compress(INDEX.format(origin="https://example.com").encode())
+        found = parse_in_chunks(data)
+        self.assertEqual(found, [('sitemap', "https://example.com/sitemap-pages.xml.gz"),
+                                 ('sitemap', "https://example.com/sitemap-docs.xml")])
+
+
+class TestRobots(unittest.TestCase):
+    def test_rules_filter_frontier(self):
+        robots = RobotsRules(ROBOTS.format(origin="https://example.com"))
+        self.assertEqual(robots.crawl_delay, 2.0)
+        self.assertEqual(robots.sitemaps, ["https://example.com/sitemap_index.xml"])
+        frontier = CrawlFrontier("https://example.com/")
+        frontier.robots = robots
+        self.assertFalse(frontier.add("/private/a", 1, base="https://example.com/"))
+        self.assertTrue(frontier.add("/public/a", 1, base="https://example.com/"))
+
+    def test_missing_robots_allows_all(self):
+        robots = RobotsRules(None)
+        self.assertTrue(robots.allowed("https://example.com/private/a"))
+        self.assertIsNone(robots.crawl_delay)
+
+    def test_crawl_delay_spacing(self):
+        delay = CrawlDelay(0.5)
+        self.assertEqual(delay.reserve(), 0)
+        self.assertAlmostEqual(delay.reserve(), 0.5, delta=0.05)
+        self.assertAlmostEqual(delay.remaining(), 1.0, delta=0.05)
+        self.assertEqual(CrawlDelay().reserve(), 0)
+
+
+class TestSiteHints(unittest.TestCase):
+    def test_seed_frontier_from_nested_sitemaps(self):
+        async def scenario():
+            routes = {}
+
+            async def handle(request):
+                body = routes.get(request.path)
+                return web.Response(body=body) if body else web.Response(status=404)
+
+            app = web.Application()
+            app.router.add_get('/{tail:.*}', handle)
+            server = TestServer(app)
+            await server.start_server()
+            origin = str(server.make_url('')).rstrip('/')
+            pages = [f"{origin}/p{i}" for i in range(30)] + [f"{origin}/private/x", "https://other.com/y"]
+            docs = [f"{origin}/docs/{i}" for i in range(10)]
+            routes.update({
+                '/robots.txt': ROBOTS.format(origin=origin).encode(),
+                '/sitemap_index.xml': INDEX.format(origin=origin).encode(),
+                '/sitemap-pages.xml.gz': gzip.compress(urlset(pages).encode()),
+                '/sitemap-docs.xml': urlset(docs).encode(),
+            })
+            try:
+                frontier = CrawlFrontier(origin, max_pages=35)
+                robots = await SiteHints(origin).seed(frontier, log=lambda msg: None)
+                return origin, frontier, robots
+            finally:
+                await server.close()
+
+        origin, frontier, robots = asyncio.run(scenario())
+        queued = []
+        while len(frontier):
+            queued.append(frontier.pop())
+        urls = [url for url, depth in queued]
+        self.assertEqual(robots.crawl_delay, 2.0)
+        self.assertEqual(len(urls), 35)
+        self.assertEqual(urls[0], f"{origin}/")
+        self.assertNotIn(f"{origin}/private/x", urls)
+        self.assertNotIn("https://other.com/y", urls)
+        self.assertTrue(all(depth == 0 for url, depth in queued))
+
+
+if __name__ == '__main__':
+    unittest.main()
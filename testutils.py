@@ -0,0 +1,74 @@
+"""
+测试共用的辅助类
+
+MemoryDatabaseTestCase 在每个测试中切换到内存数据库，避免改动 aichecker.db；
+FakePage、FakeRequest、FakeResponse 模拟流水线和网络记录用到的 Playwright 对象。
+"""
+
+import unittest
+from data.models import db, MODELS
+
+
+class MemoryDatabaseTestCase(unittest.TestCase):
+    """使用内存数据库的测试基类，子类覆盖 setUp 时须先调用 super().setUp()"""
+
+    def setUp(self):
+        self.test_db = db.database
+        db.init(':memory:')
+        db.connect(reuse_if_open=True)
+        db.create_tables(MODELS)
+        self.addCleanup(self._restore_db)
+
+    def _restore_db(self):
+        db.drop_tables(MODELS)
+        db.close()
+        db.init(self.test_db)
+
+
+class FakePage:
+    """只实现流式检测用到的 evaluate，模拟页面内的分块提取"""
+    url = "https://example.com/"
+
+    def __init__(self, records=(), lazy_records=None):
+        self.records = list(records)
+        self.lazy_records = lazy_records or []
+        self.frames = [self]
+        self.main_frame = self
+        self.parent_frame = None
+        self.child_frames = []
+
+    async def evaluate(self, script, args=None):
+        if args is None:
+            # 滚动 / 是否到底部
+            return True
+        if args['op'] == 'collect':
+            return len(self.records)
+        if args['op'] == 'drain':
+            # 懒加载内容在第一次滚动后出现
+            new, self.lazy_records = self.lazy_records, []
+            return new
+        if args['op'] in ('observe', 'disconnect'):
+            return True
+        return self.records[args['start']:args['end']]
+
+    async def wait_for_timeout(self, timeout):
+        pass
+
+    def locator(self, selector):
+        return selector
+
+
+class FakeRequest:
+    def __init__(self, url, method='GET', resource_type='document', redirected_from=None, response_start=120.0):
+        self.url = url
+        self.method = method
+        self.resource_type = resource_type
+        self.redirected_from = redirected_from
+        self.timing = {'responseStart': response_start}
+
+
+class FakeResponse:
+    def __init__(self, request, status):
+        self.request = request
+        self.url = request.url
+        self.status = status